@@ -1,7 +1,14 @@
-from . import neural_networks
-from . import decision_trees
-from . import datasets
-from . import unsupervised
-from . import tokenizers
-from . import utilities
+from typing import TYPE_CHECKING
 from ._info import __version__, __author__
+from ._lazy import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(__name__, {}, ("neural_networks", "decision_trees", "datasets",
+                                                      "unsupervised", "tokenizers", "utilities"))
+
+if TYPE_CHECKING:
+    from . import neural_networks
+    from . import decision_trees
+    from . import datasets
+    from . import unsupervised
+    from . import tokenizers
+    from . import utilities
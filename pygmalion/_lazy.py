@@ -0,0 +1,36 @@
+import importlib
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+def lazy_attributes(package: str, attributes: Dict[str, str],
+                    submodules: Iterable[str] = ()) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    returns the module level '__getattr__' and '__dir__' functions of a package
+    whose attributes are imported from their submodule on first access,
+    so that importing the package does not import its (potentially heavy) dependencies.
+
+    Parameters
+    ----------
+    package : str
+        the '__name__' of the package
+    attributes : dict of {str: str}
+        the relative name of the submodule defining each attribute
+    submodules : iterable of str
+        the subpackages and submodules that can be accessed as attributes of the package
+    """
+    submodules = tuple(submodules)
+
+    def __getattr__(name: str) -> object:
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package), name)
+        elif name in submodules:
+            value = importlib.import_module(f".{name}", package)
+        else:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        setattr(importlib.import_module(package), name, value)  # cached, so __getattr__ is not called again
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(importlib.import_module(package))) | set(attributes) | set(submodules))
+
+    return __getattr__, __dir__
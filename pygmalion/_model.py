@@ -1,7 +1,11 @@
 import json
 import pathlib
 import io
-from typing import Union
+from typing import Dict, Literal, Union, TYPE_CHECKING
+if TYPE_CHECKING:
+    import numpy as np
+
+MODEL_FORMAT = Literal["json", "npz"]
 
 
 class Model:
@@ -10,9 +14,11 @@ class Model:
         return f"{type(self).__name__}()"
 
     def save(self, file_path: Union[str, pathlib.Path, io.IOBase],
-             overwrite: bool = False, create_dir: bool = False):
+             overwrite: bool = False, create_dir: bool = False,
+             format: MODEL_FORMAT = "json"):
         """
-        Saves the model to the disk as '.json' file
+        Saves the model to the disk as '.json' file,
+        or as a '.npz' file of flat arrays for the models that support it (see 'arrays')
 
         Parameters
         ----------
@@ -23,14 +29,17 @@ class Model:
         create_dir : bool
             If True, the directory to the file's path is created
             if it does not exist already
+        format : one of {"json", "npz"}
+            format of the file when saving to a file like object.
+            When saving to a path, the format is deduced from the suffix.
         """
         if not isinstance(file_path, io.IOBase):
             file_path = pathlib.Path(file_path)
             path = file_path.parent
             suffix = file_path.suffix.lower()
-            if suffix != ".json":
+            if suffix not in (".json", ".npz"):
                 raise ValueError(
-                    f"The model must be saved as a '.json' file, but got '{suffix}'")
+                    f"The model must be saved as a '.json' or '.npz' file, but got '{suffix}'")
             if not(create_dir) and not path.is_dir():
                 raise ValueError(f"The directory '{path}' does not exist")
             else:
@@ -38,8 +47,14 @@ class Model:
             if not(overwrite) and file_path.exists():
                 raise FileExistsError(
                     f"The file '{file_path}' already exists, set 'overwrite=True' to overwrite.")
-            with open(file_path, "w", encoding="utf-8") as json_file:
-                json.dump(self.dump, json_file, ensure_ascii=False)
+            format = "npz" if suffix == ".npz" else "json"
+            if format == "json":
+                with open(file_path, "w", encoding="utf-8") as json_file:
+                    json.dump(self.dump, json_file, ensure_ascii=False)
+                return
+        if format == "npz":
+            import numpy as np
+            np.savez(file_path, **self.arrays)
         else:
             json.dump(self.dump, file_path, ensure_ascii=False)
 
@@ -49,4 +64,16 @@ class Model:
     
     @property
     def dump(self) -> dict:
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, "np.ndarray"]) -> "Model":
+        raise NotImplementedError(f"{cls.__name__} cannot be loaded from a '.npz' file")
+
+    @property
+    def arrays(self) -> Dict[str, "np.ndarray"]:
+        """
+        the model as a dict of numpy arrays, with a "metadata" array holding a JSON string
+        of the dump of the model without its arrays (including its "type")
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot be saved as a '.npz' file")
@@ -1,10 +1,28 @@
-from . import generators
-from ._boston_housing import boston_housing
-from ._cityscapes import cityscapes
-from ._fashion_mnist import fashion_mnist
-from ._iris import iris
-from ._titanic import titanic
-from ._sentence_pairs import sentence_pairs
-from ._airline_tweets import airline_tweets
-from ._aquarium import aquarium
-from ._usa_economy import usa_economy
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "boston_housing": "._boston_housing",
+    "cityscapes": "._cityscapes",
+    "fashion_mnist": "._fashion_mnist",
+    "iris": "._iris",
+    "titanic": "._titanic",
+    "sentence_pairs": "._sentence_pairs",
+    "airline_tweets": "._airline_tweets",
+    "aquarium": "._aquarium",
+    "usa_economy": "._usa_economy"
+}
+__all__ = list(_ATTRIBUTES) + ["generators"]
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES, ("generators",))
+
+if TYPE_CHECKING:
+    from . import generators
+    from ._boston_housing import boston_housing
+    from ._cityscapes import cityscapes
+    from ._fashion_mnist import fashion_mnist
+    from ._iris import iris
+    from ._titanic import titanic
+    from ._sentence_pairs import sentence_pairs
+    from ._airline_tweets import airline_tweets
+    from ._aquarium import aquarium
+    from ._usa_economy import usa_economy
@@ -1,4 +1,18 @@
-from ._monotonicity import MONOTONICITY
-from ._decision_tree import DecisionTreeRegressor, DecisionTreeClassifier
-from ._gradient_boosting_regressor import GradientBoostingRegressor
-from ._gradient_boosting_classifier import GradientBoostingClassifier
\ No newline at end of file
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "MONOTONICITY": "._monotonicity",
+    "DecisionTreeRegressor": "._decision_tree",
+    "DecisionTreeClassifier": "._decision_tree",
+    "GradientBoostingRegressor": "._gradient_boosting_regressor",
+    "GradientBoostingClassifier": "._gradient_boosting_classifier"
+}
+__all__ = list(_ATTRIBUTES)
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from ._monotonicity import MONOTONICITY
+    from ._decision_tree import DecisionTreeRegressor, DecisionTreeClassifier
+    from ._gradient_boosting_regressor import GradientBoostingRegressor
+    from ._gradient_boosting_classifier import GradientBoostingClassifier
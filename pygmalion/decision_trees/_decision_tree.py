@@ -1,9 +1,11 @@
+import json
 from typing import List, Dict, Set, Iterable, Optional, Union
 import pandas as pd
 import numpy as np
 import torch
 import torch.nn.functional as F
 from ._branch import Branch
+from ._flat_trees import FlatTrees
 from ._monotonicity import MONOTONICITY
 from pygmalion._model import Model
 
@@ -12,6 +14,8 @@ DATAFRAME_LIKE = Union[pd.DataFrame, dict, Iterable]
 
 class DecisionTree(Model):
 
+    _value_type = float  # type of the values of the leafs
+
     def __repr__(self):
         max_depth = max(leaf.depth for leaf in self.leafs)
         n_leafs = len(self.leafs)
@@ -23,6 +27,7 @@ class DecisionTree(Model):
         self.root = None
         self.inputs = inputs
         self.target = target
+        self._flat: Optional[FlatTrees] = None
 
     def evaluator(self, target: torch.Tensor):
         """
@@ -79,6 +84,7 @@ class DecisionTree(Model):
             the device on which to perform the best split search
         """
         self.n_observations = len(df)
+        self._flat = None
         inputs = [torch.from_numpy(df[col].to_numpy(dtype=dtype)).to(device) for col in self.inputs]
         target = self.target_preprocessor(df[self.target] if target is None else target, dtype).to(device)
         self.root = Branch(inputs=inputs, target=target, variables=self.inputs,
@@ -104,16 +110,26 @@ class DecisionTree(Model):
         """
         make a prediction
         """
+        return self._evaluate(df)
+
+    def _evaluate(self, df: DATAFRAME_LIKE) -> np.ndarray:
+        """
+        returns the value of the leaf each observation falls in, or nan for observations
+        with a missing value in one of the splits they go through
+        """
         if self.root is None:
             raise RuntimeError("Cannot evaluate model before it was fited")
         df = self._as_dataframe(df)
-        self.root.propagate(df.reset_index(drop=True)[self.inputs])
-        result = np.full((len(df),), float("nan"), dtype=np.float64)
-        for leaf in self.leafs:
-            sub = leaf._df.index
-            result[sub] = leaf.value
-            leaf._df = None
-        return result
+        return self.flat_trees.evaluate(df[self.inputs].to_numpy(dtype=np.float64))[0]
+
+    @property
+    def flat_trees(self) -> FlatTrees:
+        """
+        the array based representation of the tree, used for evaluation
+        """
+        if self._flat is None:
+            self._flat = FlatTrees.from_branches([self.root], self.inputs)
+        return self._flat
 
     @property
     def branches(self) -> Iterable[Branch]:
@@ -127,20 +143,47 @@ class DecisionTree(Model):
 
     @property
     def dump(self) -> dict:
-        return {"type": type(self).__name__,
-                "branches": self.root.dump,
-                "inputs": list(self.inputs),
-                "target": self.target}
+        return {**self._metadata, "branches": self.root.dump}
 
     @classmethod
     def from_dump(cls, dump: dict) -> "DecisionTree":
+        return cls._from_root(Branch.from_dump(dump["branches"]), dump)
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {**self.flat_trees.arrays, "metadata": np.array(json.dumps(self._metadata))}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "DecisionTree":
+        metadata = json.loads(str(arrays["metadata"]))
+        flat = FlatTrees.from_arrays(arrays)
+        obj = cls._from_root(flat.to_branches(metadata["inputs"], cls._value_type)[0], metadata)
+        obj._flat = flat
+        return obj
+
+    @classmethod
+    def _from_root(cls, root: Branch, metadata: dict) -> "DecisionTree":
+        """
+        returns the tree of the given root branch, with the attributes of the given dump (without branches)
+        """
         obj = cls.__new__(cls)
-        obj.root = Branch.from_dump(dump["branches"])
-        obj.inputs = dump["inputs"]
-        obj.target = dump["target"]
+        obj.n_observations = root.n_observations
+        obj.root = root
+        obj.inputs = metadata["inputs"]
+        obj.target = metadata["target"]
         obj.leafs = set(b for b in obj.branches if b.is_leaf)
+        obj._flat = None
         return obj
 
+    @property
+    def _metadata(self) -> dict:
+        """
+        the dump of the model, excluding its branches
+        """
+        return {"type": type(self).__name__,
+                "inputs": list(self.inputs),
+                "target": self.target}
+
     @property
     def feature_importances(self) -> dict:
         """
@@ -226,20 +269,22 @@ class DecisionTreeRegressor(DecisionTree):
         self._variable_constraints = torch.tensor([0 if c is None else int(c) for c in constraints], dtype=torch.int8, device="cpu")
 
     @property
-    def dump(self) -> dict:
-        dump = super().dump
-        dump.update({"monotonicity_constraints": self.monotonicity_constraints})
-        return dump
+    def _metadata(self) -> dict:
+        metadata = super()._metadata
+        metadata.update({"monotonicity_constraints": self.monotonicity_constraints})
+        return metadata
 
     @classmethod
-    def from_dump(cls, dump: dict) -> "DecisionTree":
-        obj = super().from_dump(dump)
-        obj.monotonicity_constraints = {k: MONOTONICITY(v) for k, v in dump["monotonicity_constraints"].items()}
+    def _from_root(cls, root: Branch, metadata: dict) -> "DecisionTree":
+        obj = super()._from_root(root, metadata)
+        obj.monotonicity_constraints = {k: MONOTONICITY(v) for k, v in metadata["monotonicity_constraints"].items()}
         return obj
 
 
 class DecisionTreeClassifier(DecisionTree):
 
+    _value_type = int
+
     def target_preprocessor(self, data: pd.Series, dtype: np.dtype) -> torch.Tensor:
         """
         Converts the pd.Series into a torch.Tensor
@@ -298,15 +343,20 @@ class DecisionTreeClassifier(DecisionTree):
         indexes : bool
             if True return indexes of predicted classes instead of list of class names
         """
-        if self.root is None:
-            raise RuntimeError("Cannot evaluate model before it was fited")
-        df = self._as_dataframe(df)
-        self.root.propagate(df.reset_index(drop=True)[self.inputs])
-        result = np.array([None]*len(df))
-        for leaf in self.leafs:
-            sub = leaf._df.index
-            result[sub] = leaf.value
-            leaf._df = None
+        result = np.array([None if np.isnan(v) else int(v) for v in self._evaluate(df)], dtype=object)
         if not indexes:
-            result = [self.classes[i] for i in result]
-        return result
\ No newline at end of file
+            result = [None if i is None else self.classes[i] for i in result]
+        return result
+
+    @property
+    def _metadata(self) -> dict:
+        metadata = super()._metadata
+        metadata.update({"classes": list(self.classes)})
+        return metadata
+
+    @classmethod
+    def _from_root(cls, root: Branch, metadata: dict) -> "DecisionTree":
+        obj = super()._from_root(root, metadata)
+        obj.classes = metadata.get("classes", [])
+        obj._class_to_index = {c: i for i, c in enumerate(obj.classes)}
+        return obj
\ No newline at end of file
@@ -0,0 +1,145 @@
+import numpy as np
+from typing import Dict, List, Optional
+from ._branch import Branch
+
+
+class FlatTrees:
+    """
+    Array based representation of a list of decision trees, used to serialize them compactly
+    and to evaluate all the trees at once with vectorized operations.
+
+    The nodes of all the trees are stored in flat arrays, each tree being a contiguous range of nodes
+    starting with its root:
+        variable : index of the input variable of the split (-1 if none)
+        threshold : threshold of the split (nan if none)
+        left, right : index of the inferior or equal, and of the superior child node (-1 for leafs)
+        value : prediction of the node
+        gain : gain of the split (nan if none)
+        n_observations : number of training observations in the node
+        depth : depth of the node in its tree
+        roots : index of the root node of each tree
+    Leafs may still have a variable and threshold (the best split found that was not performed).
+    """
+
+    ARRAYS = ("variable", "threshold", "left", "right", "value", "gain", "n_observations", "depth", "roots")
+
+    def __init__(self, variable: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, gain: np.ndarray, n_observations: np.ndarray, depth: np.ndarray,
+                 roots: np.ndarray):
+        self.variable = np.asarray(variable, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.gain = np.asarray(gain, dtype=np.float64)
+        self.n_observations = np.asarray(n_observations, dtype=np.int64)
+        self.depth = np.asarray(depth, dtype=np.int32)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.max_depth = int(self.depth.max()) if len(self.depth) > 0 else 0
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "FlatTrees":
+        return cls(**{name: arrays[name] for name in cls.ARRAYS})
+
+    @classmethod
+    def from_branches(cls, roots: List[Branch], inputs: List[str]) -> "FlatTrees":
+        """
+        flattens the trees of the given root branches, with variables indexed in 'inputs'
+        """
+        indexes = {v: i for i, v in enumerate(inputs)}
+        nodes: List[Branch] = []
+        children: Dict[int, tuple] = {}
+        root_indexes = []
+        for root in roots:
+            root_indexes.append(len(nodes))
+            stack = [root]
+            while len(stack) > 0:
+                branch = stack.pop()
+                index = len(nodes)
+                nodes.append(branch)
+                if not branch.is_leaf:
+                    children[index] = (branch.inferior_or_equal, branch.superior)
+                    stack.extend((branch.superior, branch.inferior_or_equal))
+        positions = {id(b): i for i, b in enumerate(nodes)}
+        left = np.full(len(nodes), -1, dtype=np.int32)
+        right = np.full(len(nodes), -1, dtype=np.int32)
+        for i, (inf, sup) in children.items():
+            left[i], right[i] = positions[id(inf)], positions[id(sup)]
+        return cls(variable=[-1 if b.variable is None else indexes[b.variable] for b in nodes],
+                   threshold=[np.nan if b.threshold is None else b.threshold for b in nodes],
+                   left=left, right=right,
+                   value=[np.nan if b.value is None else b.value for b in nodes],
+                   gain=[np.nan if b.gain is None else b.gain for b in nodes],
+                   n_observations=[b.n_observations for b in nodes],
+                   depth=[b.depth for b in nodes],
+                   roots=root_indexes)
+
+    def to_branches(self, inputs: List[str], value_type: type = float) -> List[Branch]:
+        """
+        returns the root Branch of each tree
+        """
+        nodes = []
+        for i in range(len(self.variable)):
+            branch = Branch.__new__(Branch)
+            branch.n_observations = int(self.n_observations[i])
+            branch.depth = int(self.depth[i])
+            branch.value = None if np.isnan(self.value[i]) else value_type(self.value[i])
+            branch.variable = None if self.variable[i] < 0 else inputs[self.variable[i]]
+            branch.threshold = None if np.isnan(self.threshold[i]) else float(self.threshold[i])
+            branch.gain = None if np.isnan(self.gain[i]) else float(self.gain[i])
+            nodes.append(branch)
+        for branch, left, right in zip(nodes, self.left, self.right):
+            branch.inferior_or_equal = None if left < 0 else nodes[left]
+            branch.superior = None if right < 0 else nodes[right]
+        return [nodes[i] for i in self.roots]
+
+    def evaluate(self, X: np.ndarray, trees: Optional[slice] = None, max_elements: int = 2**22) -> np.ndarray:
+        """
+        Returns the prediction of each tree for each observation
+
+        Parameters
+        ----------
+        X : np.ndarray
+            array of floats of shape (n_observations, n_variables)
+        trees : slice or None
+            the range of trees to evaluate, or None for all of them
+        max_elements : int
+            the trees are evaluated in blocks of at most max_elements (tree, observation) pairs
+
+        Returns
+        -------
+        np.ndarray :
+            array of floats of shape (n_trees, n_observations).
+            The prediction is nan for observations with a missing value in one of the splits they go through.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        roots = self.roots if trees is None else self.roots[trees]
+        n_obs = len(X)
+        result = np.empty((len(roots), n_obs), dtype=np.float64)
+        if n_obs == 0 or len(roots) == 0:
+            return result
+        block = max(1, max_elements // n_obs)
+        observations = np.arange(n_obs)[None, :]
+        for start in range(0, len(roots), block):
+            nodes = np.repeat(roots[start:start+block, None], n_obs, axis=1)
+            valid = np.ones(nodes.shape, dtype=bool)
+            for _ in range(self.max_depth):
+                left = self.left[nodes]
+                internal = left >= 0
+                if not internal.any():
+                    break
+                x = X[observations, self.variable[nodes]]
+                valid &= ~(internal & np.isnan(x))
+                nodes = np.where(internal, np.where(x <= self.threshold[nodes], left, self.right[nodes]), nodes)
+            values = self.value[nodes]
+            values[~valid] = np.nan
+            result[start:start+block] = values
+        return result
@@ -1,5 +1,7 @@
+import json
 from ._decision_tree import DecisionTreeRegressor, DATAFRAME_LIKE
-from typing import List, Iterable, Optional, Union, Tuple
+from ._flat_trees import FlatTrees
+from typing import Dict, List, Iterable, Optional, Union, Tuple
 from itertools import repeat
 from warnings import warn
 import pandas as pd
@@ -18,9 +20,29 @@ class GradientBoostingClassifier(Model):
         self.inputs = inputs
         self.target = target
         self.classes = classes
-        self.trees: List[Tuple(float, DecisionTreeRegressor)] = []
+        self.trees: List[Tuple[float, List[DecisionTreeRegressor]]] = []
         self._class_to_index = {c: i for i, c in enumerate(classes)}
 
+    @property
+    def trees(self) -> List[Tuple[float, List[DecisionTreeRegressor]]]:
+        """
+        the list of (learning rate, [tree for each class]),
+        rebuilt from the flat trees on first access if loaded from a '.npz' file
+        """
+        if self._trees is None:
+            metadata = {"inputs": self.inputs, "target": self.target, "monotonicity_constraints": {}}
+            roots = self._flat.to_branches(self.inputs)
+            n_classes = len(self.classes)
+            self._trees = [(float(lr), [DecisionTreeRegressor._from_root(root, metadata)
+                                        for root in roots[i*n_classes:(i+1)*n_classes]])
+                           for i, lr in enumerate(self._learning_rates)]
+        return self._trees
+
+    @trees.setter
+    def trees(self, other: List[Tuple[float, List[DecisionTreeRegressor]]]):
+        self._trees = other
+        self._flat = None
+
     def fit(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
             n_trees: int=100, learning_rate: float=0.1,
             max_depth: Optional[int]=None, min_leaf_size: int=1,
@@ -72,10 +94,24 @@ class GradientBoostingClassifier(Model):
         """
         Returns all individual prediction stages without formating
         """
+        df = DecisionTreeRegressor._as_dataframe(self, df)
         predicted = np.zeros((len(self.classes), len(df)))
-        for lr, trees in self.trees:
-            predicted += lr * np.stack([tree.predict(df) for tree in trees], axis=0)
+        flat = self.flat_trees
+        values = flat.evaluate(df[self.inputs].to_numpy(dtype=np.float64))
+        values = values.reshape(-1, len(self.classes), len(df))
+        for lr, value in zip(self._learning_rates, values):
+            predicted += lr * value
             yield predicted
+
+    @property
+    def flat_trees(self) -> FlatTrees:
+        """
+        the array based representation of all the trees (for each stage, one tree per class), used for evaluation
+        """
+        if self._trees is not None and (self._flat is None or self._flat.n_trees != sum(len(trees) for _, trees in self._trees)):
+            self._flat = FlatTrees.from_branches([tree.root for _, trees in self._trees for tree in trees], self.inputs)
+            self._learning_rates = np.array([lr for lr, _ in self._trees], dtype=np.float64)
+        return self._flat
         
     def _format_prediction(self, predicted: np.ndarray, probabilities: bool=False, index: bool=False) -> Union[pd.DataFrame, np.ndarray, List[str]]:
         """
@@ -107,11 +143,7 @@ class GradientBoostingClassifier(Model):
 
     @property
     def dump(self) -> dict:
-        return {"type": type(self).__name__,
-                "inputs": list(self.inputs),
-                "target": self.target,
-                "classes": list(self.classes),
-                "trees": [[lr, [tree.dump for tree in trees]] for lr, trees in self.trees]}
+        return {**self._metadata, "trees": [[lr, [tree.dump for tree in trees]] for lr, trees in self.trees]}
 
     @classmethod
     def from_dump(cls, dump: dict) -> "GradientBoostingClassifier":
@@ -120,8 +152,41 @@ class GradientBoostingClassifier(Model):
         obj.inputs = dump["inputs"]
         obj.target = dump["target"]
         obj.classes = dump["classes"]
+        obj._class_to_index = {c: i for i, c in enumerate(obj.classes)}
         return obj
 
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        flat = self.flat_trees
+        return {**flat.arrays, "learning_rates": self._learning_rates,
+                "metadata": np.array(json.dumps(self._metadata))}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "GradientBoostingClassifier":
+        """
+        loads the model from its flat arrays, the trees are only rebuilt as Branch objects if accessed
+        """
+        metadata = json.loads(str(arrays["metadata"]))
+        obj = cls.__new__(cls)
+        obj.inputs = metadata["inputs"]
+        obj.target = metadata["target"]
+        obj.classes = metadata["classes"]
+        obj._class_to_index = {c: i for i, c in enumerate(obj.classes)}
+        obj._trees = None
+        obj._flat = FlatTrees.from_arrays(arrays)
+        obj._learning_rates = np.asarray(arrays["learning_rates"], dtype=np.float64)
+        return obj
+
+    @property
+    def _metadata(self) -> dict:
+        """
+        the dump of the model, excluding its trees
+        """
+        return {"type": type(self).__name__,
+                "inputs": list(self.inputs),
+                "target": self.target,
+                "classes": list(self.classes)}
+
     @property
     def feature_importances(self) -> dict[str: dict]:
         """
@@ -1,10 +1,12 @@
-from typing import List, Dict, Iterable, Optional, Union
+import json
+from typing import List, Dict, Iterable, Optional, Union, Tuple
 from itertools import repeat
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import torch
 from ._decision_tree import DecisionTreeRegressor, DATAFRAME_LIKE, MONOTONICITY
+from ._flat_trees import FlatTrees
 from pygmalion._model import Model
 
 
@@ -18,9 +20,26 @@ class GradientBoostingRegressor(Model):
         """
         self.inputs = inputs
         self.target = target
-        self.trees : List[DecisionTreeRegressor] = []
+        self.trees : List[Tuple[float, DecisionTreeRegressor]] = []
         self.monotonicity_constraints = monotonicity_constraints
 
+    @property
+    def trees(self) -> List[Tuple[float, DecisionTreeRegressor]]:
+        """
+        the list of (learning rate, tree), rebuilt from the flat trees on first access if loaded from a '.npz' file
+        """
+        if self._trees is None:
+            metadata = self._metadata
+            roots = self._flat.to_branches(self.inputs)
+            self._trees = [(float(lr), DecisionTreeRegressor._from_root(root, metadata))
+                           for lr, root in zip(self._learning_rates, roots)]
+        return self._trees
+
+    @trees.setter
+    def trees(self, other: List[Tuple[float, DecisionTreeRegressor]]):
+        self._trees = other
+        self._flat = None
+
     def fit(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
             n_trees: int=100, learning_rate: float=0.1,
             max_depth: Optional[int]=None, min_leaf_size: int=1,
@@ -70,17 +89,25 @@ class GradientBoostingRegressor(Model):
         """
         df = DecisionTreeRegressor._as_dataframe(self, df)
         predicted = np.zeros(len(df))
-        for lr, tree in self.trees:
-            predicted = predicted + lr * tree.predict(df)
+        flat = self.flat_trees
+        values = flat.evaluate(df[self.inputs].to_numpy(dtype=np.float64))
+        for lr, value in zip(self._learning_rates, values):
+            predicted = predicted + lr * value
             yield predicted
 
+    @property
+    def flat_trees(self) -> FlatTrees:
+        """
+        the array based representation of all the trees, used for evaluation
+        """
+        if self._trees is not None and (self._flat is None or self._flat.n_trees != len(self._trees)):
+            self._flat = FlatTrees.from_branches([tree.root for _, tree in self._trees], self.inputs)
+            self._learning_rates = np.array([lr for lr, _ in self._trees], dtype=np.float64)
+        return self._flat
+
     @property
     def dump(self) -> dict:
-        return {"type": type(self).__name__,
-                "inputs": list(self.inputs),
-                "target": self.target,
-                "trees": [[lr, tree.dump] for lr, tree in self.trees],
-                "monotonicity_constraints": self.monotonicity_constraints}
+        return {**self._metadata, "trees": [[lr, tree.dump] for lr, tree in self.trees]}
 
     @classmethod
     def from_dump(cls, dump: dict) -> "GradientBoostingRegressor":
@@ -91,6 +118,37 @@ class GradientBoostingRegressor(Model):
         obj.monotonicity_constraints = {k: MONOTONICITY(v) for k, v in dump["monotonicity_constraints"].items()}
         return obj
 
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        flat = self.flat_trees
+        return {**flat.arrays, "learning_rates": self._learning_rates,
+                "metadata": np.array(json.dumps(self._metadata))}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "GradientBoostingRegressor":
+        """
+        loads the model from its flat arrays, the trees are only rebuilt as Branch objects if accessed
+        """
+        metadata = json.loads(str(arrays["metadata"]))
+        obj = cls.__new__(cls)
+        obj.inputs = metadata["inputs"]
+        obj.target = metadata["target"]
+        obj.monotonicity_constraints = {k: MONOTONICITY(v) for k, v in metadata["monotonicity_constraints"].items()}
+        obj._trees = None
+        obj._flat = FlatTrees.from_arrays(arrays)
+        obj._learning_rates = np.asarray(arrays["learning_rates"], dtype=np.float64)
+        return obj
+
+    @property
+    def _metadata(self) -> dict:
+        """
+        the dump of the model, excluding its trees
+        """
+        return {"type": type(self).__name__,
+                "inputs": list(self.inputs),
+                "target": self.target,
+                "monotonicity_constraints": self.monotonicity_constraints}
+
     @property
     def feature_importances(self) -> dict:
         """
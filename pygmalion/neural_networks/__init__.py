@@ -1,10 +1,45 @@
-from ._dense_classifier import DenseClassifier
-from ._dense_regressor import DenseRegressor
-from ._image_classifier import ImageClassifier
-from ._image_segmenter import ImageSegmenter
-from ._image_object_detector import ImageObjectDetector
-from ._probability_distribution import ProbabilityDistribution
-from ._text_translator import TextTranslator
-from ._text_classifier import TextClassifier
-from ._text_segmenter import TextSegmenter
-from ._time_series_regressor import TimeSeriesRegressor
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "DenseClassifier": "._dense_classifier",
+    "DenseRegressor": "._dense_regressor",
+    "ImageClassifier": "._image_classifier",
+    "ImageSegmenter": "._image_segmenter",
+    "ImageObjectDetector": "._image_object_detector",
+    "ProbabilityDistribution": "._probability_distribution",
+    "TextTranslator": "._text_translator",
+    "TextClassifier": "._text_classifier",
+    "TextSegmenter": "._text_segmenter",
+    "TimeSeriesRegressor": "._time_series_regressor",
+    "Prefetcher": "._prefetcher",
+    "Telemetry": "._telemetry",
+    "Profiler": "._profiler",
+    "MicroBatcher": "._micro_batching",
+    "CombinedOptimizer": "._optimizer",
+    "plan_checkpointing": "._checkpointing",
+    "apply_checkpointing": "._checkpointing",
+    "quantization_report": "._quantization"
+}
+__all__ = list(_ATTRIBUTES) + ["layers"]
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES, ("layers",))
+
+if TYPE_CHECKING:
+    from . import layers
+    from ._dense_classifier import DenseClassifier
+    from ._dense_regressor import DenseRegressor
+    from ._image_classifier import ImageClassifier
+    from ._image_segmenter import ImageSegmenter
+    from ._image_object_detector import ImageObjectDetector
+    from ._probability_distribution import ProbabilityDistribution
+    from ._text_translator import TextTranslator
+    from ._text_classifier import TextClassifier
+    from ._text_segmenter import TextSegmenter
+    from ._time_series_regressor import TimeSeriesRegressor
+    from ._prefetcher import Prefetcher
+    from ._telemetry import Telemetry
+    from ._profiler import Profiler
+    from ._micro_batching import MicroBatcher
+    from ._optimizer import CombinedOptimizer
+    from ._checkpointing import plan_checkpointing, apply_checkpointing
+    from ._quantization import quantization_report
@@ -0,0 +1,134 @@
+import os
+import pathlib
+import torch
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, List, Tuple, Union
+
+
+class CheckpointWriter:
+    """
+    Writes training checkpoints to the disk in a background thread.
+
+    The state dicts of the model and optimizer are copied to CPU on the calling thread,
+    then serialized by a worker thread, written to a temporary file and renamed atomically,
+    so that an interruption while writing never corrupts a previous checkpoint.
+    The checkpoints are written in order, with at most one pending write at a time.
+
+    Each checkpoint is a '.ckpt' file containing a dict with keys
+    {"step", "metric", "model", "optimizer"}, that can be loaded back
+    with 'NeuralNetwork.load_checkpoint' (and not with 'load_model', as it is not a pickled model).
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path], prefix: str = "model",
+                 n_digits: int = 1, keep_last: Optional[int] = None,
+                 keep_best: int = 0):
+        """
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            the directory in which the checkpoints are written
+        prefix : str
+            prefix of the checkpoint filenames (the suffix is the step number)
+        n_digits : int
+            the step number in the filename is padded with zeros to this number of digits
+        keep_last : int or None
+            if provided, only the 'keep_last' most recent checkpoints
+            (as well as the 'keep_best' best ones) are kept on disk,
+            the others are deleted
+        keep_best : int
+            number of checkpoints with the lowest metric that are kept on disk
+            if 'keep_last' is not None
+        """
+        self.directory = pathlib.Path(directory)
+        if not self.directory.is_dir():
+            raise NotADirectoryError(f"Backup path is not a valid directory: '{self.directory}'")
+        self.prefix = prefix
+        self.n_digits = n_digits
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.written: List[Tuple[int, float, pathlib.Path]] = []
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+
+    def save(self, step: int, model: torch.nn.Module,
+             optimizer: Optional[torch.optim.Optimizer] = None,
+             metric: Optional[float] = None) -> pathlib.Path:
+        """
+        snapshots the states of the model and optimizer, and writes them to the disk in the background
+
+        Returns
+        -------
+        pathlib.Path :
+            path of the checkpoint file being written
+        """
+        self.wait()
+        checkpoint = {"step": step,
+                      "metric": metric,
+                      "model": _to_cpu(model.state_dict()),
+                      "optimizer": _to_cpu(optimizer.state_dict()) if optimizer is not None else None}
+        path = self.directory / f"{self.prefix}_{step:0{self.n_digits}}.ckpt"
+        self._pending = self._executor.submit(self._write, checkpoint, path)
+        return path
+
+    def wait(self):
+        """
+        waits for the pending write to end, and raise the exception that occured in the worker if any
+        """
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self):
+        """
+        waits for the pending write and stops the background thread
+        """
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _write(self, checkpoint: dict, path: pathlib.Path):
+        """
+        write the checkpoint atomically, then apply the retention policy
+        """
+        temporary = path.with_name(path.name + ".tmp")
+        try:
+            with open(temporary, "wb") as file:
+                torch.save(checkpoint, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        finally:
+            temporary.unlink(missing_ok=True)
+        self.written = [w for w in self.written if w[-1] != path]
+        metric = checkpoint["metric"]
+        self.written.append((checkpoint["step"], float("inf") if metric is None else metric, path))
+        self._apply_retention()
+
+    def _apply_retention(self):
+        """
+        delete the checkpoints that are neither in the last nor the best ones
+        """
+        if self.keep_last is None:
+            return
+        latest = sorted(self.written, key=lambda w: w[0])[-self.keep_last:] if self.keep_last > 0 else []
+        best = sorted(self.written, key=lambda w: w[1])[:self.keep_best]
+        kept = {w[-1] for w in latest + best}
+        for _, _, path in self.written:
+            if path not in kept:
+                path.unlink(missing_ok=True)
+        self.written = [w for w in self.written if w[-1] in kept]
+
+
+def _to_cpu(obj: object) -> object:
+    """
+    recursively copies the tensors of a (nested) state dict to CPU
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    elif isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    else:
+        return obj
@@ -0,0 +1,129 @@
+import torch
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from .layers._checkpointing import GRADIENT_CHECKPOINTING
+from .layers.transformers import TransformerEncoder, TransformerDecoder
+from .layers.convolutions import ConvolutionalEncoder, ConvolutionalDecoder, PaddedConv2d
+from ._micro_batching import activations_memory, static_memory
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork, PRECISION
+
+
+STACKS = (TransformerEncoder, TransformerDecoder, ConvolutionalEncoder, ConvolutionalDecoder)
+
+
+def plan_checkpointing(model: "NeuralNetwork", batch: tuple, memory_budget: int,
+                       optimizer: Optional[torch.optim.Optimizer] = None,
+                       precision: "PRECISION" = "fp32") -> Dict[str, GRADIENT_CHECKPOINTING]:
+    """
+    Chooses which stages of the transformer and convolution stacks (and which PaddedConv2d layers
+    outside of these stacks) are checkpointed, so that training on batches similar to the given one
+    fits in the memory budget, with as little recomputation as possible.
+
+    The memory of the activations saved for backward by each stage is measured without checkpointing
+    (see 'activations_memory'). Checkpointing a stage frees its activations but its inputs,
+    and the activations of one checkpointed stage are recomputed at a time during backward.
+    The stages freeing the most memory are checkpointed first, until the estimated training memory
+    fits in the budget. The layers inside of a checkpointed stage are never checkpointed themselves.
+    If the budget is already met without checkpointing, nothing is checkpointed.
+
+    Parameters
+    ----------
+    model : NeuralNetwork
+        the model to train
+    batch : tuple
+        a training batch (the *args of the model's loss, as returned by 'data_to_tensor')
+    memory_budget : int
+        memory in bytes available for training, including the parameters,
+        gradients and optimizer states
+    optimizer : torch.optim.Optimizer or None
+        the optimizer, used to estimate the memory of its states
+    precision : one of {"fp32", "bf16", "fp16"}
+        precision of the forward computations
+
+    Returns
+    -------
+    dict :
+        the plan, a dict of {module name: gradient_checkpointing}, with gradient_checkpointing
+        the tuple of indexes of the checkpointed stages for stacks, or a bool for PaddedConv2d layers.
+        It can be applied to the model with 'apply_checkpointing'.
+    """
+    units = _units(model)
+    previous = {name: module.gradient_checkpointing for name, module in model.named_modules()
+                if isinstance(module, STACKS + (PaddedConv2d,))}
+    apply_checkpointing(model, {name: False for name in previous})
+    active: List[int] = []
+    saved = [dict() for _ in units]
+    inputs = [0 for _ in units]
+
+    def pre_hook(index: int):
+        def hook(module, args):
+            active.append(index)
+            inputs[index] += sum(a.numel() * a.element_size() for a in args if isinstance(a, torch.Tensor))
+        return hook
+
+    def hook(module, args, output):
+        active.pop()
+
+    def on_saved(pointer: int, size: int):
+        for index in active:
+            saved[index][pointer] = size
+
+    handles = [h for index, (_, _, module) in enumerate(units)
+               for h in (module.register_forward_pre_hook(pre_hook(index)), module.register_forward_hook(hook))]
+    try:
+        total = activations_memory(model, batch, precision, on_saved=on_saved) + static_memory(model, optimizer)
+    finally:
+        for handle in handles:
+            handle.remove()
+        apply_checkpointing(model, previous)
+    activations = [sum(s.values()) for s in saved]
+    savings = [max(0, a - i) for a, i in zip(activations, inputs)]
+    # checkpoint the units freeing the most memory first, skipping the units nested in a checkpointed one
+    checkpointed: List[int] = []
+    recomputed = 0
+    for index in sorted(range(len(units)), key=lambda i: -savings[i]):
+        if total - sum(savings[i] for i in checkpointed) + recomputed <= memory_budget:
+            break
+        if savings[index] == 0 or any(_nested(units[index][0], units[i][0]) for i in checkpointed):
+            continue
+        checkpointed.append(index)
+        recomputed = max(recomputed, activations[index])
+    plan = {}
+    for i, (name, stage, _) in enumerate(units):
+        if stage is None:
+            plan[name] = i in checkpointed
+        else:
+            stack = name.rsplit(".stages.", 1)[0]
+            plan.setdefault(stack, ())
+            if i in checkpointed:
+                plan[stack] += (stage,)
+    return plan
+
+
+def apply_checkpointing(model: torch.nn.Module, plan: Dict[str, GRADIENT_CHECKPOINTING]):
+    """
+    sets the 'gradient_checkpointing' of the stacks and layers of the model, as returned by 'plan_checkpointing'
+    """
+    for name, gradient_checkpointing in plan.items():
+        model.get_submodule(name).gradient_checkpointing = gradient_checkpointing
+
+
+def _units(model: torch.nn.Module) -> List[Tuple[str, Optional[int], torch.nn.Module]]:
+    """
+    returns the (name, stage index or None, module) of the modules that can be checkpointed:
+    the stages of the stacks, and the PaddedConv2d layers
+    """
+    units = []
+    for name, module in model.named_modules():
+        if isinstance(module, STACKS):
+            units.extend((f"{name}.stages.{i}", i, stage) for i, stage in enumerate(module.stages))
+        elif isinstance(module, PaddedConv2d):
+            units.append((name, None, module))
+    return units
+
+
+def _nested(name: str, other: str) -> bool:
+    """
+    returns True if one of the two modules is a submodule of the other
+    """
+    return name.startswith(other + ".") or other.startswith(name + ".") or name == other
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from typing import List, Iterable, Optional, Union
 from warnings import warn
+from itertools import islice
 from tqdm import tqdm
 from pygmalion.tokenizers._utilities import Tokenizer
 
@@ -235,3 +236,54 @@ def tensor_to_strings(tensor: torch.Tensor, tokenizer: Tokenizer) -> List[str]:
     """
     sentences = tensor_to_longs(tensor)[:, 1:-1]
     return [tokenizer.decode(s) for s in sentences]
+
+
+def split_batches(data: Union[pd.DataFrame, dict, Iterable],
+                  batch_size: int) -> Iterable[Union[pd.DataFrame, dict, list]]:
+    """
+    yields successive batches of at most 'batch_size' observations of the data, in order.
+    The data can be a dataframe, a dict of columns, a sequence of observations,
+    or an iterable of observations (such as a generator of images) which is then consumed lazily
+    (the batches of numpy arrays are stacked).
+    """
+    if batch_size < 1:
+        raise ValueError(f"'batch_size' must be a strictly positive integer, got {batch_size}")
+    if isinstance(data, pd.DataFrame):
+        for i in range(0, len(data), batch_size):
+            yield data.iloc[i:i+batch_size]
+    elif isinstance(data, dict):
+        if not any(hasattr(v, "__iter__") and not isinstance(v, str) for v in data.values()):
+            yield data  # a single observation
+            return
+        n = max(len(v) for v in data.values())
+        for i in range(0, n, batch_size):
+            yield {k: _slice(v, i, i+batch_size) for k, v in data.items()}
+    elif hasattr(data, "__len__") and hasattr(data, "__getitem__"):
+        for i in range(0, len(data), batch_size):
+            yield _slice(data, i, i+batch_size)
+    else:
+        iterator = iter(data)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if len(batch) == 0:
+                break
+            yield np.stack(batch) if all(isinstance(b, np.ndarray) for b in batch) else batch
+
+
+def concatenate_batches(predictions: List[Union[pd.DataFrame, np.ndarray, list]]) -> Union[pd.DataFrame, np.ndarray, list]:
+    """concatenates the predictions made on successive batches of observations"""
+    first = predictions[0]
+    if isinstance(first, pd.DataFrame):
+        return pd.concat(predictions, ignore_index=True)
+    elif isinstance(first, np.ndarray):
+        return np.concatenate(predictions, axis=0)
+    elif isinstance(first, list):
+        return [p for batch in predictions for p in batch]
+    raise TypeError(f"Cannot concatenate predictions of type '{type(first).__name__}'")
+
+
+def _slice(data: Iterable, start: int, end: int) -> Iterable:
+    """positional slicing of a sequence, series or array"""
+    if isinstance(data, pd.Series):
+        return data.iloc[start:end]
+    return data[start:end]
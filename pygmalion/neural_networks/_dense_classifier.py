@@ -6,6 +6,7 @@ from ._conversions import named_to_tensor, tensor_to_probabilities
 from ._neural_network import NeuralNetworkClassifier
 from ._loss_functions import cross_entropy
 from .layers import Normalizer, Dense
+from ._freezing import fold_normalizer
 
 
 class DenseClassifier(NeuralNetworkClassifier):
@@ -63,6 +64,14 @@ class DenseClassifier(NeuralNetworkClassifier):
     def device(self) -> torch.device:
         return self.output.weight.device
 
+    def _freeze(self):
+        """
+        folds the input normalizer into the first linear layer
+        """
+        first = self.layers[0].linear if len(self.layers) > 0 else self.output
+        fold_normalizer(self.input_normalizer, first)
+        self.input_normalizer = torch.nn.Identity()
+
     def _x_to_tensor(self, x: Union[pd.DataFrame, dict, Iterable],
                      device: Optional[torch.device] = None):
         return named_to_tensor(x, list(self.inputs), device=device)
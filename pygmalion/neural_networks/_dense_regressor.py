@@ -7,6 +7,7 @@ from ._conversions import named_to_tensor, tensor_to_dataframe
 from ._neural_network import NeuralNetwork
 from ._loss_functions import MSE
 from .layers import Normalizer, Dense
+from ._freezing import fold_normalizer, fold_unscale
 
 
 class DenseRegressor(NeuralNetwork):
@@ -74,6 +75,17 @@ class DenseRegressor(NeuralNetwork):
     def device(self) -> torch.device:
         return self.output.weight.device
 
+    def _freeze(self):
+        """
+        folds the input normalizer into the first linear layer, and the target unscaling into the output layer
+        """
+        first = self.layers[0].linear if len(self.layers) > 0 else self.output
+        fold_normalizer(self.input_normalizer, first)
+        self.input_normalizer = torch.nn.Identity()
+        if self.target_normalizer is not None:
+            fold_unscale(self.output, self.target_normalizer)
+            self.target_normalizer = None
+
     def _x_to_tensor(self, x: Union[pd.DataFrame, dict, Iterable],
                      device: Optional[torch.device] = None):
         return named_to_tensor(x, list(self.inputs), device=device)
@@ -0,0 +1,245 @@
+"""
+Utilities for data-parallel training of NeuralNetwork models
+over several local processes with 'torch.distributed' (gloo backend)
+"""
+import io
+import socket
+import traceback
+import multiprocessing
+import torch
+import torch.distributed as dist
+from time import sleep
+from typing import Iterable, List, Union, TYPE_CHECKING
+from .layers import Normalizer
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork
+
+
+def is_distributed() -> bool:
+    """
+    returns True if a process group with several processes is initialized
+    """
+    return dist.is_available() and dist.is_initialized() and dist.get_world_size() > 1
+
+
+class Shard:
+    """
+    Iterable over the batches of an other iterable that are attributed to the current process:
+    the batches of index i such that i % world_size == rank
+    """
+
+    def __init__(self, iterable: Iterable, rank: int, world_size: int):
+        self.iterable = iterable
+        self.rank = rank
+        self.world_size = world_size
+
+    def __iter__(self):
+        for i, item in enumerate(self.iterable):
+            if i % self.world_size == self.rank:
+                yield item
+
+
+def shard(data: Union[tuple, Iterable], rank: int, world_size: int) -> Union[tuple, Iterable]:
+    """
+    returns the part of the data attributed to the current process.
+    If 'data' is a single batch (a tuple), the tensors of the batch are split along their first dimension,
+    otherwise each process gets a share of the batches yielded.
+    """
+    if isinstance(data, tuple):
+        return tuple(torch.tensor_split(t, world_size)[rank] if isinstance(t, torch.Tensor) else t
+                     for t in data)
+    else:
+        return Shard(data, rank, world_size)
+
+
+def broadcast_state(module: torch.nn.Module, src: int = 0):
+    """
+    overwrites inplace the parameters and buffers of the module with those of the 'src' process
+    """
+    with torch.no_grad():
+        for t in module.state_dict().values():
+            dist.broadcast(t, src)
+
+
+def all_reduce_gradients(parameters: Iterable[torch.nn.Parameter],
+                         sparse: Iterable[torch.nn.Parameter] = ()):
+    """
+    sums inplace the gradients of the parameters over all processes, in a single collective.
+    Parameters without gradient get a zero gradient, so that all processes reduce the same tensors.
+    The gradients of the 'sparse' parameters are reduced as dense tensors,
+    and converted back to sparse row gradients.
+    """
+    sparse = {id(p) for p in sparse}
+    trained = [p for p in parameters if p.requires_grad]
+    for p in trained:
+        if p.grad is None:
+            p.grad = torch.zeros_like(p)
+    if len(trained) == 0:
+        return
+    grads = [p.grad.to_dense() if p.grad.is_sparse else p.grad for p in trained]
+    flat = torch.cat([g.reshape(-1) for g in grads])
+    dist.all_reduce(flat, op=dist.ReduceOp.SUM)
+    with torch.no_grad():
+        torch._foreach_copy_(grads, [f.view_as(g) for f, g in zip(torch.split(flat, [g.numel() for g in grads]), grads)])
+        for p, g in zip(trained, grads):
+            if id(p) in sparse:
+                p.grad = g.to_sparse(1)
+
+
+def all_reduce_sum(values: List[float]) -> List[float]:
+    """
+    sums the given scalar values (floats or scalar tensors) over all processes
+    """
+    t = torch.tensor([float(v) for v in values], dtype=torch.float64)
+    dist.all_reduce(t, op=dist.ReduceOp.SUM)
+    return t.tolist()
+
+
+def broadcast_flag(flag: bool, src: int = 0) -> bool:
+    """
+    returns the value of the flag of the 'src' process
+    """
+    t = torch.tensor([flag], dtype=torch.uint8)
+    dist.broadcast(t, src)
+    return bool(t.item())
+
+
+class NormalizerSynchronizer:
+    """
+    Synchronizes the running statistics of the Normalizer layers of a model across processes.
+
+    The running mean and variance are converted to additive statistics
+    (count, sum, sum of squares), and the statistics accumulated by each process
+    since the last synchronization are summed over all processes.
+    The result is the same as if all processes had seen all the batches.
+    """
+
+    def __init__(self, module: torch.nn.Module):
+        self.normalizers: List[Normalizer] = [m for m in module.modules() if isinstance(m, Normalizer)]
+        self._base = self._statistics()
+
+    def synchronize(self):
+        """
+        merges the running statistics of all processes
+        """
+        if len(self.normalizers) == 0:
+            return
+        statistics = self._statistics()
+        delta = statistics - self._base
+        dist.all_reduce(delta, op=dist.ReduceOp.SUM)
+        self._base = self._base + delta
+        self._load(self._base)
+
+    def _statistics(self) -> torch.Tensor:
+        """
+        returns the flat tensor of concatenated (count, sum, sum of squares) of each normalizer
+        """
+        stats = []
+        for m in self.normalizers:
+            n = float(m.n_observations)
+            mean, var = m.running_mean.detach().double().cpu(), m.running_var.detach().double().cpu()
+            stats.extend([torch.tensor([n], dtype=torch.float64), n * mean, n * (var + mean**2)])
+        return torch.cat(stats) if len(stats) > 0 else torch.zeros(0, dtype=torch.float64)
+
+    def _load(self, statistics: torch.Tensor):
+        """
+        set the running statistics of the normalizers from the flat additive statistics
+        """
+        i = 0
+        for m in self.normalizers:
+            n, S1, S2 = statistics[i], statistics[i+1:i+1+m.num_features], statistics[i+1+m.num_features:i+1+2*m.num_features]
+            i += 1 + 2*m.num_features
+            if n <= 0:
+                continue
+            mean = S1 / n
+            var = torch.clamp_min(S2 / n - mean**2, 0.)
+            m.running_mean.data.copy_(mean)
+            m.running_var.data.copy_(var)
+            m.n_observations = n.item()
+
+
+def spawn_fit(model: "NeuralNetwork", n_processes: int, fit_kwargs: dict) -> tuple:
+    """
+    Trains the model with data parallelism over 'n_processes' forked local processes.
+    The model state at the end of training is loaded back inplace into 'model',
+    and the optimizer state into the optimizer of 'fit_kwargs' if one was provided,
+    so that the training can be resumed in the parent process.
+
+    Parameters
+    ----------
+    model : NeuralNetwork
+        the model to train
+    n_processes : int
+        the number of processes
+    fit_kwargs : dict
+        the kwargs passed to the 'fit' method of the model in each process
+
+    Returns
+    -------
+    tuple :
+        the results of the 'fit' method of the process of rank 0
+    """
+    context = multiprocessing.get_context("fork")
+    results = context.SimpleQueue()
+    port = _free_port()
+    n_threads = max(1, torch.get_num_threads() // n_processes)
+    processes = [context.Process(target=_fit_worker, args=(model, rank, n_processes, port, n_threads, fit_kwargs, results))
+                 for rank in range(n_processes)]
+    for p in processes:
+        p.start()
+    try:
+        while results.empty():
+            if any(p.exitcode not in (None, 0) for p in processes):
+                raise RuntimeError("A training process exited unexpectedly")
+            sleep(0.1)
+        error, fit_results, state, optimizer_state, n_observations = results.get()
+        if error is not None:
+            raise RuntimeError(f"Exception raised in training process of rank 0:\n{error}")
+        for p in processes:
+            p.join()
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+    model.load_state_dict(torch.load(io.BytesIO(state), map_location=model.device))
+    optimizer = fit_kwargs.get("optimizer")
+    if optimizer is not None:
+        optimizer.load_state_dict(torch.load(io.BytesIO(optimizer_state), map_location=model.device))
+    for m, n in zip((m for m in model.modules() if isinstance(m, Normalizer)), n_observations):
+        m.n_observations = n
+    return fit_results
+
+
+def _fit_worker(model: "NeuralNetwork", rank: int, world_size: int, port: int, n_threads: int,
+                fit_kwargs: dict, results: multiprocessing.SimpleQueue):
+    """
+    The function ran by each process spawned by 'spawn_fit'
+    """
+    torch.set_num_threads(n_threads)
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        fit_results = model.fit(**fit_kwargs)
+    except Exception:
+        if rank == 0:
+            results.put((traceback.format_exc(), None, None, None, None))
+        raise
+    finally:
+        dist.destroy_process_group()
+    if rank == 0:
+        buffer = io.BytesIO()
+        torch.save(model.state_dict(), buffer)
+        optimizer = fit_kwargs.get("optimizer")
+        optimizer_buffer = io.BytesIO()
+        if optimizer is not None:
+            torch.save(optimizer.state_dict(), optimizer_buffer)
+        n_observations = [m.n_observations for m in model.modules() if isinstance(m, Normalizer)]
+        results.put((None, fit_results, buffer.getvalue(), optimizer_buffer.getvalue(), n_observations))
+
+
+def _free_port() -> int:
+    """
+    returns a free tcp port on localhost
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,87 @@
+import copy
+import torch
+from typing import TYPE_CHECKING
+from .layers import Dense, Dropout, Normalizer
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork
+
+
+def freeze(model: "NeuralNetwork") -> "NeuralNetwork":
+    """
+    Returns an inference only copy of the model:
+        * the weights of the monotonic Dense layers are replaced by their absolute values
+        * the model specific folding of its layers is applied (see 'NeuralNetwork._freeze')
+        * the Dropout layers are replaced by identities
+        * the gradient of all parameters is disabled
+    The copy is in eval mode, and its constructor arguments are forgotten,
+    so that it can only be saved as a pickled '.pth' file.
+    """
+    frozen = copy.deepcopy(model)
+    frozen.eval()
+    for module in frozen.modules():
+        if isinstance(module, Dense) and module.monotonic:
+            module.linear.weight.data = torch.abs(module.linear.weight.data)
+            module.monotonic = False
+    frozen._freeze()
+    _strip_dropout(frozen)
+    for parameter in frozen.parameters():
+        parameter.requires_grad_(False)
+    frozen.__dict__.pop("_config", None)
+    frozen.frozen = True
+    return frozen
+
+
+def fold_normalizer(normalizer: Normalizer, linear: torch.nn.Linear):
+    """
+    Modifies in place the weights of the linear layer applied after the normalizer,
+    so that 'linear(X)' equals 'linear(normalizer(X))' with the running statistics of the normalizer.
+    The normalizer must normalize the last dimension of its input.
+    """
+    scale, mean = _statistics(normalizer)
+    with torch.no_grad():
+        weight = linear.weight.double() / scale.unsqueeze(0)
+        bias = -(weight @ mean)
+        if linear.bias is not None:
+            bias = bias + linear.bias.double()
+        linear.weight.data = weight.to(linear.weight.dtype)
+        if linear.bias is None:
+            linear.bias = torch.nn.Parameter(bias.to(linear.weight.dtype))
+        else:
+            linear.bias.data = bias.to(linear.bias.dtype)
+
+
+def fold_unscale(linear: torch.nn.Linear, normalizer: Normalizer):
+    """
+    Modifies in place the weights of the linear layer, so that 'linear(X)' equals 'normalizer.unscale(linear(X))'.
+    The normalizer must normalize the last dimension of its input.
+    """
+    scale, mean = _statistics(normalizer)
+    with torch.no_grad():
+        weight = linear.weight.double() * scale.unsqueeze(1)
+        bias = mean if linear.bias is None else linear.bias.double() * scale + mean
+        linear.weight.data = weight.to(linear.weight.dtype)
+        if linear.bias is None:
+            linear.bias = torch.nn.Parameter(bias.to(linear.weight.dtype))
+        else:
+            linear.bias.data = bias.to(linear.bias.dtype)
+
+
+def _statistics(normalizer: Normalizer) -> tuple:
+    """
+    returns the (scale, mean) of the normalizer in double precision
+    """
+    if normalizer.dim not in (-1, 1):
+        raise ValueError(f"Only normalizers of the features dimension can be folded, not of dimension {normalizer.dim}")
+    scale = (normalizer.running_var.double() + normalizer.eps)**0.5
+    return scale, normalizer.running_mean.double()
+
+
+def _strip_dropout(module: torch.nn.Module):
+    """
+    replaces recursively the Dropout layers by identities
+    """
+    for name, child in module.named_children():
+        if isinstance(child, (Dropout, torch.nn.Dropout, torch.nn.Dropout1d, torch.nn.Dropout2d)):
+            setattr(module, name, torch.nn.Identity())
+        else:
+            _strip_dropout(child)
@@ -0,0 +1,131 @@
+import torch
+from typing import Iterable, List, Optional, Tuple
+
+
+class GradientEngine:
+    """
+    Post-processes the gradients of the parameters after backpropagation
+    of the accumulated batches: averaging over the batches, L1/L2 regularization,
+    clipping, and the gradient norm.
+    All operations are vectorized over the parameters with 'torch._foreach_*' ops,
+    instead of looping over the parameters in python.
+
+    The regularization penalties are the same as for 'NeuralNetwork._norm':
+        L1 * mean(|p|) + L2 * mean(p²)**0.5
+    over all the parameters, but their gradient is added directly to the
+    parameters gradients once per step, instead of being backpropagated
+    through the loss of each batch.
+
+    Sparse gradients (of embeddings created with 'sparse=True') stay sparse:
+    they are processed through their values, and the gradient of the penalties
+    is only added for the rows present in the gradient.
+    """
+
+    def __init__(self, parameters: Iterable[torch.nn.Parameter],
+                 L1: Optional[float] = None,
+                 L2: Optional[float] = None,
+                 clipping: Optional[float] = None):
+        """
+        Parameters
+        ----------
+        parameters : Iterable of torch.nn.Parameter
+            all the parameters of the model, including the ones that do not require gradient
+        L1 : float or None
+            L1 regularization factor
+        L2 : float or None
+            L2 regularization factor
+        clipping : float or None
+            if provided, the gradients are clipped in the (-clipping, clipping) range
+        """
+        self.parameters: List[torch.nn.Parameter] = list(parameters)
+        self.L1 = L1
+        self.L2 = L2
+        self.clipping = clipping
+
+    def step(self, n_batches: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Processes inplace the gradients summed over 'n_batches' backpropagations
+
+        Returns
+        -------
+        tuple of torch.Tensor :
+            (penalty, grad_norm) the scalar regularization penalty, and the norm
+            of the gradient after processing
+        """
+        with torch.no_grad():
+            # merging the duplicate rows of the sparse gradients accumulated over batches
+            for p in self.parameters:
+                if p.grad is not None and p.grad.is_sparse:
+                    p.grad = p.grad.coalesce()
+            # averaging gradient over batches
+            grads = self._values()
+            if n_batches > 1 and len(grads) > 0:
+                torch._foreach_div_(grads, n_batches)
+            # regularization
+            penalty = self._regularize()
+            # gradient cliping
+            grads = self._values()
+            if self.clipping is not None and len(grads) > 0:
+                torch._foreach_clamp_min_(grads, -self.clipping)
+                torch._foreach_clamp_max_(grads, self.clipping)
+            # gradient norm
+            grad_norm = foreach_norm([p.grad for p in self.parameters if p.grad is not None], 1)
+        return penalty, grad_norm
+
+    def _values(self) -> List[torch.Tensor]:
+        """
+        returns the gradients of the parameters, or their values for sparse gradients,
+        that can be modified inplace
+        """
+        return [p.grad._values() if p.grad.is_sparse else p.grad
+                for p in self.parameters if p.grad is not None]
+
+    def _regularize(self) -> torch.Tensor:
+        """
+        adds the gradient of the penalties to the parameters gradient,
+        and returns the penalty
+        """
+        penalty = torch.zeros((), device=self._device)
+        if self.L1 is None and self.L2 is None:
+            return penalty
+        trained = [p for p in self.parameters if p.requires_grad and not (p.grad is not None and p.grad.is_sparse)]
+        for p in trained:
+            if p.grad is None:
+                p.grad = torch.zeros_like(p)
+        grads = [p.grad for p in trained]
+        # the rows of the parameters with sparse gradients that are regularized
+        sparse = [(p.grad._values(), p[p.grad._indices()[0]]) for p in self.parameters
+                  if p.grad is not None and p.grad.is_sparse]
+        grads += [values for values, _ in sparse]
+        trained += [rows for _, rows in sparse]
+        n = sum(p.numel() for p in self.parameters)
+        if self.L1 is not None:
+            penalty = penalty + self.L1 * foreach_norm(self.parameters, 1)
+            torch._foreach_add_(grads, torch._foreach_sign(trained), alpha=self.L1/n)
+        if self.L2 is not None:
+            norm = foreach_norm(self.parameters, 2)
+            penalty = penalty + self.L2 * norm
+            coeff = self.L2 / (n * torch.clamp_min(norm, torch.finfo(norm.dtype).tiny))
+            torch._foreach_add_(grads, torch._foreach_mul(trained, coeff))
+        return penalty
+
+    @property
+    def _device(self) -> torch.device:
+        return self.parameters[0].device if len(self.parameters) > 0 else torch.device("cpu")
+
+
+def foreach_norm(tensors: Iterable[torch.Tensor], order: int,
+                 average: bool = True) -> torch.Tensor:
+    """
+    returns the norm of the tensors
+    (normalized by number of elements)
+    Sparse tensors must be coalesced.
+    """
+    tensors = list(tensors)
+    if len(tensors) == 0:
+        return torch.zeros(())
+    norms = torch.stack(torch._foreach_norm([t._values() if t.is_sparse else t for t in tensors], order))
+    L = torch.sum(norms**order)
+    if average:
+        L = L / sum(t.numel() for t in tensors)
+    return L**(1/order)
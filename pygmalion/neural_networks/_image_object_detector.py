@@ -2,18 +2,20 @@ import torch
 import pandas as pd
 import numpy as np
 import torch.nn.functional as F
-from typing import List, Sequence, Iterable, Tuple, Optional
+from typing import List, Sequence, Iterable, Iterator, Tuple, Optional
 from itertools import count
 from .layers.convolutions import ConvolutionalEncoder, PaddedConv2d
 from ._conversions import tensor_to_classes
 from ._conversions import classes_to_tensor, images_to_tensor, floats_to_tensor
-from ._conversions import tensor_to_probabilities
+from ._conversions import tensor_to_probabilities, split_batches
 from ._neural_network import NeuralNetworkClassifier
 from ._loss_functions import cross_entropy, RMSE
 
 
 class ImageObjectDetector(NeuralNetworkClassifier):
 
+    _observation_arguments = ()  # the loss is a sum of root mean squared errors, it cannot be split
+
     def __init__(self, in_channels: int,
                  classes: Iterable[str],
                  features: Iterable[int],
@@ -129,9 +131,16 @@ class ImageObjectDetector(NeuralNetworkClassifier):
 
     def predict(self, images: np.ndarray, detection_treshold: float=0.5,
                 threshold_intersect: Optional[float] = 0.6,
-                multi_scale: bool = False) -> List[dict]:
+                multi_scale: bool = False, compile: bool = False,
+                batch_size: Optional[int] = None) -> List[dict]:
         """
+        Returns the detected bounding boxes of each image.
+        If 'batch_size' is not None, the images are evaluated by batches of at most 'batch_size' images.
         """
+        if batch_size is not None:
+            return [bboxes for predictions in self.predict_iter(images, detection_treshold, threshold_intersect,
+                                                                multi_scale, compile=compile, batch_size=batch_size)
+                    for bboxes in predictions]
         n, h_image, w_image = images.shape[:3]
         predictions = [{"x": [], "y": [], "w": [], "h": [], "class": [],
                         "bboxe confidence": [], "class confidence": []}
@@ -142,7 +151,7 @@ class ImageObjectDetector(NeuralNetworkClassifier):
             h_down, w_down = tuple(s**i for s in self.downsampling_window)
             if any(s // (d*g) == 0 for s, d, g in zip((h_image, w_image), (h_down, w_down), self.cells_dimensions)):
                 break
-            with torch.no_grad():
+            with torch.no_grad(), self._compiled(compile):
                 confidence, position, dimension, object_class = self(F.avg_pool2d(X, kernel_size=(h_down, w_down)))
             h_cell, w_cell = self.cells_dimensions
             N, _, h_grid, w_grid = confidence.shape
@@ -182,6 +191,16 @@ class ImageObjectDetector(NeuralNetworkClassifier):
             predictions = [self._non_max_suppression(bboxes, threshold_intersect) for bboxes in predictions]
         return predictions
 
+    def predict_iter(self, images: Iterable[np.ndarray], *args, compile: bool = False,
+                     batch_size: int = 1024) -> Iterator[List[dict]]:
+        """
+        Yields the detected bounding boxes of successive batches of at most 'batch_size' images, in order.
+        'images' can also be an iterable of images (such as a generator), which is consumed lazily.
+        The other arguments are the same as for 'predict'.
+        """
+        for batch in split_batches(images, batch_size):
+            yield self.predict(batch, *args, compile=compile)
+
     @staticmethod
     def _non_max_suppression(bboxes: dict, threshold_intersect: float) -> dict:
         """
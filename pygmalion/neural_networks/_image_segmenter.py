@@ -8,7 +8,7 @@ from ._conversions import tensor_to_index
 from ._conversions import longs_to_tensor, images_to_tensor
 from ._conversions import tensor_to_floats
 from ._neural_network import NeuralNetworkClassifier
-from ._loss_functions import cross_entropy, soft_dice_loss
+from ._loss_functions import cross_entropy, cross_entropy_weight, soft_dice_loss
 
 
 class ImageSegmenter(NeuralNetworkClassifier):
@@ -65,6 +65,19 @@ class ImageSegmenter(NeuralNetworkClassifier):
         y_pred = self(x)
         return alpha * cross_entropy(y_pred, y_target, weights, class_weights) + (1-alpha) * soft_dice_loss(y_pred, y_target, weights, class_weights)
 
+    def _micro_batch_weight(self, x, y_target, weights=None, class_weights=None):
+        """
+        The cross entropy is normalized by the weights of the pixels, but the dice loss is a plain mean over the images.
+        A mixture of both can only be split if the weights are uniform.
+        """
+        alpha = self.entropy_dice_mixture
+        if alpha == 1.0:
+            return cross_entropy_weight(y_target, weights, class_weights)
+        elif alpha == 0.0 or (weights is None and class_weights is None):
+            return float(len(x))
+        raise ValueError("The weighted mixture of cross entropy and dice loss of the ImageSegmenter "
+                         "is not a mean over the observations, it cannot be evaluated by micro-batches")
+
     @property
     def device(self) -> torch.device:
         return self.output.weight.device
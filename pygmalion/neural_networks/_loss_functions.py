@@ -91,6 +91,38 @@ def cross_entropy(y_pred: torch.Tensor, y_target: torch.Tensor,
                          * weights) / weights.sum()
 
 
+def cross_entropy_weight(y_target: torch.Tensor,
+                         weights: Union[None, torch.Tensor] = None,
+                         class_weights: Union[None, torch.Tensor] = None
+                         ) -> Union[float, torch.Tensor]:
+    """
+    Returns the denominator of the weighted mean computed by 'cross_entropy' for the given targets:
+    the sum of the observation weights if provided, the sum of the class weights of the targets otherwise,
+    and the number of targets if there are no weights.
+
+    Parameters
+    ----------
+    y_target : torch.Tensor
+        A Tensor of long of shape [N_observations, ...]
+        The index of the class to be predicted
+    weights : None or torch.Tensor
+        The individual observation weights (ignored if None)
+    class_weights : None or torch.Tensor
+        The class-wise weights (ignored if None)
+
+    Returns
+    -------
+    float or torch.Tensor :
+        the scalar sum of the weights
+    """
+    if weights is not None:
+        return weights.sum()
+    elif class_weights is not None:
+        return class_weights.to(y_target.device)[y_target].sum()
+    else:
+        return float(y_target.numel())
+
+
 def soft_dice_loss(y_pred: torch.Tensor, y_target: torch.Tensor,
                    weights: Union[None, torch.Tensor] = None,
                    class_weights: Union[None, torch.Tensor] = None
@@ -0,0 +1,180 @@
+import inspect
+import torch
+from typing import Callable, List, Optional, Tuple, Union, TYPE_CHECKING
+from .layers import Normalizer
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork, PRECISION
+
+
+class MicroBatcher:
+    """
+    Splits the batches along their first dimension into micro-batches small enough to fit in memory.
+
+    Each micro-batch comes with the fraction of the batch loss it accounts for,
+    so that the sum of the micro-batch losses multiplied by their fraction is the loss of the whole batch,
+    and the gradients accumulated over the micro-batches are those of the whole batch.
+    Only the arguments of the loss listed in 'NeuralNetwork._observation_arguments' are split,
+    the other arguments (such as the class weights) are repeated in each micro-batch.
+    The fraction of a micro-batch is given by 'NeuralNetwork._micro_batch_weight'
+    (the denominator of the loss of the micro-batch, such as its number of observations or sum of weights).
+    The models whose loss is not a weighted mean over the observations cannot be trained by micro-batches.
+
+    The maximum micro-batch size is either given, or deduced from a memory budget by measuring
+    the memory of the activations saved for backward on the first batch (see 'activations_memory').
+    """
+
+    def __init__(self, model: "NeuralNetwork", max_size: Optional[int] = None,
+                 memory_budget: Optional[int] = None,
+                 optimizer: Optional[torch.optim.Optimizer] = None,
+                 precision: "PRECISION" = "fp32"):
+        """
+        Parameters
+        ----------
+        model : NeuralNetwork
+            the trained model
+        max_size : int or None
+            maximum number of observations in a micro-batch
+        memory_budget : int or None
+            memory in bytes available for training, including the parameters,
+            gradients and optimizer states
+        optimizer : torch.optim.Optimizer or None
+            the optimizer, used to estimate the memory of its states
+        precision : one of {"fp32", "bf16", "fp16"}
+            precision of the forward computations
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"The maximum micro-batch size must be at least 1, but got {max_size}")
+        if (max_size is not None or memory_budget is not None) and len(model._observation_arguments) == 0:
+            raise ValueError(f"The loss of the {type(model).__name__} model is not a mean over the observations, "
+                             "it cannot be evaluated by micro-batches")
+        self.model = model
+        self.max_size = max_size
+        self.memory_budget = memory_budget
+        self.optimizer = optimizer
+        self.precision = precision
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size is not None or self.memory_budget is not None
+
+    def split(self, batch: tuple) -> List[Tuple[tuple, Union[float, torch.Tensor]]]:
+        """
+        returns the list of (micro_batch, fraction) of the given batch.
+        The fractions are scalar tensors computed without synchronizing the device.
+        """
+        if not self.enabled:
+            return [(batch, 1.)]
+        N = n_observations(batch)
+        if self.memory_budget is not None:
+            size = micro_batch_size(self.model, batch, self.memory_budget, self.optimizer, self.precision)
+            self.max_size = size if self.max_size is None else min(self.max_size, size)
+            self.memory_budget = None
+        if N <= self.max_size:
+            return [(batch, 1.)]
+        micro_batches = split_batch(batch, self.max_size, observation_arguments(self.model, batch))
+        weights = torch.stack([torch.as_tensor(self.model._micro_batch_weight(*mb), dtype=torch.float)
+                               for mb in micro_batches])
+        fractions = weights / torch.clamp_min(weights.sum(), torch.finfo(weights.dtype).tiny)
+        return list(zip(micro_batches, fractions))
+
+
+def n_observations(batch: tuple) -> int:
+    """
+    returns the number of observations in a batch
+    """
+    for item in batch:
+        if isinstance(item, torch.Tensor) and item.dim() > 0:
+            return item.shape[0]
+    return len(batch[0]) if len(batch) > 0 and hasattr(batch[0], "__len__") else 0
+
+
+def observation_arguments(model: "NeuralNetwork", batch: tuple) -> List[bool]:
+    """
+    returns for each element of the batch whether it is an argument of the loss
+    listed in the '_observation_arguments' of the model, that holds one value per observation
+    """
+    names = list(inspect.signature(model.loss).parameters)
+    return [i < len(names) and names[i] in model._observation_arguments for i in range(len(batch))]
+
+
+def split_batch(batch: tuple, size: int, per_observation: List[bool]) -> List[tuple]:
+    """
+    splits the tensors of the batch that hold one value per observation along their first dimension
+    in micro-batches of at most 'size' observations.
+    The other elements of the batch (None, class weights, ...) are repeated in each micro-batch.
+    """
+    N = n_observations(batch)
+    n_splits = -(-N // size)
+    splits = [torch.split(item, size) if split and isinstance(item, torch.Tensor) else [item]*n_splits
+              for item, split in zip(batch, per_observation)]
+    return [tuple(items) for items in zip(*splits)]
+
+
+def activations_memory(model: "NeuralNetwork", batch: tuple,
+                       precision: "PRECISION" = "fp32",
+                       on_saved: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    returns the memory in bytes of the tensors saved for backward (excluding the parameters)
+    when evaluating the loss of the model on the given batch.
+    The running statistics of the Normalizer layers are left unchanged.
+    If provided, 'on_saved' is called with the (storage pointer, size in bytes)
+    of each tensor saved for backward, at the time it is saved.
+    """
+    normalizers = [m for m in model.modules() if isinstance(m, Normalizer)]
+    statistics = [(m.running_mean.detach().clone(), m.running_var.detach().clone(), m.n_observations)
+                  for m in normalizers]
+    parameters = {p.untyped_storage().data_ptr() for p in model.parameters()}
+    saved = {}
+
+    def pack(tensor: torch.Tensor) -> torch.Tensor:
+        storage = tensor.untyped_storage()
+        if storage.data_ptr() not in parameters:
+            saved[storage.data_ptr()] = storage.nbytes()
+            if on_saved is not None:
+                on_saved(storage.data_ptr(), storage.nbytes())
+        return tensor
+
+    training = model.training
+    try:
+        model.train()
+        with torch.enable_grad(), torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor), model._autocast(precision):
+            model.loss(*batch)
+    finally:
+        model.train(training)
+        with torch.no_grad():
+            for m, (mean, var, n) in zip(normalizers, statistics):
+                m.running_mean.copy_(mean)
+                m.running_var.copy_(var)
+                m.n_observations = n
+    return sum(saved.values())
+
+
+def static_memory(model: torch.nn.Module, optimizer: Optional[torch.optim.Optimizer] = None) -> int:
+    """
+    returns the memory in bytes of the parameters, their gradients, and the optimizer states.
+    If the optimizer states are not yet initialized, they are assumed to be two tensors per trained parameter (as for Adam).
+    """
+    parameters = sum(p.numel() * p.element_size() for p in model.parameters())
+    gradients = sum(p.numel() * p.element_size() for p in model.parameters() if p.requires_grad)
+    if optimizer is not None and len(optimizer.state) > 0:
+        states = sum(t.numel() * t.element_size() for state in optimizer.state.values()
+                     for t in state.values() if isinstance(t, torch.Tensor))
+    else:
+        states = 2 * gradients
+    return parameters + gradients + states
+
+
+def micro_batch_size(model: "NeuralNetwork", batch: tuple, memory_budget: int,
+                     optimizer: Optional[torch.optim.Optimizer] = None,
+                     precision: "PRECISION" = "fp32", n_probe: int = 8) -> int:
+    """
+    returns the largest micro-batch size for which the training memory is estimated to fit in the budget.
+    The memory of the activations per observation is measured on a probe micro-batch of 'n_probe' observations.
+    """
+    N = n_observations(batch)
+    probe = split_batch(batch, max(1, min(n_probe, N)), observation_arguments(model, batch))[0]
+    per_observation = activations_memory(model, probe, precision) / max(1, n_observations(probe))
+    available = memory_budget - static_memory(model, optimizer)
+    if per_observation <= 0:
+        return max(1, N)
+    return max(1, min(N, int(available // per_observation)))
@@ -1,13 +1,36 @@
 import io
+import inspect
 import pathlib
 import math
 import torch
-from typing import Union, Sequence, Optional, Callable, Iterable
-from ._conversions import floats_to_tensor
+import torch.distributed as dist
+from contextlib import contextmanager, ExitStack
+from typing import Union, Sequence, Optional, Callable, Iterable, Iterator, Literal, Tuple
+from ._conversions import floats_to_tensor, split_batches, concatenate_batches
+from ._prefetcher import Prefetcher
+from ._validation import ValidationScheduler
+from ._snapshot import StateSnapshot
+from ._gradient_engine import GradientEngine, foreach_norm
+from ._checkpoint_writer import CheckpointWriter
+from ._telemetry import Telemetry
+from ._profiler import Profiler
+from ._micro_batching import MicroBatcher, n_observations
+from ._loss_functions import cross_entropy_weight
+from ._optimizer import default_optimizer, sparse_parameters, set_weight_decay
+from ._serialization import records_config, save_state
+from ._freezing import freeze
+from ._quantization import quantize, QUANTIZATION_MODE
+from ._distributed import is_distributed, shard, spawn_fit, broadcast_state, broadcast_flag
+from ._distributed import all_reduce_gradients, all_reduce_sum, NormalizerSynchronizer
 from .layers import Dropout
 from pygmalion._model import Model
 from datetime import datetime
 
+PRECISION = Literal["fp32", "bf16", "fp16"]
+AUTOCAST_DTYPES = {"bf16": torch.bfloat16, "fp16": torch.float16}
+COMPILE_TARGET = Literal["forward", "loss"]
+SAVE_FORMAT = Literal["pickle", "state"]
+
 
 class NeuralNetwork(torch.nn.Module, Model):
     """
@@ -16,14 +39,25 @@ class NeuralNetwork(torch.nn.Module, Model):
     with 'fit' and 'predict' methods
     """
 
+    frozen: bool = False  # True for the inference only copies returned by 'freeze'
+    _observation_arguments: Tuple[str, ...] = ("x", "y_target", "weights")  # loss arguments split between micro-batches
+
     def __init__(self):
         torch.nn.Module.__init__(self)
         Model.__init__(self)
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "__init__" in cls.__dict__:
+            cls.__init__ = records_config(cls.__init__)
+
     def save(self, file_path: Union[str, pathlib.Path, io.IOBase],
-             overwrite: bool = False, create_dir: bool = False):
+             overwrite: bool = False, create_dir: bool = False,
+             format: SAVE_FORMAT = "pickle"):
         """
-        Saves the model to the disk as '.pth' file
+        Saves the model to the disk as a '.pth' file (the pickled model)
+        or a '.pygmalion' file (the constructor arguments as JSON followed by the aligned weights,
+        that are memory mapped when loaded with 'pygmalion.utilities.load_model')
 
         Parameters
         ----------
@@ -34,14 +68,17 @@ class NeuralNetwork(torch.nn.Module, Model):
         create_dir : bool
             If True, the directory to the file's path is created
             if it does not exist already
+        format : one of {"pickle", "state"}
+            format of the file when saving to a file like object.
+            When saving to a path, the format is deduced from the suffix.
         """
         if not isinstance(file_path, io.IOBase):
             file_path = pathlib.Path(file_path)
             path = file_path.parent
             suffix = file_path.suffix.lower()
-            if suffix != ".pth":
+            if suffix not in (".pth", ".pygmalion"):
                 raise ValueError(
-                    f"The model must be saved as a '.pth' file, but got '{suffix}'")
+                    f"The model must be saved as a '.pth' or '.pygmalion' file, but got '{suffix}'")
             if not(create_dir) and not path.is_dir():
                 raise ValueError(f"The directory '{path}' does not exist")
             else:
@@ -49,7 +86,9 @@ class NeuralNetwork(torch.nn.Module, Model):
             if not(overwrite) and file_path.exists():
                 raise FileExistsError(
                     f"The file '{file_path}' already exists, set 'overwrite=True' to overwrite.")
-            torch.save(self, file_path)
+            format = "state" if suffix == ".pygmalion" else "pickle"
+        if format == "state":
+            save_state(self, file_path)
         else:
             torch.save(self, file_path)
 
@@ -63,10 +102,28 @@ class NeuralNetwork(torch.nn.Module, Model):
             L1: Optional[float] = None,
             L2: Optional[float] = None,
             gradient_cliping: Optional[float] = None,
+            decoupled_weight_decay: bool = False,
             start_step: int = 0,
             backup_path: Optional[str] = None,
             backup_prefix: str = "model",
             backup_frequency: int = 10000,
+            backup_keep_last: Optional[int] = None,
+            backup_keep_best: int = 0,
+            precision: PRECISION = "fp32",
+            prefetch: Optional[int] = None,
+            n_prefetch_workers: int = 1,
+            validation_frequency: int = 1,
+            asynchronous_validation: bool = False,
+            snapshot_frequency: int = 1,
+            snapshot_threshold: float = 0.,
+            snapshot_path: Optional[Union[str, pathlib.Path]] = None,
+            n_processes: int = 1,
+            telemetry: bool = False,
+            telemetry_path: Optional[Union[str, pathlib.Path]] = None,
+            profile: Optional[Union[str, pathlib.Path, Profiler]] = None,
+            max_micro_batch_size: Optional[int] = None,
+            memory_budget: Optional[int] = None,
+            compile: Union[bool, COMPILE_TARGET] = False,
             verbose: bool = True):
         """
         Trains a neural network model.
@@ -80,7 +137,9 @@ class NeuralNetwork(torch.nn.Module, Model):
             The data used for early stoping.
             Similar to training_data or None
         optimizer : torch.optim.Optimizer or None
-            optimizer to use for training
+            optimizer to use for training.
+            The default is Adam (or AdamW if 'decoupled_weight_decay' is True),
+            and SparseAdam for the embeddings with sparse gradients (see 'CombinedOptimizer')
         n_steps : int
             The maximum number of optimization steps
         learning_rate : float or Callable
@@ -93,7 +152,7 @@ class NeuralNetwork(torch.nn.Module, Model):
             If None, no early stoping is performed
         keep_best : bool
             If True, the model is checkpointed at each step if there was
-            improvement,
+            improvement (see 'snapshot_frequency' and 'snapshot_threshold'),
             and the best model is loaded back at the end of training
         L1 : float or None
             L1 regularization factor
@@ -101,14 +160,92 @@ class NeuralNetwork(torch.nn.Module, Model):
             L2 regularization factor
         gradient_cliping : float or None
             if provided, the gradient vector is cliped in the (-gradient_clipping, gradient_clipping) range
+        decoupled_weight_decay : bool
+            If True, L2 regularization is not added to the loss, but is instead passed as
+            'weight_decay' to the optimizer's param groups.
+            The default optimizer is then AdamW instead of Adam.
+            A provided optimizer must be an AdamW or SGD optimizer (see 'set_weight_decay'),
+            its weight decay is left unchanged if L2 is None.
         start_step : int
             the step to start from, usefull for restarting from a checkpoint with scheduled learning rate
         backup_path : str or path like or None
-            if provided, path where to backup the model (and optimizer) on disk
+            if provided, path where to backup the model and optimizer states on disk.
+            The backups are written in the background without blocking the training,
+            and can be loaded back with 'load_checkpoint'. See 'CheckpointWriter'.
+            Each backup is a single '<backup_prefix>_<step>.ckpt' file holding the model and optimizer states.
         backup_prefix : str
             prefix of the backup filename (the suffix is the current number step)
         backup_frequency : int
             number of steps before each on-disk backup
+        backup_keep_last : int or None
+            if provided, only the 'backup_keep_last' most recent backups
+            (and the 'backup_keep_best' best ones) are kept on disk
+        backup_keep_best : int
+            number of backups with the best metric kept on disk if 'backup_keep_last' is provided
+        precision : one of {"fp32", "bf16", "fp16"}
+            precision of the forward and backward computations.
+            With "bf16" and "fp16" the loss is evaluated under 'torch.autocast',
+            the weights and optimizer states are kept in float32.
+            With "fp16" the loss is also dynamically scaled before backpropagation
+            to avoid gradient underflow.
+        prefetch : int or None
+            If provided, the training batches are prepared in the background
+            while the model trains, with at most 'prefetch' batches prepared in advance.
+            See the 'Prefetcher' class.
+        n_prefetch_workers : int
+            number of workers preparing the training batches if 'prefetch' is provided.
+            A single worker is a background thread, several workers are processes
+            that each iterate over their own copy of 'training_data'.
+        validation_frequency : int
+            the validation loss is evaluated every 'validation_frequency' steps.
+            Early stoping and checkpointing of the best model are based on the
+            most recent validation loss.
+        asynchronous_validation : bool
+            If True, the validation is performed in a background thread on a snapshot of
+            the weights while the training continues. The validation results are then
+            available a few steps later.
+        snapshot_frequency : int
+            if 'keep_best' is True, the best model is checkpointed at most every 'snapshot_frequency' steps
+        snapshot_threshold : float
+            if 'keep_best' is True, the model is checkpointed only if the metric improved
+            by more than this value since the last checkpoint
+        snapshot_path : str or pathlib.Path or None
+            if provided and 'keep_best' is True, the best model checkpoint is
+            stored in a memory-mapped file at this path instead of in RAM
+        n_processes : int
+            If greater than 1, the model is trained with data parallelism over 'n_processes'
+            local processes (gloo backend). Each process computes the gradient on its share of the batches
+            (or its share of the observations if 'training_data' is a single batch),
+            and the gradients are summed over processes before each optimizer step.
+            The running statistics of the Normalizer layers are synchronized between processes.
+            If the method is called in a process group that is already initialized
+            (with torchrun for example), data parallel training is performed over this process group,
+            and only the process of rank 0 prints and writes backups.
+        telemetry : bool
+            If True, the wall time spent in each phase of each step (waiting for data, forward,
+            backward, optimizer, validation, checkpointing) and the training throughput
+            (samples/sec, and tokens/sec for text models) are recorded and returned.
+            See the 'Telemetry' class.
+        telemetry_path : str or pathlib.Path or None
+            if provided, the telemetry is enabled and the records are also streamed
+            to this file in the JSON lines format, one line per step
+        profile : str or pathlib.Path or Profiler or None
+            If provided, 'torch.profiler' traces of some training steps are written in the given
+            directory, with named ranges for the data, forward, backward, optimizer and validation phases.
+            A 'Profiler' object can be passed instead of a directory to choose the
+            schedule (wait/warmup/active steps) and what is recorded.
+        max_micro_batch_size : int or None
+            If provided, the training and validation batches are split along their first dimension
+            into micro-batches of at most this number of observations, to reduce the memory usage.
+            The gradients and losses of the micro-batches are weighted so that they sum to
+            those of the whole batch (up to the running statistics of the Normalizer layers).
+        memory_budget : int or None
+            If provided, the micro-batch size is chosen so that the estimated training memory
+            (in bytes) stays under this budget. See the 'MicroBatcher' class.
+        compile : bool or one of {"forward", "loss"}
+            If True or "forward", the forward of the model is compiled with 'torch.compile'.
+            If "loss", the whole loss evaluation is compiled, and the backward pass
+            is compiled along with it. See the '_compiled' method.
         verbose : bool
             If True the loss are displayed at each optimization step
         
@@ -116,111 +253,242 @@ class NeuralNetwork(torch.nn.Module, Model):
         -------
         tuple :
             (train_losses, val_losses, grad_norms, best_step)
+            with val_losses None for the steps where the validation loss was not evaluated,
+            and best_step the step of the checkpointed model loaded back if 'keep_best' is True.
+            If the telemetry is enabled, the list of the per step telemetry records is returned as a fifth element.
         """
+        if self.frozen:
+            raise RuntimeError("A frozen model is inference only and cannot be trained")
+        if n_processes > 1 and not is_distributed():
+            arguments = {k: v for k, v in locals().items() if k not in ("self", "n_processes")}
+            return spawn_fit(self, n_processes, arguments)
+        distributed = is_distributed()
+        rank = dist.get_rank() if distributed else 0
+        if distributed:
+            if asynchronous_validation:
+                raise ValueError("Asynchronous validation is not supported with data parallel training")
+            training_data = shard(training_data, rank, dist.get_world_size())
+            if validation_data is not None:
+                validation_data = shard(validation_data, rank, dist.get_world_size())
+            broadcast_state(self)
+            normalizers = NormalizerSynchronizer(self)
+            verbose = verbose and (rank == 0)
         if isinstance(training_data, tuple):
             training_data = [training_data]
         if isinstance(validation_data, tuple):
             validation_data = [validation_data]
-        if backup_path is not None:
-            backup_path = pathlib.Path(backup_path)
-            if not backup_path.is_dir():
-                raise NotADirectoryError(f"Backup path is not a valid directory: '{backup_path}'")
+        if prefetch is not None:
+            training_data = Prefetcher(training_data, queue_depth=prefetch, n_workers=n_prefetch_workers)
+        if precision not in PRECISION.__args__:
+            raise ValueError(f"Unexpected precision '{precision}', expected one of {PRECISION.__args__}")
+        if backup_path is not None and rank == 0:
+            backup = CheckpointWriter(backup_path, backup_prefix, n_digits=math.floor(math.log10(max(1, n_steps))) + 1,
+                                      keep_last=backup_keep_last, keep_best=backup_keep_best)
+        else:
+            backup = None
+        if not isinstance(profile, Profiler):
+            profile = Profiler(profile, worker_name=f"rank{rank}" if distributed else None)
         best_step = start_step
-        if keep_best:
-            best_state = {k: v.detach().cpu().clone() for k, v in self.state_dict().items()}
         best_metric = None
+        snapshot = StateSnapshot(self, snapshot_path) if keep_best else None
+        snapshot_step, snapshot_metric = start_step, None
         train_losses = []
         val_losses = []
         grad_norms = []
         lr = learning_rate(start_step) if callable(learning_rate) else learning_rate
         if optimizer is None:
-            optimizer = torch.optim.Adam(self.parameters(), lr)
+            optimizer = default_optimizer(self, lr, (L2 or 0.) if decoupled_weight_decay else None)
         else:
             for g in optimizer.param_groups:
                 g["lr"] = lr
+            if decoupled_weight_decay and L2 is not None:
+                set_weight_decay(optimizer, L2)
+        gradients = GradientEngine(self.parameters(), L1, None if decoupled_weight_decay else L2, gradient_cliping)
+        scaler = torch.amp.GradScaler(self.device.type) if precision == "fp16" else None
+        micro_batcher = MicroBatcher(self, max_micro_batch_size, memory_budget, optimizer, precision)
+        if validation_data is not None:
+            validation = ValidationScheduler(self, validation_data, validation_frequency,
+                                             asynchronous_validation, precision, distributed,
+                                             micro_batcher)
+        else:
+            validation = None
+        last_validation = None
+
+        def update_best(step: int, metric: float, state: Optional[dict] = None):
+            """
+            keeps track of the best metric, and checkpoints the model if it improved enough
+            """
+            nonlocal best_step, best_metric, snapshot_step, snapshot_metric
+            if best_metric is None or metric < best_metric:
+                best_step = step
+                best_metric = metric
+            if (keep_best
+                    and (snapshot_metric is None or snapshot_metric - metric > snapshot_threshold)
+                    and (snapshot_metric is None or step - snapshot_step >= snapshot_frequency)):
+                snapshot.update(state)
+                snapshot_step, snapshot_metric = step, metric
+
+        @contextmanager
+        def phase(name: str):
+            """
+            measures the time spent in the given phase of the step, and annotates the profiler traces
+            """
+            with telemetry.measure(name), profile.record(name):
+                yield
+
+        # the telemetry file is opened last, so that it is always closed by the 'finally' clause below
+        telemetry = Telemetry(telemetry or (telemetry_path is not None), self.device,
+                              telemetry_path if rank == 0 else None)
+        stack = ExitStack()
         try:
+            stack.enter_context(self._compiled(compile))
+            profile.start(self.device)
             # looping on epochs
             for step in range(start_step, start_step+n_steps+1):
+                telemetry.start(step)
+                if step > start_step:
+                    profile.step()
                 # stepping the optimization
-                optimizer.step()
-                # updating learning rate
-                if callable(learning_rate):
-                    for g in optimizer.param_groups:
-                        g["lr"] = learning_rate(step)
-                optimizer.zero_grad()
+                with phase("optimizer"):
+                    if scaler is None:
+                        optimizer.step()
+                    elif step > start_step:
+                        scaler.step(optimizer)
+                        scaler.update()
+                    # updating learning rate
+                    if callable(learning_rate):
+                        for g in optimizer.param_groups:
+                            g["lr"] = learning_rate(step)
+                    optimizer.zero_grad()
                 # training loss
                 self.train()
                 train_loss = []
-                for batch in training_data:
-                    loss = self.loss(*batch)
-                    if L1 is not None:
-                        loss = loss + L1 * self._norm(self.parameters(), 1)
-                    if L2 is not None:
-                        loss = loss + L2 * self._norm(self.parameters(), 2)
-                    loss.backward()
-                    train_loss.append(loss.item())
+                for batch in telemetry.iterate(profile.iterate(training_data)):
+                    telemetry.count(self, batch)
+                    batch_loss = 0.
+                    # the losses are accumulated on device, to avoid a synchronization per batch
+                    for micro_batch, fraction in micro_batcher.split(batch):
+                        with phase("forward"), self._autocast(precision):
+                            loss = self.loss(*micro_batch)
+                        with phase("backward"):
+                            loss = loss.float() * fraction
+                            if scaler is None:
+                                loss.backward()
+                            else:
+                                scaler.scale(loss).backward()
+                            batch_loss = batch_loss + loss.detach()
+                    train_loss.append(batch_loss)
                 n_batches = len(train_loss)
-                train_loss = sum(train_loss) / max(1, n_batches)
-                train_losses.append(train_loss)
-                # averaging gradient over batches
-                if n_batches > 1:
-                    for p in self.parameters():
-                        if p.grad is not None:
-                            p.grad /= n_batches
-                # gradient cliping
-                if gradient_cliping is not None:
-                    for p in self.parameters():
-                        if p.grad is not None:
-                            p.grad = torch.clip(p.grad, -gradient_cliping, gradient_cliping)
-                # gradient norm
-                grad_norms.append(self._norm((p.grad for p in self.parameters() if p.grad is not None), 1).item())
+                train_loss = sum(train_loss)
+                with phase("optimizer"):
+                    # summing gradients and statistics over processes
+                    if distributed:
+                        all_reduce_gradients(self.parameters(), sparse_parameters(self))
+                        train_loss, n_batches = all_reduce_sum([train_loss, n_batches])
+                        n_batches = int(n_batches)
+                        normalizers.synchronize()
+                    # unscaling the gradients inplace before any manipulation
+                    if scaler is not None:
+                        scaler.unscale_(optimizer)
+                    # averaging, regularization, and cliping of the gradients
+                    penalty, grad_norm = gradients.step(n_batches)
+                    # single transfer to host of the step's metrics
+                    train_loss = torch.as_tensor(train_loss, dtype=penalty.dtype, device=penalty.device) / max(1, n_batches) + penalty
+                    train_loss, grad_norm = torch.stack([train_loss, grad_norm.to(penalty.device)]).tolist()
+                    train_losses.append(train_loss)
+                    grad_norms.append(grad_norm)
                 # validation data
                 self.eval()
-                if validation_data is not None:
-                    val_loss = []
-                    with torch.no_grad():
-                        for batch in validation_data:
-                            val_loss.append(self.loss(*batch).item())
-                    val_loss = sum(val_loss) / max(1, len(val_loss))
+                val_losses.append(None)
+                if validation is not None:
+                    with phase("validation"):
+                        validated = validation.step(step, start_step)
+                    for val_step, val_loss, state in validated:
+                        val_losses[val_step - start_step] = val_loss
+                        last_validation = (val_step, val_loss)
+                        with phase("checkpoint"):
+                            update_best(val_step, val_loss, state)
                 else:
-                    val_loss = None
-                val_losses.append(val_loss)
-                # model checkpointing
-                metric = val_loss if val_loss is not None else train_loss
-                if best_metric is None or metric < best_metric:
-                    best_step = step
-                    best_metric = metric
-                    if keep_best:
-                        # best_state = copy.deepcopy(self.state_dict())
-                        best_state = {k: v.detach().cpu().clone() for k, v in self.state_dict().items()}
+                    with phase("checkpoint"):
+                        update_best(step, train_loss)
                 # early stoping
-                if (step - best_step) > patience:
+                stop = (step - best_step) > patience
+                if distributed:
+                    stop = broadcast_flag(stop)
+                if stop:
                     if verbose:
                         print(f"Early stoping because preformed {patience:,} steps without improvement".replace(",", " "))
                     break
                 # message printing
                 if verbose:
                     time = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-                    if val_loss is not None:
-                        print(f"{time} Step {step}: train loss = {train_loss:.3g}, val loss = {val_loss:.3g}, grad = {grad_norms[-1]:.3e}")
-                    else:
+                    if last_validation is None:
                         print(f"{time} Step {step}: train loss = {train_loss:.3g}, grad = {grad_norms[-1]:.3e}")
+                    elif last_validation[0] == step:
+                        print(f"{time} Step {step}: train loss = {train_loss:.3g}, val loss = {last_validation[1]:.3g}, grad = {grad_norms[-1]:.3e}")
+                    else:
+                        print(f"{time} Step {step}: train loss = {train_loss:.3g}, val loss (step {last_validation[0]}) = {last_validation[1]:.3g}, grad = {grad_norms[-1]:.3e}")
                 # backup on disk
-                if (backup_path is not None) and (step % backup_frequency == 0) and (step != start_step):
-                    dec = math.floor(math.log10(n_steps)) + 1
-                    torch.save(self, backup_path / f"{backup_prefix}_{step:0{dec}}.pth")
-                    torch.save(optimizer, backup_path / f"optimizer_{backup_prefix}_{step:0{dec}}.pth")
+                if (backup is not None) and (step % backup_frequency == 0) and (step != start_step):
+                    metric = last_validation[1] if last_validation is not None else train_loss
+                    with phase("checkpoint"):
+                        path = backup.save(step, self, optimizer, metric)
                     if verbose:
-                        print(f"Backed up on disk '{backup_prefix}_{step:0{dec}}.pth'")
-
+                        print(f"Backing up on disk '{path.name}'")
+            # wait for the last asynchronous validation
+            if validation is not None:
+                for val_step, val_loss, state in validation.close():
+                    val_losses[val_step - start_step] = val_loss
+                    update_best(val_step, val_loss, state)
         except KeyboardInterrupt:
             if verbose:
                 print("Training interrupted by the user")
         finally:
+            # restore the eager model
+            stack.close()
+            # end the telemetry of the last step and the profiling
+            telemetry.close()
+            profile.stop()
+            # wait for the checkpoints to be written
+            if backup is not None:
+                backup.close()
+            # stop the background validation
+            if validation is not None:
+                validation.close(wait=False)
+            # stop the prefetching workers
+            if prefetch is not None:
+                training_data.close()
             # load the best state
             if keep_best:
-                self.load_state_dict(best_state)
-        return train_losses, val_losses, grad_norms, best_step if keep_best else None
+                snapshot.restore()
+        results = (train_losses, val_losses, grad_norms, snapshot_step if keep_best else None)
+        if telemetry.enabled:
+            results += (telemetry.records,)
+        return results
+
+    def load_checkpoint(self, file_path: Union[str, pathlib.Path, io.IOBase],
+                        optimizer: Optional[torch.optim.Optimizer] = None) -> int:
+        """
+        Loads inplace the model state (and optionally optimizer state)
+        from a backup written during training by the 'fit' method
+
+        Parameters
+        ----------
+        file_path : str or pathlib.Path or file like
+            path of the backup file
+        optimizer : torch.optim.Optimizer or None
+            if provided, the optimizer state is also loaded
+
+        Returns
+        -------
+        int :
+            the step of the backup, that can be passed as 'start_step' to 'fit'
+        """
+        checkpoint = torch.load(file_path, map_location=self.device)
+        self.load_state_dict(checkpoint["model"])
+        if optimizer is not None:
+            optimizer.load_state_dict(checkpoint["optimizer"])
+        return checkpoint["step"]
 
     def data_to_tensor(self, x: object, y: object,
                         weights: Optional[Sequence[float]] = None,
@@ -235,15 +503,92 @@ class NeuralNetwork(torch.nn.Module, Model):
             data = (x, y)
         return data
 
-    def predict(self, *args):
+    def predict(self, *args, compile: bool = False, batch_size: Optional[int] = None):
+        """
+        Returns the prediction of the model
+
+        Parameters
+        ----------
+        *args :
+            the inputs of the model, and the optional arguments of their conversion to tensor
+        compile : bool
+            If True, the forward of the model is compiled with 'torch.compile'
+        batch_size : int or None
+            If not None, the inputs are converted and evaluated by batches of at most 'batch_size' observations,
+            so that the peak memory is bounded by the size of a batch. The predictions are concatenated in input order.
+        """
+        if batch_size is not None:
+            predictions = list(self.predict_iter(*args, compile=compile, batch_size=batch_size))
+            if len(predictions) > 0:
+                return concatenate_batches(predictions)
         self.eval()
         x = self._x_to_tensor(*args)
-        with torch.no_grad():
+        with torch.no_grad(), self._compiled(compile):
             y_pred = self(x)
         return self._tensor_to_y(y_pred)
+
+    def predict_iter(self, x: object, *args, compile: bool = False, batch_size: int = 1024) -> Iterator[object]:
+        """
+        Yields the predictions of the model for successive batches of at most 'batch_size' observations of 'x', in order.
+        'x' can also be an iterable of observations (such as a generator of images), which is consumed lazily.
+
+        Parameters
+        ----------
+        x : object
+            the inputs of the model
+        *args :
+            the optional arguments of the conversion of the inputs to tensor
+        compile : bool
+            If True, the forward of the model is compiled with 'torch.compile'
+        batch_size : int
+            maximum number of observations evaluated at once
+        """
+        return self._batched(self._tensor_to_y, x, args, compile, batch_size)
     
     def loss(*args) -> torch.Tensor:
         raise NotImplementedError()
+
+    def freeze(self) -> "NeuralNetwork":
+        """
+        Returns an inference only copy of the model, with the same predictions at a lower latency:
+        the normalizations that can be are folded into the adjacent linear layers,
+        the absolute weights of the monotonic layers are precomputed, the dropout layers are removed,
+        and the gradient of the parameters is disabled.
+        The frozen copy cannot be trained, and can only be saved as a '.pth' file.
+        """
+        return freeze(self)
+
+    def quantize(self, mode: QUANTIZATION_MODE = "dynamic_int8", min_elements: int = 2**18) -> "NeuralNetwork":
+        """
+        Returns an inference only copy of the model, with its large linear layers quantized.
+        In "dynamic_int8" mode, the weights are stored as int8 with one scale per output feature,
+        and the inputs are quantized to int8 at each call, so that the matrix multiplications are performed in int32.
+        The linear layers with fewer than 'min_elements' weights are kept in float,
+        as the quantization of their inputs costs more than it saves.
+        The quantized copy cannot be trained, and can be saved in both formats.
+        Use 'pygmalion.neural_networks.quantization_report' to compare its accuracy and latency to the original model.
+        """
+        return quantize(self, mode, min_elements)
+
+    def _freeze(self):
+        """
+        Folds in place the layers of an inference only copy of the model (see 'freeze').
+        The default implementation does nothing.
+        """
+        pass
+
+    def _batched(self, convert: Callable[[torch.Tensor], object], x: object, args: tuple,
+                 compile: bool, batch_size: int) -> Iterator[object]:
+        """
+        yields the converted output of the model for successive batches of the inputs.
+        The gradient is only disabled while evaluating a batch, not while the caller consumes the predictions.
+        """
+        self.eval()
+        for batch in split_batches(x, batch_size):
+            X = self._x_to_tensor(batch, *args)
+            with torch.no_grad(), self._compiled(compile):
+                y_pred = self(X)
+            yield convert(y_pred)
     
     @property
     def dropout(self) -> Optional[float]:
@@ -267,6 +612,96 @@ class NeuralNetwork(torch.nn.Module, Model):
     def _tensor_to_y(self, T: torch.Tensor) -> object:
         raise NotImplementedError()
     
+    def _evaluate(self, data: Iterable, precision: PRECISION = "fp32",
+                  distributed: bool = False,
+                  micro_batcher: Optional[MicroBatcher] = None) -> float:
+        """
+        returns the loss averaged over the batches of the given data, without gradient.
+        If 'distributed' is True, the loss is averaged over the batches of all processes.
+        If a 'micro_batcher' is provided, the batches are evaluated by micro-batches.
+        """
+        losses = []
+        with torch.no_grad(), self._autocast(precision):
+            for batch in data:
+                if micro_batcher is None:
+                    losses.append(self.loss(*batch).float())
+                else:
+                    losses.append(sum(self.loss(*micro_batch).float() * fraction
+                                      for micro_batch, fraction in micro_batcher.split(batch)))
+        total, n_batches = float(sum(losses)), len(losses)
+        if distributed:
+            total, n_batches = all_reduce_sum([total, n_batches])
+        return total / max(1, n_batches)
+
+    def _micro_batch_weight(self, *batch) -> Union[float, torch.Tensor]:
+        """
+        returns the weight of a micro-batch in the loss of the batch it was split from,
+        which is the denominator of the weighted mean computed by the loss:
+        the sum of the observation weights if the loss has a 'weights' argument that is provided,
+        the number of observations otherwise.
+        The weight can be returned as a tensor, to avoid synchronizing the device.
+        Models with other normalizations of their loss must override this method.
+        """
+        arguments = inspect.signature(self.loss).bind(*batch).arguments
+        weights = arguments.get("weights")
+        if isinstance(weights, torch.Tensor):
+            return weights.sum()
+        return float(n_observations(batch))
+
+    def _n_tokens(self, *batch) -> Optional[int]:
+        """
+        returns the number of tokens in a training batch, or None if the model is not a text model
+        """
+        return None
+
+    @contextmanager
+    def _compiled(self, target: Union[bool, COMPILE_TARGET] = True):
+        """
+        Context in which the 'forward' (or 'loss') method of the model is replaced by its 'torch.compile'd version.
+
+        Only the given method is compiled, the other methods (such as the decoding with history
+        of TextTranslator) are kept in eager mode, as their input shapes change at each call.
+        The compiled methods are cached in the '_compiled_methods' attribute of the model, so that successive
+        calls to 'fit' or 'predict' do not recompile. The compiled kernels are also cached on disk
+        by torch inductor (see the 'TORCHINDUCTOR_CACHE_DIR' environment variable),
+        which speeds up the compilation in later runs.
+        The eager method is restored when leaving the context, so that the model can still be saved.
+        """
+        if not target:
+            yield
+            return
+        name = "forward" if target is True else target
+        if name not in COMPILE_TARGET.__args__:
+            raise ValueError(f"Unexpected compile target '{name}', expected one of {COMPILE_TARGET.__args__}")
+        if name in self.__dict__:  # already compiled by an enclosing context
+            yield
+            return
+        compiled = self.__dict__.setdefault("_compiled_methods", {})
+        if name not in compiled:
+            compiled[name] = torch.compile(getattr(self, name))
+        self.__dict__[name] = compiled[name]
+        try:
+            yield
+        finally:
+            del self.__dict__[name]
+
+    def __getstate__(self) -> dict:
+        """
+        the compiled methods are not pickled (when saving the model or deep copying it during training)
+        """
+        state = self.__dict__.copy()
+        state.pop("_compiled_methods", None)
+        for name in COMPILE_TARGET.__args__:
+            state.pop(name, None)
+        return state
+
+    def _autocast(self, precision: PRECISION) -> torch.autocast:
+        """
+        returns the autocast context for the given precision
+        """
+        return torch.autocast(self.device.type, dtype=AUTOCAST_DTYPES.get(precision),
+                              enabled=(precision != "fp32"))
+
     @staticmethod
     def _norm(tensors: Iterable[torch.Tensor], order: int,
               average: bool=True):
@@ -274,13 +709,7 @@ class NeuralNetwork(torch.nn.Module, Model):
         returns the norm of the tensors
         (normalized by number of elements)
         """
-        n, L = 0, 0.
-        for t in tensors:
-            L = L + torch.sum(torch.abs(t)**order)
-            n += t.numel()
-        if average:
-            L /= n
-        return L**(1/order)
+        return foreach_norm(tensors, order, average)
 
 
 class NeuralNetworkClassifier(NeuralNetwork):
@@ -294,12 +723,36 @@ class NeuralNetworkClassifier(NeuralNetwork):
         super().__init__()
         self.classes = tuple(classes)
 
-    def probabilities(self, *args):
+    def probabilities(self, *args, compile: bool = False, batch_size: Optional[int] = None):
+        """
+        Returns the probability of each class predicted by the model
+
+        Parameters
+        ----------
+        *args :
+            the inputs of the model, and the optional arguments of their conversion to tensor
+        compile : bool
+            If True, the forward of the model is compiled with 'torch.compile'
+        batch_size : int or None
+            If not None, the inputs are converted and evaluated by batches of at most 'batch_size' observations,
+            so that the peak memory is bounded by the size of a batch. The predictions are concatenated in input order.
+        """
+        if batch_size is not None:
+            predictions = list(self.probabilities_iter(*args, compile=compile, batch_size=batch_size))
+            if len(predictions) > 0:
+                return concatenate_batches(predictions)
         self.eval()
         x = self._x_to_tensor(*args)
-        with torch.no_grad():
+        with torch.no_grad(), self._compiled(compile):
             y_pred = self(x)
         return self._tensor_to_proba(y_pred)
+
+    def probabilities_iter(self, x: object, *args, compile: bool = False, batch_size: int = 1024) -> Iterator[object]:
+        """
+        Yields the probabilities of each class for successive batches of at most 'batch_size' observations of 'x',
+        in order (see 'predict_iter')
+        """
+        return self._batched(self._tensor_to_proba, x, args, compile, batch_size)
     
     def _tensor_to_proba(self, T: torch.Tensor) -> object:
         raise NotImplementedError()
@@ -328,3 +781,11 @@ class NeuralNetworkClassifier(NeuralNetwork):
         else:
             data = (x, y)
         return data
+
+    def _micro_batch_weight(self, *batch) -> Union[float, torch.Tensor]:
+        """
+        returns the denominator of the weighted mean computed by 'cross_entropy' for the micro-batch,
+        which depends on the class weights if they are provided
+        """
+        arguments = inspect.signature(self.loss).bind(*batch).arguments
+        return cross_entropy_weight(arguments["y_target"], arguments.get("weights"), arguments.get("class_weights"))
@@ -0,0 +1,90 @@
+import torch
+from typing import Callable, Dict, List, Optional
+
+
+class CombinedOptimizer:
+    """
+    Steps several optimizers as a single one, each optimizing its own subset of the parameters.
+
+    Used to optimize the parameters with sparse gradients (the embeddings created with 'sparse=True')
+    with an optimizer supporting them, such as 'torch.optim.SparseAdam' which only updates
+    the rows of the embedding touched by the batch, while the other parameters are optimized
+    with a dense optimizer such as 'torch.optim.Adam'.
+    The 'param_groups' are those of the optimizers, so the learning rate can be scheduled as usual.
+    """
+
+    def __init__(self, *optimizers: torch.optim.Optimizer):
+        self.optimizers = list(optimizers)
+
+    @property
+    def param_groups(self) -> List[dict]:
+        return [g for optimizer in self.optimizers for g in optimizer.param_groups]
+
+    @property
+    def state(self) -> Dict[torch.Tensor, dict]:
+        return {p: s for optimizer in self.optimizers for p, s in optimizer.state.items()}
+
+    def step(self, closure: Optional[Callable[[], float]] = None) -> Optional[float]:
+        loss = None
+        if closure is not None:
+            with torch.enable_grad():
+                loss = closure()
+        for optimizer in self.optimizers:
+            optimizer.step()
+        return loss
+
+    def zero_grad(self, set_to_none: bool = True):
+        for optimizer in self.optimizers:
+            optimizer.zero_grad(set_to_none=set_to_none)
+
+    def state_dict(self) -> dict:
+        return {"optimizers": [optimizer.state_dict() for optimizer in self.optimizers]}
+
+    def load_state_dict(self, state_dict: dict):
+        for optimizer, state in zip(self.optimizers, state_dict["optimizers"]):
+            optimizer.load_state_dict(state)
+
+
+def set_weight_decay(optimizer: object, weight_decay: float):
+    """
+    sets the decoupled weight decay of the param groups of an optimizer provided by the user.
+    Only AdamW and SGD apply the 'weight_decay' of their param groups directly to the weights
+    (for SGD, it is only equivalent to a decoupled weight decay without momentum),
+    other optimizers such as Adam would add it to the gradients as a coupled L2 regularization.
+    The optimizers of the sparse parameters, that do not support weight decay, are left unchanged.
+    """
+    optimizers = optimizer.optimizers if isinstance(optimizer, CombinedOptimizer) else [optimizer]
+    optimizers = [o for o in optimizers if not isinstance(o, torch.optim.SparseAdam)]
+    for o in optimizers:
+        if not isinstance(o, (torch.optim.AdamW, torch.optim.SGD)):
+            raise ValueError(f"Decoupled weight decay is not supported by the optimizer '{type(o).__name__}', "
+                             "expected an AdamW or SGD optimizer")
+    for o in optimizers:
+        for g in o.param_groups:
+            g["weight_decay"] = weight_decay
+
+
+def sparse_parameters(module: torch.nn.Module) -> List[torch.nn.Parameter]:
+    """
+    returns the parameters of the module that receive sparse gradients
+    """
+    return [m.weight for m in module.modules()
+            if isinstance(m, (torch.nn.Embedding, torch.nn.EmbeddingBag)) and m.sparse]
+
+
+def default_optimizer(module: torch.nn.Module, learning_rate: float,
+                      weight_decay: Optional[float] = None):
+    """
+    returns the default optimizer of 'NeuralNetwork.fit':
+    Adam, or AdamW if a (decoupled) 'weight_decay' is provided.
+    The parameters with sparse gradients are optimized with SparseAdam (without weight decay).
+    """
+    sparse = sparse_parameters(module)
+    dense = [p for p in module.parameters() if not any(p is s for s in sparse)]
+    if weight_decay is None:
+        optimizer = torch.optim.Adam(dense, learning_rate)
+    else:
+        optimizer = torch.optim.AdamW(dense, learning_rate, weight_decay=weight_decay)
+    if len(sparse) == 0:
+        return optimizer
+    return CombinedOptimizer(optimizer, torch.optim.SparseAdam(sparse, learning_rate))
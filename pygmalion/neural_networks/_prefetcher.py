@@ -0,0 +1,188 @@
+import os
+import queue
+import random
+import threading
+import traceback
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from itertools import count
+from typing import Iterable, Optional, Union
+
+
+class _EndOfPass:
+    """
+    Sentinel put in a queue when a worker finished iterating once over the data
+    """
+    pass
+
+
+class _WorkerError:
+    """
+    Wrapper around the traceback of an exception raised in a worker
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+class Prefetcher:
+    """
+    A Prefetcher wraps an iterable of batches and prepares them in the background,
+    so that the next batches are built while the current one is being trained on.
+
+    Each iteration over the Prefetcher is one pass over the wrapped iterable.
+    With several workers, the passes are distributed in round robin between workers,
+    each worker iterating over its own copy of the wrapped iterable.
+    The order of the batches within a pass, and the order of the passes, are preserved.
+
+    Example
+    -------
+    >>> with Prefetcher(batches, queue_depth=4) as prefetched:
+    ...     for epoch in range(10):
+    ...         for batch in prefetched:
+    ...             ...
+    """
+
+    def __init__(self, iterable: Iterable, queue_depth: int = 2,
+                 n_workers: int = 1, processes: Optional[bool] = None):
+        """
+        Parameters
+        ----------
+        iterable : Iterable
+            the iterable to prefetch items from. It must be iterable several times.
+        queue_depth : int
+            maximum number of batches prepared in advance by each worker
+        n_workers : int
+            number of workers preparing batches in parallel
+        processes : bool or None
+            If True, the workers are processes and the tensors are passed through shared memory,
+            otherwise the workers are threads.
+            If None, processes are used only if there are several workers.
+            With processes the iterable must be picklable, and the iterable's global random state
+            is reseeded in each worker.
+        """
+        if queue_depth < 1:
+            raise ValueError(f"'queue_depth' must be at least 1, but got {queue_depth}")
+        if n_workers < 1:
+            raise ValueError(f"'n_workers' must be at least 1, but got {n_workers}")
+        self.iterable = iterable
+        self.queue_depth = queue_depth
+        self.n_workers = n_workers
+        self.processes = (n_workers > 1) if processes is None else processes
+        self._workers = None
+        self._queues = None
+        self._stop = None
+        self._n_passes = 0
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.iterable!r}, queue_depth={self.queue_depth}, n_workers={self.n_workers})"
+
+    def __iter__(self):
+        if self._workers is None:
+            self._start()
+        worker_index = self._n_passes % self.n_workers
+        self._n_passes += 1
+        while True:
+            item = self._get(worker_index)
+            if isinstance(item, _EndOfPass):
+                return
+            elif isinstance(item, _WorkerError):
+                raise RuntimeError(f"Exception raised while prefetching batches:\n{item.message}")
+            yield item
+
+    def __enter__(self) -> "Prefetcher":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        stops the workers, the batches prepared in advance are discarded
+        """
+        if self._workers is None:
+            return
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+            if self.processes and worker.is_alive():
+                worker.terminate()
+        if self.processes:
+            for q in self._queues:
+                q.cancel_join_thread()
+                q.close()
+        self._workers = None
+        self._queues = None
+        self._stop = None
+        self._n_passes = 0
+
+    def _start(self):
+        """
+        starts the workers
+        """
+        if self.processes:
+            Worker, Queue, Event = mp.Process, mp.Queue, mp.Event
+        else:
+            Worker, Queue, Event = threading.Thread, queue.Queue, threading.Event
+        self._stop = Event()
+        self._queues = [Queue(maxsize=self.queue_depth) for _ in range(self.n_workers)]
+        self._workers = [Worker(target=_prefetch, args=(self.iterable, q, self._stop, self.processes), daemon=True)
+                         for q in self._queues]
+        for worker in self._workers:
+            worker.start()
+
+    def _get(self, worker_index: int) -> object:
+        """
+        get the next item of the given worker, checking regularly that the worker is still alive
+        """
+        q, worker = self._queues[worker_index], self._workers[worker_index]
+        while True:
+            try:
+                return q.get(timeout=1.0)
+            except queue.Empty:
+                if not worker.is_alive():
+                    raise RuntimeError("A prefetching worker exited unexpectedly")
+
+
+def _prefetch(iterable: Iterable, q: Union[queue.Queue, mp.Queue],
+              stop: Union[threading.Event, mp.Event], reseed: bool):
+    """
+    loops indefinitely over the iterable, putting the items in the queue
+    """
+    if reseed:
+        seed = int.from_bytes(os.urandom(4), byteorder="little")
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+    try:
+        for _ in count():
+            for item in iterable:
+                if not _put(q, item, stop):
+                    return
+            if not _put(q, _EndOfPass(), stop):
+                return
+    except Exception:
+        _put(q, _WorkerError(traceback.format_exc()), stop)
+    finally:
+        if reseed:
+            q.cancel_join_thread()
+
+
+def _put(q: Union[queue.Queue, mp.Queue], item: object,
+         stop: Union[threading.Event, mp.Event]) -> bool:
+    """
+    put an item in the queue, returns False if the prefetching was stoped in the meantime
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        else:
+            return True
+    return False
+
@@ -6,6 +6,7 @@ from typing import List, Union, Iterable, Callable, Optional
 from .layers._normalizer import Normalizer
 from ._conversions import named_to_tensor, tensor_to_floats
 from .layers import Dense
+from ._freezing import fold_normalizer
 from ._neural_network import NeuralNetwork
 
 
@@ -16,6 +17,8 @@ class ProbabilityDistribution(NeuralNetwork):
     https://arxiv.org/abs/1811.00974
     """
 
+    _observation_arguments = ()  # the loss compares all the observations of the batch, it cannot be split
+
     def __init__(self, inputs: List[str], hidden_features: list[int],
                  normalize: bool=False, activation: str = "tanh",
                  dropout: Optional[float] = None, monotonic=False):
@@ -148,3 +151,12 @@ class ProbabilityDistribution(NeuralNetwork):
     @property
     def device(self) -> torch.device:
         return self.head.linear.weight.device
+
+    def _freeze(self):
+        """
+        folds the input normalizer into the first linear layer
+        """
+        if self.normalizer is not None:
+            first = self.layers[0] if len(self.layers) > 0 else self.head
+            fold_normalizer(self.normalizer, first.linear)
+            self.normalizer = None
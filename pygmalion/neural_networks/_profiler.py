@@ -0,0 +1,119 @@
+import pathlib
+import torch
+from contextlib import nullcontext
+from typing import Iterable, Iterator, Optional, Union
+
+
+class Profiler:
+    """
+    Captures 'torch.profiler' traces of some of the training steps of 'NeuralNetwork.fit'.
+
+    The profiler skips 'wait' steps, warms up during 'warmup' steps, then records 'active' steps,
+    and repeats this cycle 'repeat' times (or indefinitely if 'repeat' is 0).
+    The traces are annotated with named ranges for the "data", "forward", "backward",
+    "optimizer" and "validation" phases of each step, and contain the python stacks and
+    memory allocations. They are written in the output directory as '.pt.trace.json' files,
+    that can be opened with tensorboard, or with 'chrome://tracing' / perfetto.
+    When disabled (no directory), the profiler has no overhead.
+    """
+
+    def __init__(self, directory: Optional[Union[str, pathlib.Path]] = None,
+                 wait: int = 1, warmup: int = 1, active: int = 3, repeat: int = 1,
+                 with_stack: bool = True, profile_memory: bool = True,
+                 record_shapes: bool = False, worker_name: Optional[str] = None):
+        """
+        Parameters
+        ----------
+        directory : str or pathlib.Path or None
+            the directory where the traces are written (created if it does not exist).
+            If None, the profiler is disabled.
+        wait : int
+            number of steps skipped at the beginning of each cycle
+        warmup : int
+            number of steps during which the profiler runs without recording at each cycle
+        active : int
+            number of steps recorded at each cycle
+        repeat : int
+            number of cycles, or 0 to repeat until the end of training
+        with_stack : bool
+            If True, the python stack of the operations are recorded
+        profile_memory : bool
+            If True, the memory allocations and deallocations are recorded
+        record_shapes : bool
+            If True, the shapes of the operations inputs are recorded
+        worker_name : str or None
+            the name of the trace files, defaults to hostname and process id
+        """
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        self.wait = wait
+        self.warmup = warmup
+        self.active = active
+        self.repeat = repeat
+        self.with_stack = with_stack
+        self.profile_memory = profile_memory
+        self.record_shapes = record_shapes
+        self.worker_name = worker_name
+        self._profile: Optional[torch.profiler.profile] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def start(self, device: Optional[torch.device] = None):
+        """
+        starts the profiling of the operations on CPU (and on the given device if it is a GPU)
+        """
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if device is not None and torch.device(device).type == "cuda":
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        self._profile = torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(wait=self.wait, warmup=self.warmup,
+                                             active=self.active, repeat=self.repeat),
+            on_trace_ready=torch.profiler.tensorboard_trace_handler(str(self.directory), self.worker_name),
+            record_shapes=self.record_shapes,
+            profile_memory=self.profile_memory,
+            with_stack=self.with_stack)
+        self._profile.start()
+
+    def step(self):
+        """
+        signals the end of a training step to the profiler schedule
+        """
+        if self._profile is not None:
+            self._profile.step()
+
+    def stop(self):
+        """
+        stops the profiling, writing the trace of the ongoing active steps if any
+        """
+        if self._profile is not None:
+            profile, self._profile = self._profile, None
+            profile.stop()
+
+    def record(self, phase: str):
+        """
+        returns a context manager that annotates the operations performed inside of it with the given name
+        """
+        if self._profile is None:
+            return nullcontext()
+        return torch.profiler.record_function(phase)
+
+    def iterate(self, iterable: Iterable) -> Iterator:
+        """
+        iterates over the batches, annotating the time spent waiting for each batch as "data"
+        """
+        if self._profile is None:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self.record("data"):
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    return
+            yield batch
@@ -0,0 +1,103 @@
+import copy
+import time
+import statistics
+import torch
+import pandas as pd
+from typing import Iterable, List, Literal, Union, TYPE_CHECKING
+from .layers import Dense, QuantizedLinear
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork
+
+
+QUANTIZATION_MODE = Literal["dynamic_int8"]
+
+
+def quantize(model: "NeuralNetwork", mode: QUANTIZATION_MODE = "dynamic_int8",
+             min_elements: int = 2**18) -> "NeuralNetwork":
+    """
+    Returns an inference only copy of the model, with its linear layers quantized (see 'NeuralNetwork.quantize').
+    The names of the quantized layers are stored in the '_quantized' attribute of the copy,
+    so that the layers can be rebuilt when loading a '.pygmalion' file.
+    """
+    if mode not in QUANTIZATION_MODE.__args__:
+        raise ValueError(f"Unsupported quantization mode '{mode}', expected one of {QUANTIZATION_MODE.__args__}")
+    quantized = copy.deepcopy(model)
+    quantized.eval()
+    skipped = {id(m.linear) for m in quantized.modules() if isinstance(m, Dense) and m.monotonic}
+    names = [name for name, module in quantized.named_modules()
+             if type(module) is torch.nn.Linear and id(module) not in skipped
+             and module.weight.numel() >= min_elements]
+    for name in names:
+        replace_module(quantized, name, QuantizedLinear.from_linear(quantized.get_submodule(name)))
+    for parameter in quantized.parameters():
+        parameter.requires_grad_(False)
+    quantized._quantized = list(getattr(model, "_quantized", [])) + names
+    quantized.frozen = True
+    return quantized
+
+
+def quantization_report(model: "NeuralNetwork", quantized: "NeuralNetwork",
+                        validation_data: Union[Iterable, tuple], n_repeats: int = 5) -> pd.DataFrame:
+    """
+    Compares a model and its quantized copy on a validation set
+
+    Parameters
+    ----------
+    model : NeuralNetwork
+        the original model
+    quantized : NeuralNetwork
+        the copy returned by 'model.quantize'
+    validation_data : Iterable or tuple
+        same as the validation data of 'fit': a batch of tensors or an iterable of batches
+    n_repeats : int
+        number of evaluations of the validation set, of which the median duration is reported
+
+    Returns
+    -------
+    pd.DataFrame :
+        for each model ("float32" and the quantization mode), the validation loss,
+        the median duration in seconds of a forward pass over the validation set,
+        the speedup relative to the original model, and the size of the tensors in MB
+    """
+    if isinstance(validation_data, tuple):
+        validation_data = [validation_data]
+    validation_data = list(validation_data)
+    rows = {}
+    for name, m in [("float32", model), ("dynamic_int8", quantized)]:
+        m.eval()
+        loss = m._evaluate(validation_data)
+        durations = []
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            m._evaluate(validation_data)
+            durations.append(time.perf_counter() - start)
+        rows[name] = {"loss": loss, "latency (s)": statistics.median(durations), "size (MB)": _size(m) / 2**20}
+    report = pd.DataFrame.from_dict(rows, orient="index")
+    report["speedup"] = report.loc["float32", "latency (s)"] / report["latency (s)"]
+    return report[["loss", "latency (s)", "speedup", "size (MB)"]]
+
+
+def quantized_layers(model: torch.nn.Module, names: List[str]):
+    """
+    replaces in place the linear layers of the given names by uninitialized quantized layers,
+    to load the state dict of a quantized model
+    """
+    for name in names:
+        linear = model.get_submodule(name)
+        replace_module(model, name, QuantizedLinear(linear.in_features, linear.out_features,
+                                                    bias=linear.bias is not None, device=linear.weight.device))
+
+
+def replace_module(model: torch.nn.Module, name: str, module: torch.nn.Module):
+    """
+    replaces the submodule of the given dotted name
+    """
+    parent, _, child = name.rpartition(".")
+    setattr(model.get_submodule(parent), child, module)
+
+
+def _size(model: torch.nn.Module) -> int:
+    """
+    returns the size in bytes of the parameters and buffers of the model
+    """
+    return sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
@@ -0,0 +1,217 @@
+import io
+import json
+import pathlib
+import functools
+import importlib
+import torch
+from typing import Callable, Dict, List, Union, TYPE_CHECKING
+from ._quantization import quantized_layers
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork
+
+
+MAGIC = b"\x93PYGMALION"
+ALIGNMENT = 64
+PLAIN_TYPES = (type(None), bool, int, float, str)
+
+
+def records_config(init: Callable) -> Callable:
+    """
+    Wraps the '__init__' of a NeuralNetwork subclass so that the arguments
+    the model was constructed with are stored in its '_config' attribute.
+    Only the call of the most derived '__init__' is recorded.
+    """
+    @functools.wraps(init)
+    def __init__(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        if type(self).__init__ is __init__:
+            self._config = (args, kwargs)
+    return __init__
+
+
+def save_state(model: "NeuralNetwork", file: Union[str, pathlib.Path, io.IOBase]):
+    """
+    Saves the model as its constructor arguments (in JSON) followed by a flat blob of its tensors.
+
+    The file starts with the MAGIC bytes, followed by the length of the JSON header
+    as an 8 bytes little endian integer, and the JSON header itself.
+    The tensors of the state dict are then written contiguously, each starting at an offset
+    (relative to the start of the file) that is a multiple of ALIGNMENT bytes,
+    so that they can be memory mapped without copy.
+    """
+    config = model.__dict__.get("_config")
+    if config is None:
+        raise ValueError(f"The constructor arguments of the {type(model).__name__} model were not recorded, "
+                         "it can only be saved as a '.pth' file")
+    args, kwargs = config
+    tensors, entries, offsets = [], [], {}
+    offset = 0
+    for name, tensor in model.state_dict(keep_vars=False).items():
+        tensor = tensor.detach().cpu().contiguous()
+        key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tensor.dtype, tuple(tensor.shape))
+        if key not in offsets:  # tied tensors are only stored once
+            offsets[key] = offset
+            tensors.append((offset, tensor))
+            offset += -(-tensor.numel() * tensor.element_size() // ALIGNMENT) * ALIGNMENT
+        entries.append({"name": name, "dtype": str(tensor.dtype).replace("torch.", ""),
+                         "shape": list(tensor.shape), "offset": offsets[key]})
+    header = {"type": type(model).__name__,
+              "module": type(model).__module__,
+              "args": _encode(list(args)),
+              "kwargs": _encode(dict(kwargs)),
+              "attributes": {name: _attributes(module) for name, module in model.named_modules()},
+              "tensors": entries}
+    if model.__dict__.get("_quantized"):
+        header["quantized"] = list(model._quantized)
+    header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    start = _align(len(MAGIC) + 8 + len(header))
+    if isinstance(file, io.IOBase):
+        _write(file, header, start, tensors)
+    else:
+        with open(file, "wb") as f:
+            _write(f, header, start, tensors)
+
+
+def load_state(file: Union[str, pathlib.Path, io.IOBase, bytes]) -> "NeuralNetwork":
+    """
+    Loads a model saved with 'save_state'.
+    If a path is given, the tensors of the model are memory mapped from the file (copy on write):
+    they are paged in lazily, and the read-only pages are shared between the processes loading the same file.
+    Otherwise the tensors are views of the read bytes.
+    """
+    if isinstance(file, io.IOBase):
+        file = file.read()
+    if isinstance(file, (bytes, bytearray)):
+        blob = torch.frombuffer(bytearray(file), dtype=torch.uint8)
+    else:
+        path = pathlib.Path(file)
+        blob = torch.from_file(str(path), shared=False, size=path.stat().st_size, dtype=torch.uint8)
+    if bytes(blob[:len(MAGIC)].numpy()) != MAGIC:
+        raise ValueError("The file is not a pygmalion state file")
+    length = int.from_bytes(bytes(blob[len(MAGIC):len(MAGIC)+8].numpy()), "little")
+    header = json.loads(bytes(blob[len(MAGIC)+8:len(MAGIC)+8+length].numpy()).decode("utf-8"))
+    start = _align(len(MAGIC) + 8 + length)
+    cls = _resolve_type(header["type"], header["module"])
+    with torch.device("meta"):
+        model = cls(*_decode(header["args"]), **_decode(header["kwargs"]))
+        if "quantized" in header:
+            quantized_layers(model, header["quantized"])
+            model._quantized = header["quantized"]
+    state = {}
+    for entry in header["tensors"]:
+        dtype = getattr(torch, entry["dtype"])
+        shape = entry["shape"]
+        n_bytes = _numel(shape) * torch.empty((), dtype=dtype).element_size()
+        offset = start + entry["offset"]
+        state[entry["name"]] = blob[offset:offset+n_bytes].view(dtype).reshape(shape)
+    model.load_state_dict(state, assign=True)
+    for name, attributes in header["attributes"].items():
+        module = model.get_submodule(name)
+        for key, value in attributes.items():
+            setattr(module, key, _decode(value))
+    model._config = (tuple(_decode(header["args"])), _decode(header["kwargs"]))
+    meta = [name for name, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if len(meta) > 0:
+        raise RuntimeError(f"The tensors {meta} of the {cls.__name__} model were not found in the file")
+    return model.eval()
+
+
+def is_state_file(file: Union[str, pathlib.Path, io.IOBase]) -> bool:
+    """
+    returns True if the file starts with the MAGIC bytes of the files written by 'save_state'
+    """
+    if isinstance(file, io.IOBase):
+        position = file.tell()
+        magic = file.read(len(MAGIC))
+        file.seek(position)
+    else:
+        with open(file, "rb") as f:
+            magic = f.read(len(MAGIC))
+    return magic == MAGIC
+
+
+def _write(file: io.IOBase, header: bytes, start: int, tensors: List[tuple]):
+    """
+    writes the header and the aligned tensors to the file
+    """
+    file.write(MAGIC)
+    file.write(len(header).to_bytes(8, "little"))
+    file.write(header)
+    position = len(MAGIC) + 8 + len(header)
+    for offset, tensor in tensors:
+        file.write(b"\x00" * (start + offset - position))
+        data = memoryview(tensor.reshape(-1).view(torch.uint8).numpy())
+        file.write(data)
+        position = start + offset + len(data)
+
+
+def _attributes(module: torch.nn.Module) -> Dict[str, object]:
+    """
+    returns the public attributes of the module that are plain values (or lists and tuples of plain values),
+    such as the number of observations of the Normalizer layers, which are not part of the state dict
+    """
+    return {k: _encode(v) for k, v in module.__dict__.items()
+            if not k.startswith("_") and k != "training" and
+            (isinstance(v, PLAIN_TYPES) or (isinstance(v, (list, tuple)) and all(isinstance(i, PLAIN_TYPES) for i in v)))}
+
+
+def _encode(value: object) -> object:
+    """
+    converts a constructor argument to a JSON serializable object
+    """
+    from pygmalion._model import Model
+    if isinstance(value, PLAIN_TYPES):
+        return value
+    elif isinstance(value, list):
+        return [_encode(v) for v in value]
+    elif isinstance(value, tuple):
+        return {"tuple": [_encode(v) for v in value]}
+    elif isinstance(value, dict):
+        return {"dict": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    elif isinstance(value, Model) and not isinstance(value, torch.nn.Module):
+        return {"model": value.dump}
+    elif isinstance(value, type) or callable(value) and hasattr(value, "__qualname__"):
+        return {"object": value.__qualname__, "module": value.__module__}
+    raise TypeError(f"Cannot serialize object of type {type(value).__name__}")
+
+
+def _decode(value: object) -> object:
+    """
+    converts back an object encoded with '_encode'
+    """
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    elif not isinstance(value, dict):
+        return value
+    elif "tuple" in value:
+        return tuple(_decode(v) for v in value["tuple"])
+    elif "dict" in value:
+        return {_decode(k): _decode(v) for k, v in value["dict"]}
+    elif "model" in value:
+        from pygmalion.utilities._load_model import _from_dump
+        return _from_dump(value["model"])
+    elif "object" in value:
+        obj = importlib.import_module(value["module"])
+        for name in value["object"].split("."):
+            obj = getattr(obj, name)
+        return obj
+    raise ValueError(f"Cannot deserialize {value}")
+
+
+def _resolve_type(name: str, module: str) -> type:
+    """
+    returns the model class, looked up by name in pygmalion.neural_networks first
+    (so that the file does not depend on the module the class is defined in), then in its module
+    """
+    neural_networks = importlib.import_module("pygmalion.neural_networks")
+    if hasattr(neural_networks, name):
+        return getattr(neural_networks, name)
+    return getattr(importlib.import_module(module), name)
+
+
+def _align(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def _numel(shape: List[int]) -> int:
+    return functools.reduce(lambda a, b: a * b, shape, 1)
@@ -0,0 +1,67 @@
+import pathlib
+import torch
+from typing import Dict, Optional, Union
+
+
+class StateSnapshot:
+    """
+    A preallocated copy of the state dict of a module on CPU.
+
+    The buffers are allocated once, and updated inplace at each snapshot,
+    so that checkpointing the model does not allocate memory.
+    The buffers can optionally be views in a memory-mapped file instead of RAM.
+    """
+
+    ALIGNMENT: int = 64
+
+    def __init__(self, module: torch.nn.Module,
+                 file_path: Optional[Union[str, pathlib.Path]] = None):
+        """
+        Parameters
+        ----------
+        module : torch.nn.Module
+            the module to snapshot the state of
+        file_path : str or pathlib.Path or None
+            If provided, the snapshot is stored in a memory mapped file at the given path
+            (the file is created or overwritten), instead of in RAM
+        """
+        self.module = module
+        self.file_path = pathlib.Path(file_path) if file_path is not None else None
+        state = module.state_dict()
+        if self.file_path is None:
+            self.state: Dict[str, torch.Tensor] = {k: torch.empty_like(v, device="cpu") for k, v in state.items()}
+        else:
+            if not self.file_path.parent.is_dir():
+                raise NotADirectoryError(f"The directory '{self.file_path.parent}' does not exist")
+            offsets, offset = [], 0
+            for v in state.values():
+                offsets.append(offset)
+                offset += self._aligned(v.numel() * v.element_size())
+            self.file_path.unlink(missing_ok=True)
+            blob = torch.from_file(str(self.file_path), shared=True, size=max(1, offset), dtype=torch.uint8)
+            self.state = {k: blob[o:o+v.numel()*v.element_size()].view(v.dtype).view(v.shape)
+                          for (k, v), o in zip(state.items(), offsets)}
+        self.update()
+
+    def update(self, state: Optional[Dict[str, torch.Tensor]] = None):
+        """
+        copies inplace the given state dict (or the current state of the module) into the snapshot
+        """
+        if state is None:
+            state = self.module.state_dict()
+        with torch.no_grad():
+            for k, v in state.items():
+                self.state[k].copy_(v)
+
+    def restore(self):
+        """
+        loads back the snapshot into the module
+        """
+        self.module.load_state_dict(self.state)
+
+    @classmethod
+    def _aligned(cls, n_bytes: int) -> int:
+        """
+        returns the smallest multiple of the alignment larger or equal to the given number of bytes
+        """
+        return -(-n_bytes // cls.ALIGNMENT) * cls.ALIGNMENT
@@ -0,0 +1,145 @@
+import json
+import pathlib
+import torch
+from time import perf_counter
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, Iterator, List, Optional, Union, TYPE_CHECKING
+from ._micro_batching import n_observations
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork
+
+
+class Telemetry:
+    """
+    Records the wall time spent in each phase of the training steps,
+    and the training throughput.
+
+    Each step produces a record (a dict) with keys:
+        "step" : the step number
+        "data", "forward", "backward", "optimizer", "validation", "checkpoint" :
+            the time in seconds spent waiting for the training batches,
+            evaluating the loss, backpropagating, updating the parameters
+            (including the gradients post-processing), evaluating the validation loss,
+            and checkpointing the model
+        "total" : the total wall time of the step in seconds
+        "samples" : the number of training observations of the step
+        "tokens" : the number of (non padding) training tokens of the step, or None for non text models
+        "samples_per_second", "tokens_per_second" : the training throughput
+
+    If the records of a step show that most of the time is spent in "data",
+    the training is input-bound, otherwise it is compute-bound.
+    When disabled, the telemetry has no overhead.
+    On GPU, the device is synchronized before and after each phase,
+    so that the asynchronous kernels are attributed to the right phase.
+    """
+
+    PHASES = ("data", "forward", "backward", "optimizer", "validation", "checkpoint")
+
+    def __init__(self, enabled: bool = True, device: Optional[torch.device] = None,
+                 file_path: Optional[Union[str, pathlib.Path]] = None):
+        """
+        Parameters
+        ----------
+        enabled : bool
+            If False, nothing is recorded
+        device : torch.device or None
+            the device the model is trained on
+        file_path : str or pathlib.Path or None
+            if provided, the records are also streamed to this file
+            (overwritten if it exists) in the JSON lines format, one line per step
+        """
+        self.enabled = enabled
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        self.records: List[dict] = []
+        self._current: Optional[dict] = None
+        self._start: Optional[float] = None
+        self._file = open(file_path, "w") if (enabled and file_path is not None) else None
+
+    def start(self, step: int):
+        """
+        ends the record of the previous step, and starts the record of the given step
+        """
+        if not self.enabled:
+            return
+        self._end()
+        self._synchronize()
+        self._current = {"step": step, **{phase: 0. for phase in self.PHASES}, "samples": 0, "tokens": None}
+        self._start = perf_counter()
+
+    def measure(self, phase: str):
+        """
+        returns a context manager that adds the time spent inside of it to the given phase of the current step
+        """
+        if not self.enabled or self._current is None:
+            return nullcontext()
+        return self._measure(phase)
+
+    def iterate(self, iterable: Iterable) -> Iterator:
+        """
+        iterates over the batches, measuring the time spent waiting for each batch as "data"
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self.measure("data"):
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    return
+            yield batch
+
+    def count(self, model: "NeuralNetwork", batch: tuple):
+        """
+        adds the number of observations and tokens of the training batch to the current step
+        """
+        if not self.enabled or self._current is None:
+            return
+        self._current["samples"] += n_observations(batch)
+        n_tokens = model._n_tokens(*batch)
+        if n_tokens is not None:
+            self._current["tokens"] = (self._current["tokens"] or 0) + n_tokens
+
+    def close(self):
+        """
+        ends the record of the last step, and closes the file
+        """
+        if not self.enabled:
+            return
+        self._end()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @contextmanager
+    def _measure(self, phase: str):
+        self._synchronize()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._synchronize()
+            self._current[phase] += perf_counter() - start
+
+    def _end(self):
+        """
+        ends the record of the current step
+        """
+        if self._current is None:
+            return
+        self._synchronize()
+        record, self._current = self._current, None
+        record["total"] = perf_counter() - self._start
+        record["samples_per_second"] = record["samples"] / record["total"] if record["total"] > 0 else None
+        record["tokens_per_second"] = (record["tokens"] / record["total"]
+                                       if (record["tokens"] is not None and record["total"] > 0) else None)
+        self.records.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def _synchronize(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
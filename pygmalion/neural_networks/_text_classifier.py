@@ -23,7 +23,8 @@ class TextClassifier(NeuralNetworkClassifier):
                  positional_encoding_type: Optional[POSITIONAL_ENCODING_TYPE] = SinusoidalPositionalEncoding,
                  positional_encoding_kwargs: dict={},
                  attention_type: ATTENTION_TYPE = ScaledDotProductAttention,
-                 attention_kwargs: dict = {}):
+                 attention_kwargs: dict = {},
+                 sparse_embeddings: bool = False):
         """
         Parameters
         ----------
@@ -54,13 +55,17 @@ class TextClassifier(NeuralNetworkClassifier):
             type of attention for multi head attention
         attention_kwargs : dict
             additional kwargs passed to attention_type initializer
+        sparse_embeddings : bool
+            If True, the gradients of the embeddings are sparse: only the rows of the tokens
+            present in the batch are updated by the optimizer, which is faster with large vocabularies.
+            See 'NeuralNetwork.fit' for the optimizers supporting sparse gradients.
         """
         super().__init__(classes)
         self.mask_padding = mask_padding
         embedding_dim = projection_dim*n_heads
         self.tokenizer = tokenizer
         self.embedding = torch.nn.Embedding(self.tokenizer.n_tokens,
-                                                  embedding_dim)
+                                                  embedding_dim, sparse=sparse_embeddings)
         self.dropout_input = Dropout(dropout)
         if positional_encoding_type is None:
             self.positional_encoding = None
@@ -112,6 +117,9 @@ class TextClassifier(NeuralNetworkClassifier):
         y_pred = self(x)
         return cross_entropy(y_pred, y_target, weights, class_weights)
 
+    def _n_tokens(self, x, y_target, *args) -> int:
+        return int((x != self.tokenizer.PAD).sum())
+
     @property
     def device(self) -> torch.device:
         return self.head.weight.device
@@ -1,13 +1,13 @@
 import torch
 import numpy as np
-from typing import Union, List, Tuple, Sequence, Optional
+from typing import Union, List, Tuple, Sequence, Optional, Iterable, Iterator
 from itertools import count
 from warnings import warn
 from .layers.transformers import TransformerEncoder, TransformerDecoder, ATTENTION_TYPE, ScaledDotProductAttention
 from .layers.positional_encoding import SinusoidalPositionalEncoding, POSITIONAL_ENCODING_TYPE
 from .layers import Dropout, beam_search
 from ._conversions import strings_to_tensor, tensor_to_strings
-from ._conversions import floats_to_tensor
+from ._conversions import floats_to_tensor, split_batches
 from ._neural_network import NeuralNetwork
 from ._loss_functions import cross_entropy
 from pygmalion.tokenizers._utilities import Tokenizer
@@ -26,7 +26,8 @@ class TextTranslator(NeuralNetwork):
                  input_positional_encoding_kwargs: dict={},
                  output_positional_encoding_kwargs: dict={},
                  attention_type: ATTENTION_TYPE = ScaledDotProductAttention,
-                 attention_kwargs: dict = {}):
+                 attention_kwargs: dict = {},
+                 sparse_embeddings: bool = False):
         """
         Parameters
         ----------
@@ -62,6 +63,10 @@ class TextTranslator(NeuralNetwork):
             type of attention for multi head attention
         attention_kwargs : dict
             additional kwargs passed to attention_type initializer
+        sparse_embeddings : bool
+            If True, the gradients of the embeddings are sparse: only the rows of the tokens
+            present in the batch are updated by the optimizer, which is faster with large vocabularies.
+            See 'NeuralNetwork.fit' for the optimizers supporting sparse gradients.
         """
         super().__init__()
         self.mask_padding = mask_padding
@@ -70,9 +75,9 @@ class TextTranslator(NeuralNetwork):
         self.tokenizer_input = tokenizer_input
         self.tokenizer_output = tokenizer_output
         self.embedding_input = torch.nn.Embedding(self.tokenizer_input.n_tokens,
-                                                  embedding_dim)
+                                                  embedding_dim, sparse=sparse_embeddings)
         self.embedding_output = torch.nn.Embedding(self.tokenizer_output.n_tokens,
-                                                embedding_dim)
+                                                embedding_dim, sparse=sparse_embeddings)
         self.dropout_input = Dropout(dropout)
         self.dropout_output = Dropout(dropout)
         if positional_encoding_type is None:
@@ -176,6 +181,14 @@ class TextTranslator(NeuralNetwork):
         return cross_entropy(y_pred.transpose(1, 2), y_target[:, 1:],
                              weights, class_weights, label_smoothing=self.label_smoothing)
 
+    def _micro_batch_weight(self, x, y_target, weights=None) -> torch.Tensor:
+        if weights is not None:
+            return weights.sum()
+        return (y_target[:, 1:] != self.tokenizer_output.PAD).sum()
+
+    def _n_tokens(self, x, y_target, *args) -> int:
+        return int((x != self.tokenizer_input.PAD).sum() + (y_target != self.tokenizer_output.PAD).sum())
+
     # def predict(self, sequences: List[str], max_tokens: Optional[int] = None,
     #             n_beams: int = 1) -> List[str]:
     #     """
@@ -243,36 +256,68 @@ class TextTranslator(NeuralNetwork):
     #         translations = [self.tokenizer_output.decode(p.cpu().tolist()) for p in predicted]
     #         return translations
 
-    def predict(self, string: str, max_tokens: Optional[int] = None, n_beams: int = 1) -> List[str]:
+    def predict(self, string: str, max_tokens: Optional[int] = None, n_beams: int = 1,
+                compile: bool = False) -> List[str]:
         """
         Predict a translation for the given sequence using beam search,
         outputing at most 'max_tokens' tokens.
+        If 'compile' is True, the encoder is compiled with 'torch.compile',
+        the decoding with history (of growing length) stays in eager mode.
         """
         self.eval()
         with torch.no_grad():
-            # encode input
             X = self._x_to_tensor([string], self.device, raise_on_longer_sequences=True)
-            START = self.tokenizer_output.START
-            END = self.tokenizer_output.END
-            PAD = self.tokenizer_input.PAD
-            encoded_padding_mask = (X == PAD) if self.mask_padding else None
-            encoded = self(X, encoded_padding_mask)
-            # decode encoded input
-            sequences = [[START]]
-            histories = [tuple({} for _ in self.decoder.stages)]
-            sum_likelyhoods = [0.]
-            counter = range(max_tokens) if max_tokens is not None else count(0)
-            for _ in counter:
-                predicted_likelyhoods = [torch.log(torch.softmax(self.decode(torch.tensor(sequence[-1:], dtype=torch.long, device=self.device).unsqueeze(0),
-                                                   encoded, encoded_padding_mask, history), dim=-1))
-                                         if sequence[-1] != END else None
-                                         for sequence, history in zip(sequences, histories)]
-                beam_search(n_beams, sequences, histories, sum_likelyhoods, predicted_likelyhoods)
-                if all(sequence[-1] == END for sequence in sequences):
-                    break
-            # get final beams
-            return [self.tokenizer_output.decode(sequence[1:-1]) for sequence in sequences]
+            encoded_padding_mask = (X == self.tokenizer_input.PAD) if self.mask_padding else None
+            with self._compiled(compile):
+                encoded = self(X, encoded_padding_mask)
+            return self._decode_beams(encoded, encoded_padding_mask, max_tokens, n_beams)
+
+    def predict_iter(self, strings: Iterable[str], max_tokens: Optional[int] = None, n_beams: int = 1,
+                     compile: bool = False, batch_size: int = 64) -> Iterator[List[List[str]]]:
+        """
+        Yields the translations (as returned by 'predict') of successive batches of at most 'batch_size' strings, in order.
+        'strings' can also be an iterable of strings (such as the lines of a file), which is consumed lazily.
+        The strings of a batch are encoded in a single call of the encoder if 'mask_padding' is True
+        (otherwise the padding would change their encoding), then decoded one at a time with beam search.
+        """
+        if isinstance(strings, str):
+            strings = [strings]
+        self.eval()
+        for batch in split_batches(strings, batch_size):
+            groups = [list(batch)] if self.mask_padding else [[string] for string in batch]
+            translations = []
+            with torch.no_grad():
+                for group in groups:
+                    X = self._x_to_tensor(group, self.device, raise_on_longer_sequences=True)
+                    encoded_padding_mask = (X == self.tokenizer_input.PAD) if self.mask_padding else None
+                    with self._compiled(compile):
+                        encoded = self(X, encoded_padding_mask)
+                    for i in range(len(group)):
+                        translations.append(self._decode_beams(
+                            encoded[i:i+1], None if encoded_padding_mask is None else encoded_padding_mask[i:i+1],
+                            max_tokens, n_beams))
+            yield translations
 
+    def _decode_beams(self, encoded: torch.Tensor, encoded_padding_mask: Optional[torch.Tensor],
+                      max_tokens: Optional[int], n_beams: int) -> List[str]:
+        """
+        returns the translations of the beams decoded from the encoding of a single string
+        """
+        START = self.tokenizer_output.START
+        END = self.tokenizer_output.END
+        sequences = [[START]]
+        histories = [tuple({} for _ in self.decoder.stages)]
+        sum_likelyhoods = [0.]
+        counter = range(max_tokens) if max_tokens is not None else count(0)
+        for _ in counter:
+            predicted_likelyhoods = [torch.log(torch.softmax(self.decode(torch.tensor(sequence[-1:], dtype=torch.long, device=self.device).unsqueeze(0),
+                                               encoded, encoded_padding_mask, history), dim=-1))
+                                     if sequence[-1] != END else None
+                                     for sequence, history in zip(sequences, histories)]
+            beam_search(n_beams, sequences, histories, sum_likelyhoods, predicted_likelyhoods)
+            if all(sequence[-1] == END for sequence in sequences):
+                break
+        return [self.tokenizer_output.decode(sequence[1:-1]) for sequence in sequences]
 
     def _predict_naive(self, sequences: List[str], max_tokens: Optional[int] = None) -> List[str]:
         """
@@ -1,6 +1,6 @@
 import torch
 import pandas as pd
-from typing import Optional, Iterable, Union
+from typing import Optional, Iterable, Iterator, Union
 from .layers.transformers import TransformerEncoder, TransformerDecoder, ATTENTION_TYPE, ScaledDotProductAttention
 from .layers import Normalizer
 from ._conversions import named_to_tensor, tensor_to_dataframe, floats_to_tensor
@@ -10,6 +10,8 @@ from ._loss_functions import MSE
 
 class TimeSeriesRegressor(NeuralNetwork):
 
+    _observation_arguments = ("X", "Tx", "x_padding_mask", "Y", "Ty", "y_padding_mask", "weights")
+
     def __init__(self, inputs: Iterable[str], targets: Iterable[str],
                  observation_column: str, time_column: Optional[str],
                  n_stages: int, projection_dim: int, n_heads: int,
@@ -181,6 +183,10 @@ class TimeSeriesRegressor(NeuralNetwork):
             Y = self.target_normalizer(Y, y_padding_mask)
         return MSE(y_pred, Y, w)
 
+    def _micro_batch_weight(self, X, Tx, x_padding_mask, Y, Ty, y_padding_mask, weights=None) -> torch.Tensor:
+        w = (weights * ~y_padding_mask) if weights is not None else ~y_padding_mask
+        return w.sum()
+
     @property
     def device(self) -> torch.device:
         return self.head.weight.device
@@ -232,7 +238,8 @@ class TimeSeriesRegressor(NeuralNetwork):
        df = tensor_to_dataframe(y_pred.reshape(-1, D), self.targets)
        return df[~padding_mask.reshape(-1).cpu().numpy()]
 
-    def predict(self, df: pd.DataFrame, times: Union[pd.DataFrame, Iterable[float], int]) -> pd.DataFrame:
+    def predict(self, df: pd.DataFrame, times: Union[pd.DataFrame, Iterable[float], int],
+                compile: bool = False, batch_size: Optional[int] = None) -> pd.DataFrame:
         """
         Parameters
         ----------
@@ -242,7 +249,14 @@ class TimeSeriesRegressor(NeuralNetwork):
             either a dataframe with observation/time columns
             or a unique sequence of times at which will be predicted the future of all past observations
             or - when no time_column was defined - an integer number of time steps to predict for all past observations
+        compile : bool
+            If True, the forward of the model is compiled with 'torch.compile'
+        batch_size : int or None
+            If not None, the time series are evaluated by batches of at most 'batch_size' values of the observation column
+            (see 'predict_iter'), so that the peak memory is bounded by the size of a batch.
         """
+        if batch_size is not None:
+            return pd.concat(list(self.predict_iter(df, times, compile=compile, batch_size=batch_size)))
         self.eval()
         X, Tx, x_padding_mask = self._x_to_tensor(self.inputs, df, device=self.device)
         if isinstance(times, int):
@@ -264,7 +278,7 @@ class TimeSeriesRegressor(NeuralNetwork):
                 Ly, Ty, y_padding_mask = len(times), floats_to_tensor(times, device=self.device).reshape(1, -1, 1), None
             else:
                 raise ValueError(f"'times' argument of type '{type(times)}' is unsupported")
-        with torch.no_grad():
+        with torch.no_grad(), self._compiled(compile):
             y_pred = self(X, Tx, x_padding_mask,
                           Ly, Ty, y_padding_mask)
         if self.target_normalizer is not None:
@@ -278,3 +292,22 @@ class TimeSeriesRegressor(NeuralNetwork):
         for sub, obs in zip(dfs, df[self.observation_column].unique()):
             sub[self.observation_column] = obs
         return pd.concat(dfs)
+
+    def predict_iter(self, df: pd.DataFrame, times: Union[pd.DataFrame, Iterable[float], int],
+                     compile: bool = False, batch_size: int = 1024) -> Iterator[pd.DataFrame]:
+        """
+        Yields the predictions (as returned by 'predict') of successive batches of at most 'batch_size' time series,
+        in the order of the values of the observation column.
+        The rows of an observation are never split between batches.
+        """
+        if batch_size < 1:
+            raise ValueError(f"'batch_size' must be a strictly positive integer, got {batch_size}")
+        observations = [obs for obs, _ in df.groupby(self.observation_column)]
+        for i in range(0, len(observations), batch_size):
+            batch = observations[i:i+batch_size]
+            if isinstance(times, pd.DataFrame):
+                batch_times = times[times[self.observation_column].isin(batch)]
+            else:
+                batch_times = times
+            yield self.predict(df[df[self.observation_column].isin(batch)], batch_times, compile=compile)
+
@@ -0,0 +1,122 @@
+import copy
+import torch
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Iterable, List, Tuple, Optional, Dict, TYPE_CHECKING
+if TYPE_CHECKING:
+    from ._neural_network import NeuralNetwork, PRECISION
+    from ._micro_batching import MicroBatcher
+
+
+class ValidationScheduler:
+    """
+    Schedules the evaluation of the validation loss during training.
+
+    The validation is performed every 'frequency' steps, either synchronously
+    on the trained model, or asynchronously in a background thread on a snapshot
+    of the weights while the training continues.
+    In asynchronous mode there is at most one validation running at a time,
+    a validation due while another is running is delayed until it ends.
+    """
+
+    def __init__(self, model: "NeuralNetwork", validation_data: Iterable,
+                 frequency: int = 1, asynchronous: bool = False,
+                 precision: "PRECISION" = "fp32",
+                 distributed: bool = False,
+                 micro_batcher: Optional["MicroBatcher"] = None):
+        """
+        Parameters
+        ----------
+        model : NeuralNetwork
+            the trained model
+        validation_data : Iterable of tuples
+            the batches of validation data
+        frequency : int
+            the validation is performed every 'frequency' steps
+        asynchronous : bool
+            If True, the validation is performed in a background thread
+            on a copy of the model
+        precision : one of {"fp32", "bf16", "fp16"}
+            precision of the forward computations
+        distributed : bool
+            If True, the validation loss is averaged over the validation batches of all processes
+        micro_batcher : MicroBatcher or None
+            if provided, the validation batches are evaluated by micro-batches
+        """
+        if frequency < 1:
+            raise ValueError(f"The validation frequency must be at least 1, but got {frequency}")
+        self.model = model
+        self.validation_data = validation_data
+        self.frequency = frequency
+        self.asynchronous = asynchronous
+        self.precision = precision
+        self.distributed = distributed
+        self.micro_batcher = micro_batcher
+        self._due = False
+        self._copy: Optional["NeuralNetwork"] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running: Optional[Tuple[int, Dict[str, torch.Tensor], Future]] = None
+
+    def step(self, step: int, start_step: int) -> List[Tuple[int, float, Optional[Dict[str, torch.Tensor]]]]:
+        """
+        Launch the validation if it is due at the given step,
+        and returns the results of the validations that ended since last call
+
+        Returns
+        -------
+        list of tuple :
+            list of (step, val_loss, state) with 'state' the validated weights,
+            or None if the validated weights are the current weights of the model
+        """
+        self._due = self._due or ((step - start_step) % self.frequency == 0)
+        results = []
+        if not self.asynchronous:
+            if self._due:
+                self._due = False
+                results.append((step, self.model._evaluate(self.validation_data, self.precision, self.distributed, self.micro_batcher), None))
+            return results
+        if self._running is not None and self._running[-1].done():
+            results.append(self._collect())
+        if self._due and self._running is None:
+            self._due = False
+            self._launch(step)
+        return results
+
+    def close(self, wait: bool = True) -> List[Tuple[int, float, Optional[Dict[str, torch.Tensor]]]]:
+        """
+        stops the background thread, and returns the result of the running validation if 'wait' is True
+        """
+        results = []
+        if self._running is not None and wait:
+            results.append(self._collect())
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        self._running = None
+        return results
+
+    def _launch(self, step: int):
+        """
+        snapshot the weights and launch the validation in the background
+        """
+        if self._copy is None:
+            self._copy = copy.deepcopy(self.model)
+            self._copy.requires_grad_(False)
+            self._copy.eval()
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        state = {k: v.detach().clone() for k, v in self.model.state_dict().items()}
+        self._running = (step, state, self._executor.submit(self._validate, state))
+
+    def _validate(self, state: Dict[str, torch.Tensor]) -> float:
+        """
+        evaluates the validation loss of the model copy with the given weights
+        """
+        self._copy.load_state_dict(state)
+        return self._copy._evaluate(self.validation_data, self.precision, micro_batcher=self.micro_batcher)
+
+    def _collect(self) -> Tuple[int, float, Dict[str, torch.Tensor]]:
+        """
+        wait for the running validation to end and returns its result
+        """
+        step, state, future = self._running
+        self._running = None
+        return step, future.result(), state
@@ -3,4 +3,5 @@ from ._dropout import Dropout, Dropout1d, Dropout2d
 from ._normalizer import Normalizer
 from ._layer_norm import LayerNorm
 from ._dense import Dense
+from ._quantized_linear import QuantizedLinear
 from ._utilities import beam_search
\ No newline at end of file
@@ -0,0 +1,53 @@
+import threading
+from typing import Callable, Collection, Union
+from torch.utils.checkpoint import checkpoint as _checkpoint
+
+
+GRADIENT_CHECKPOINTING = Union[bool, Collection[int]]
+
+_state = threading.local()
+
+
+def checkpoint(function: Callable, *args):
+    """
+    Evaluates the function with gradient checkpointing:
+    only its inputs are saved for backward, and its activations are recomputed during backward.
+    The checkpoints nested inside of an already checkpointed function are ignored,
+    so that the activations are never recomputed twice.
+    """
+    if is_checkpointing():
+        return function(*args)
+    return _checkpoint(_nested(function), *args, use_reentrant=True)
+
+
+def is_checkpointing() -> bool:
+    """
+    returns True if called from inside a checkpointed function
+    """
+    return getattr(_state, "depth", 0) > 0
+
+
+def is_checkpointed(gradient_checkpointing: GRADIENT_CHECKPOINTING, index: int) -> bool:
+    """
+    returns True if the stage of the given index is checkpointed,
+    given the 'gradient_checkpointing' setting of a stack of stages:
+    a bool applying to all the stages, or the collection of the indexes of the checkpointed stages
+    """
+    if isinstance(gradient_checkpointing, bool):
+        return gradient_checkpointing
+    return index in gradient_checkpointing
+
+
+def _nested(function: Callable) -> Callable:
+    """
+    wraps the function so that the checkpoints inside of it are ignored,
+    both during the forward and during the recomputation in the backward
+    """
+    def wrapped(*args):
+        depth = getattr(_state, "depth", 0)
+        _state.depth = depth + 1
+        try:
+            return function(*args)
+        finally:
+            _state.depth = depth
+    return wrapped
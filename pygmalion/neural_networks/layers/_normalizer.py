@@ -1,7 +1,21 @@
-from typing import Optional
+import functools
+from typing import Callable, Optional
 import torch
 
 
+def _compiler_disabled(method: Callable) -> Callable:
+    """
+    equivalent to the 'torch.compiler.disable' decorator, but only imports torch._dynamo
+    (which is slow to import) when the method is called from a compiled function
+    """
+    @functools.wraps(method)
+    def wrapped(*args, **kwargs):
+        if torch.compiler.is_compiling():
+            return torch.compiler.disable(method)(*args, **kwargs)
+        return method(*args, **kwargs)
+    return wrapped
+
+
 class Normalizer(torch.nn.Module):
     """
     Normalize a tensor along the given dimension based on a running average
@@ -55,20 +69,29 @@ class Normalizer(torch.nn.Module):
         if X.shape[self.dim] != self.num_features:
             raise ValueError(f"Expected {self.num_features} size for dimension {self.dim} but got tensor of shape {tuple(X.shape)}")
         if self.training and track_running_stats:
-            with torch.no_grad():
-                Xr = X.moveaxis(self.dim, 0).reshape(self.num_features, -1)
-                if mask is not None:
-                    Xr = Xr * ~mask.to(Xr.device).reshape(-1).unsqueeze(0)
-                n = Xr.shape[-1] if mask is None else Xr.shape[-1] - mask.sum()
-                mean = Xr.sum(dim=-1) / max(1, n)
-                var = torch.sum((Xr - mean.unsqueeze(-1))**2, dim=-1) / max(1, n)
-                self.running_var.data = (self.n_observations/(self.n_observations+n)) * self.running_var + (n/(self.n_observations+n)) * var + self.n_observations*n/(self.n_observations+n)**2 * (mean - self.running_mean)**2
-                self.running_mean.data = self.running_mean * (self.n_observations / (self.n_observations + n)) + mean * (n / (self.n_observations + n))
-                self.n_observations += n
+            self._update_running_stats(X, mask)
         shape = [self.num_features if i == self.dim % len(X.shape) else 1 for i, _ in enumerate(X.shape)]
         X = (X - self.running_mean.reshape(shape)) / (self.running_var.reshape(shape) + self.eps)**0.5
         return X
 
+    @_compiler_disabled
+    def _update_running_stats(self, X: torch.Tensor, mask: Optional[torch.Tensor]):
+        """
+        update the running mean and variance with the observations of the batch.
+        Excluded from 'torch.compile' graphs, as the python int 'n_observations'
+        changes at each call and would trigger a recompilation.
+        """
+        with torch.no_grad():
+            Xr = X.moveaxis(self.dim, 0).reshape(self.num_features, -1)
+            if mask is not None:
+                Xr = Xr * ~mask.to(Xr.device).reshape(-1).unsqueeze(0)
+            n = Xr.shape[-1] if mask is None else Xr.shape[-1] - mask.sum()
+            mean = Xr.sum(dim=-1) / max(1, n)
+            var = torch.sum((Xr - mean.unsqueeze(-1))**2, dim=-1) / max(1, n)
+            self.running_var.data = (self.n_observations/(self.n_observations+n)) * self.running_var + (n/(self.n_observations+n)) * var + self.n_observations*n/(self.n_observations+n)**2 * (mean - self.running_mean)**2
+            self.running_mean.data = self.running_mean * (self.n_observations / (self.n_observations + n)) + mean * (n / (self.n_observations + n))
+            self.n_observations += n
+
     def unscale(self, Y: torch.Tensor) -> torch.Tensor:
         """
         Unapply normalization
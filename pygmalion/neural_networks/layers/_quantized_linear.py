@@ -0,0 +1,122 @@
+import torch
+import warnings
+import torch.nn.functional as F
+from typing import Optional
+
+
+MAX_PACKED_ROWS = 32
+
+
+class QuantizedLinear(torch.nn.Module):
+    """
+    An inference only linear layer with int8 weights, and dynamically quantized int8 inputs.
+
+    The weights are quantized symmetrically with one scale per output feature.
+    At each call, the inputs are quantized symmetrically with one scale per observation,
+    the product is computed in int32 by an integer matrix multiplication, and rescaled to float.
+    If the integer matrix multiplication is not supported on the device, the weights are dequantized instead.
+
+    For at most 'MAX_PACKED_ROWS' rows of inputs on CPU (such as when decoding token by token),
+    '_int_mm' is barely faster than a float matrix multiplication,
+    so the weights are packed once for the fbgemm kernels of 'torch.ops.quantized.linear_dynamic' instead,
+    which quantize the inputs with a single scale.
+    If these kernels are not available (they are deprecated in recent versions of pytorch), the '_int_mm' path is used.
+    """
+
+    def __init__(self, in_features: int, out_features: int, bias: bool = True,
+                 device: Optional[torch.device] = None):
+        """
+        Parameters
+        ----------
+        in_features : int
+            number of input features
+        out_features : int
+            number of output features
+        bias : bool
+            whether the layer has a bias
+        device : torch.device or None
+            device to store the tensors on
+        """
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.register_buffer("weight", torch.zeros((out_features, in_features), dtype=torch.int8, device=device))
+        self.register_buffer("weight_scale", torch.ones(out_features, dtype=torch.float, device=device))
+        self.register_buffer("bias", torch.zeros(out_features, dtype=torch.float, device=device) if bias else None)
+        self._packed = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}(in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None})"
+
+    def __getstate__(self) -> dict:
+        """
+        the packed weights are not pickled, they are packed again at the first call
+        """
+        state = self.__dict__.copy()
+        state["_packed"] = None
+        return state
+
+    def _load_from_state_dict(self, *args, **kwargs):
+        self._packed = None  # the weights are packed again at the next call
+        super()._load_from_state_dict(*args, **kwargs)
+
+    @classmethod
+    def from_linear(cls, linear: torch.nn.Linear) -> "QuantizedLinear":
+        """
+        returns the quantized equivalent of a linear layer
+        """
+        weight = linear.weight.detach().float()
+        obj = cls(linear.in_features, linear.out_features, bias=linear.bias is not None, device=weight.device)
+        scale = weight.abs().amax(dim=1).clamp(min=torch.finfo(torch.float).tiny) / 127
+        obj.weight = torch.round(weight / scale.unsqueeze(1)).to(torch.int8)
+        obj.weight_scale = scale
+        if linear.bias is not None:
+            obj.bias = linear.bias.detach().float().clone()
+        return obj
+
+    def forward(self, X: torch.Tensor) -> torch.Tensor:
+        """
+        Parameters
+        ----------
+        X : torch.Tensor
+            tensor of floats of shape (*, in_features)
+
+        Returns
+        -------
+        torch.Tensor :
+            tensor of floats of shape (*, out_features)
+        """
+        shape = X.shape[:-1]
+        X = X.reshape(-1, self.in_features).float()
+        packed = self._packed_weight() if X.device.type == "cpu" and 0 < len(X) <= MAX_PACKED_ROWS else None
+        if packed is not None:
+            Y = torch.ops.quantized.linear_dynamic(X, packed, True)
+        elif X.device.type == "cpu" and len(X) > 0 and hasattr(torch, "_int_mm"):
+            scale = X.abs().amax(dim=1, keepdim=True).clamp(min=torch.finfo(torch.float).tiny) / 127
+            Xq = torch.round(X / scale).to(torch.int8)
+            Y = torch._int_mm(Xq, self.weight.t()).float() * (scale * self.weight_scale)
+            if self.bias is not None:
+                Y = Y + self.bias
+        else:
+            Y = F.linear(X, self.weight.float() * self.weight_scale.unsqueeze(1), self.bias)
+        return Y.reshape(*shape, self.out_features)
+
+    def _packed_weight(self) -> Optional[object]:
+        """
+        returns the weights packed for the fbgemm kernels (packed at the first call),
+        or None if they are not available
+        """
+        if getattr(self, "_packed", None) is None:
+            self._packed = False
+            if torch.backends.quantized.engine in ("fbgemm", "x86"):
+                try:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")  # deprecation of the quantized tensors
+                        weight = torch._make_per_channel_quantized_tensor(
+                            self.weight.cpu(), self.weight_scale.cpu().double(),
+                            torch.zeros(self.out_features, dtype=torch.long), 0)
+                        bias = self.bias.cpu() if self.bias is not None else None
+                        self._packed = torch.ops.quantized.linear_prepack(weight, bias)
+                except (AttributeError, RuntimeError):
+                    pass
+        return self._packed if self._packed is not False else None
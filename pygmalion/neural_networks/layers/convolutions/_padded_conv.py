@@ -1,22 +1,25 @@
 import torch
 import torch.nn.functional as F
-from torch.utils.checkpoint import checkpoint
+from .._checkpointing import checkpoint
 
 
 class PaddedConv2d(torch.nn.Module):
     """
     PaddedConv2d is a wrapper around torch.nn.Conv2d that pads the input
     to maintain the same spatial dimension for the output after convolution.
-    This layer is memory efficient thanks to gradient checkpointing.
+    This layer is memory efficient thanks to gradient checkpointing,
+    unless it is evaluated inside of an already checkpointed stage.
     """
 
     def __init__(self, in_channels, out_channels, kernel_size,
                  stride=(1, 1), dilation=(1, 1), groups=1, bias=True,
-                 device=None, dtype=None):
+                 device=None, dtype=None, gradient_checkpointing: bool = True):
         """
-        See torch.nn.Conv2d for parameters documentation
+        See torch.nn.Conv2d for parameters documentation.
+        If 'gradient_checkpointing' is True, the convolution is checkpointed during training.
         """
         super().__init__()
+        self.gradient_checkpointing = gradient_checkpointing
         conv = torch.nn.Conv2d(in_channels, out_channels, kernel_size,
             stride=stride, dilation=dilation, groups=groups, bias=bias,
             device=device, dtype=dtype)
@@ -29,7 +32,7 @@ class PaddedConv2d(torch.nn.Module):
         return self.conv(self.padding(X))
 
     def forward(self, X: torch.Tensor):
-        if self.training and X.requires_grad:
+        if self.gradient_checkpointing and self.training and X.requires_grad:
             return checkpoint(self._forward, X)
         else:
             return self._forward(X)
@@ -1,9 +1,9 @@
 import torch
-from torch.utils.checkpoint import checkpoint
 from typing import Iterable, Tuple, Optional
 from itertools import repeat
 from ._stages import ConvolutionalEncoderStage, ConvolutionalDecoderStage
 from ._upsampling import UPSAMPLING_METHOD
+from .._checkpointing import checkpoint, is_checkpointed, GRADIENT_CHECKPOINTING
 
 
 class ConvolutionalEncoder(torch.nn.Module):
@@ -18,7 +18,7 @@ class ConvolutionalEncoder(torch.nn.Module):
                  normalize: bool = True,
                  residuals: bool = True,
                  dropout: Optional[float] = None,
-                 gradient_checkpointing: bool = False):
+                 gradient_checkpointing: GRADIENT_CHECKPOINTING = False):
         super().__init__()
         self.gradient_checkpointing = gradient_checkpointing
         self.stages = torch.nn.ModuleList()
@@ -43,8 +43,8 @@ class ConvolutionalEncoder(torch.nn.Module):
         torch.Tensor :
             tensor of shape (N, Cout, Hout, Wout)
         """
-        for stage in self.stages:
-            if self.gradient_checkpointing and self.training:
+        for i, stage in enumerate(self.stages):
+            if is_checkpointed(self.gradient_checkpointing, i) and self.training:
                 X.requires_grad_(True)  # To ensure that the gradient is backpropagated in the convolution parameters
                 X, map = checkpoint(stage, X)
             else:
@@ -67,7 +67,7 @@ class ConvolutionalDecoder(torch.nn.Module):
                  normalize: bool = True,
                  residuals: bool = True,
                  dropout: Optional[float] = None,
-                 gradient_checkpointing: bool = False):
+                 gradient_checkpointing: GRADIENT_CHECKPOINTING = False):
         super().__init__()
         self.gradient_checkpointing = gradient_checkpointing
         self.stages = torch.nn.ModuleList()
@@ -93,8 +93,8 @@ class ConvolutionalDecoder(torch.nn.Module):
         torch.Tensor :
             tensor of shape (N, Cout, Hout, Wout)
         """
-        for stage, add in zip(self.stages, add_maps or repeat(None)):
-            if self.gradient_checkpointing and self.training:
+        for i, (stage, add) in enumerate(zip(self.stages, add_maps or repeat(None))):
+            if is_checkpointed(self.gradient_checkpointing, i) and self.training:
                 X.requires_grad_(True)  # To ensure that the gradient is backpropagated in the convolution parameters
                 X = checkpoint(stage, X, add)
             else:
@@ -3,7 +3,7 @@ from itertools import repeat
 from typing import Optional, Tuple, Sequence
 from .multihead_attention import ATTENTION_TYPE, ScaledDotProductAttention
 from ._stages import TransformerEncoderStage, TransformerDecoderStage
-from torch.utils.checkpoint import checkpoint
+from .._checkpointing import checkpoint, is_checkpointed, GRADIENT_CHECKPOINTING
 
 
 class TransformerEncoder(torch.nn.Module):
@@ -13,7 +13,7 @@ class TransformerEncoder(torch.nn.Module):
 
     def __init__(self, n_stages: int, projection_dim: int, n_heads: int,
                  dropout: Optional[float] = None, activation: str = "relu",
-                 gradient_checkpointing: bool = True,
+                 gradient_checkpointing: GRADIENT_CHECKPOINTING = True,
                  attention_type: ATTENTION_TYPE = ScaledDotProductAttention,
                  mask_future: bool=False, expanding_factor: float = 4.0,
                  **kwargs):
@@ -52,8 +52,8 @@ class TransformerEncoder(torch.nn.Module):
             histories = repeat(None)
         else:
             assert len(histories) == len(self.stages)
-        for history, stage in zip(histories, self.stages):
-            if self.gradient_checkpointing and torch.is_grad_enabled():
+        for i, (history, stage) in enumerate(zip(histories, self.stages)):
+            if is_checkpointed(self.gradient_checkpointing, i) and torch.is_grad_enabled():
                 X = checkpoint(stage, X, padding_mask, history, attention_kwargs)
             else:
                 X = stage(X, padding_mask, history, attention_kwargs)
@@ -67,7 +67,7 @@ class TransformerDecoder(torch.nn.Module):
 
     def __init__(self, n_stages: int, projection_dim: int, n_heads: int,
                  dropout: Optional[float] = None, activation: str = "relu",
-                 gradient_checkpointing: bool = True, 
+                 gradient_checkpointing: GRADIENT_CHECKPOINTING = True, 
                  attention_type: ATTENTION_TYPE = ScaledDotProductAttention,
                  mask_future: bool=True, expanding_factor: float = 4.0,
                  self_attention: bool = True,
@@ -117,8 +117,8 @@ class TransformerDecoder(torch.nn.Module):
             histories = repeat(None)
         else:
             assert len(histories) == len(self.stages)
-        for history, stage in zip(histories, self.stages):
-            if self.gradient_checkpointing and torch.is_grad_enabled():
+        for i, (history, stage) in enumerate(zip(histories, self.stages)):
+            if is_checkpointed(self.gradient_checkpointing, i) and torch.is_grad_enabled():
                 Y = checkpoint(stage, Y, encoded, Y_padding_mask, encoded_padding_mask, history, self_attention_kwargs, cross_attention_kwargs)
             else:
                 Y = stage(Y, encoded, Y_padding_mask, encoded_padding_mask, history, self_attention_kwargs, cross_attention_kwargs)
@@ -1,4 +1,17 @@
-from ._byte_pair_encoder import BytePairEncoder
-from ._words_tokenizer import WordsTokenizer
-from ._dummy_tokenizer import DummyTokenizer
-from ._utilities import SpecialToken
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "BytePairEncoder": "._byte_pair_encoder",
+    "WordsTokenizer": "._words_tokenizer",
+    "DummyTokenizer": "._dummy_tokenizer",
+    "SpecialToken": "._utilities"
+}
+__all__ = list(_ATTRIBUTES)
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from ._byte_pair_encoder import BytePairEncoder
+    from ._words_tokenizer import WordsTokenizer
+    from ._dummy_tokenizer import DummyTokenizer
+    from ._utilities import SpecialToken
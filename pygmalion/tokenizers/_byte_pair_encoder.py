@@ -1,5 +1,8 @@
+import json
 from typing import Tuple, List, Iterable, Optional, Dict
+from itertools import accumulate
 from collections import Counter
+import numpy as np
 from unidecode import unidecode
 from ._utilities import zip_pairs, split_wordpiece, BytesTree, Tokenizer
 
@@ -14,6 +17,29 @@ class BytePairEncoder(Tokenizer):
         code = {int(k): v for k, v in kwargs.pop("code").items()}
         return cls(code=code, **kwargs)
 
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "BytePairEncoder":
+        """
+        loads the tokenizer from its arrays, without rebuilding the vocabulary and the BytesTree.
+        The code is only converted back to a dict if accessed, as it is not needed for encoding and decoding.
+        """
+        metadata = json.loads(str(arrays["metadata"]))
+        assert metadata["type"] == cls.__name__
+        obj = cls.__new__(cls)
+        obj.special_tokens = metadata["special_tokens"]
+        obj.dropout = metadata["dropout"]
+        obj._ascii = metadata["ascii"]
+        obj._lowercase = metadata["lowercase"]
+        obj._code = None
+        obj._code_arrays = tuple(arrays[k] for k in ("code_tokens", "code_lengths", "code_subtokens"))
+        data = arrays["vocabulary"].tobytes()
+        ends = list(accumulate(arrays["vocabulary_lengths"].tolist()))
+        obj._vocabulary = tuple(data[start:end] for start, end in zip([0]+ends, ends))
+        obj._token_indexes = {w: i for i, w in enumerate(obj._vocabulary)}
+        obj._bytes_tree = BytesTree.from_preorder(obj._vocabulary, arrays["tree_tokens"].tolist(),
+                                                  arrays["tree_depths"].tolist())
+        return obj
+
     def __init__(self, code: Dict[int, Tuple[int, ...]] = {i: [i] for i in range(256)},
                  dropout: Optional[float] = None, ascii: bool = False,
                  lowercase: bool = False, special_tokens: Iterable[str] = ["START", "PAD", "END"]):
@@ -163,36 +189,90 @@ class BytePairEncoder(Tokenizer):
 
     @property
     def code(self) -> Dict[int, List[int]]:
+        if self._code is None:
+            tokens, lengths, subtokens = self._code_arrays
+            subtokens = subtokens.tolist()
+            ends = list(accumulate(lengths.tolist()))
+            self._code = {token: subtokens[start:end] for token, start, end
+                          in zip(tokens.tolist(), [0]+ends, ends)}
+            self._code_arrays = None
         return self._code
 
     @code.setter
     def code(self, other):
         self._code = other
         # setting vocabulary
-        code_bytes = {i: bytes([i]) for i in range(256)}
-        not_represented = {i: c for i, c in self.code.items() if i not in code_bytes.keys()}
-        while len(not_represented) > 0:
-            tmp = {}
-            for i, c in not_represented.items():
-                if all(j in code_bytes.keys() for j in c):
-                    code_bytes[i] = b"".join(code_bytes[j] for j in c)
-                else:
-                    tmp[i] = c
-            not_represented = tmp
-        self._vocabulary = tuple(code_bytes.values())
+        self._vocabulary = self._code_bytes(self.code)
         # setting word indexes
         self._token_indexes = {w: i for i, w in enumerate(self.vocabulary)}
         # setting the BytesTree
-        self._bytes_tree = BytesTree(sorted(self._vocabulary, key=lambda x: len(x)))
+        self._bytes_tree = BytesTree(self._vocabulary)
 
     @property
     def dump(self):
+        return {**self._metadata, "code": self.code}
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        the tokenizer as flat arrays of the merges, of the bytes of the vocabulary,
+        and of the BytesTree nodes in depth first order (see 'BytesTree.to_preorder')
+        """
+        tree_tokens, tree_depths = self._bytes_tree.to_preorder(self._token_indexes)
+        return {"code_tokens": np.array(list(self.code.keys()), dtype=np.int32),
+                "code_lengths": np.array([len(c) for c in self.code.values()], dtype=np.int32),
+                "code_subtokens": np.array([t for c in self.code.values() for t in c], dtype=np.int32),
+                "vocabulary": np.frombuffer(b"".join(self._vocabulary), dtype=np.uint8),
+                "vocabulary_lengths": np.array([len(w) for w in self._vocabulary], dtype=np.int32),
+                "tree_tokens": np.array(tree_tokens, dtype=np.int32),
+                "tree_depths": np.array(tree_depths, dtype=np.int32),
+                "metadata": np.array(json.dumps(self._metadata))}
+
+    @property
+    def _metadata(self) -> dict:
+        """
+        the dump of the tokenizer, excluding its code
+        """
         return {"type": type(self).__name__,
-                "code": self.code,
                 "dropout": self.dropout,
                 "ascii": self.ascii,
                 "lowercase": self.lowercase,
-                "special_tokens": self._special_token_names}
+                "special_tokens": list(self._special_token_names)}
+
+    @staticmethod
+    def _code_bytes(code: Dict[int, Tuple[int]]) -> Tuple[bytes, ...]:
+        """
+        returns the bytes of the 256 single byte tokens, followed by the bytes of the other tokens of the code.
+        The vocabulary order is that of repeated sweeps over the code, each sweep adding (in the order of the code)
+        the tokens whose merged tokens are already defined, so that a merge can reference a token defined after it.
+        The sweep at which each token is added is computed in a single depth first pass.
+        """
+        position = {t: i for i, t in enumerate(code.keys()) if t >= 256}
+        sweep = {i: 0 for i in range(256)}
+        for token in position.keys():
+            stack = [token]
+            expanded = set()
+            while len(stack) > 0:
+                t = stack[-1]
+                if t in sweep:
+                    stack.pop()
+                    continue
+                if t not in code:
+                    raise ValueError(f"The token {t} is used in a merge but is not defined in the code")
+                missing = [j for j in code[t] if j not in sweep]
+                if len(missing) == 0:
+                    # a token is added in the same sweep as the tokens it merges if they come before it in the code
+                    sweep[t] = max([1] + [sweep[j] + (position.get(j, -1) > position[t]) for j in code[t]])
+                    stack.pop()
+                elif t in expanded:
+                    raise ValueError(f"The merges of the token {t} are circular")
+                else:
+                    expanded.add(t)
+                    stack.extend(reversed(missing))
+        code_bytes = {i: bytes([i]) for i in range(256)}
+        for t in sorted(position.keys(), key=lambda t: (sweep[t], position[t])):
+            code_bytes[t] = b"".join(code_bytes[j] for j in code[t])
+        return tuple(code_bytes.values())
 
     def _bytes(self, token_index: int, code: Dict[int, Tuple[int]]) -> bytes:
         """
@@ -1,6 +1,6 @@
 import random
 from itertools import chain
-from typing import Iterable, Optional, Tuple, List, Union
+from typing import Dict, Iterable, Optional, Sequence, Tuple, List, Union
 
 
 class BytesTree:
@@ -9,9 +9,22 @@ class BytesTree:
     """
 
     def __init__(self, vocabulary: Iterable[bytes]=[bytes([i]) for i in range(256)]):
+        """
+        Parameters
+        ----------
+        vocabulary : iterable of bytes
+            the known tokens, inserted by increasing length
+        """
         self.data = {}
-        for v in vocabulary:
-            self.push(v)
+        nodes = {b"": self.data}
+        for v in sorted(vocabulary, key=len):
+            assert isinstance(v, bytes)
+            if v in nodes:
+                continue
+            # when inserting by increasing length, the node a token is appended to
+            # is the node of its longest known prefix, so there is no need to walk the tree
+            i = next(i for i in range(len(v)-1, -1, -1) if v[:i] in nodes)
+            nodes[v] = nodes[v[:i]][v[i:]] = {}
     
     def __str__(self) -> str:
         return "\n".join(str(b) for b in self.vocabulary)
@@ -38,6 +51,36 @@ class BytesTree:
         if suffix != b"":
             leaf[suffix] = {}
 
+    def to_preorder(self, token_indexes: Dict[bytes, int]) -> Tuple[List[int], List[int]]:
+        """
+        returns the (token index, depth) of each node of the tree in depth first order,
+        from which the tree can be rebuilt with 'from_preorder'
+        """
+        tokens, depths = [], []
+        stack = [(k, v, 0) for k, v in reversed(self.data.items())]
+        while len(stack) > 0:
+            token, data, depth = stack.pop()
+            tokens.append(token_indexes[token])
+            depths.append(depth)
+            stack.extend((token+k, v, depth+1) for k, v in reversed(data.items()))
+        return tokens, depths
+
+    @classmethod
+    def from_preorder(cls, vocabulary: Sequence[bytes], tokens: Iterable[int], depths: Iterable[int]) -> "BytesTree":
+        """
+        rebuilds a tree from the output of 'to_preorder'
+        """
+        obj = cls.__new__(cls)
+        obj.data = {}
+        max_depth = max((len(v) for v in vocabulary), default=0) + 1
+        # the node and the length of the token at each depth of the current path
+        leafs, lengths = [obj.data] + [None]*max_depth, [0]*(max_depth+1)
+        for token, depth in zip(tokens, depths):
+            token = vocabulary[token]
+            leafs[depth+1] = leafs[depth][token[lengths[depth]:]] = {}
+            lengths[depth+1] = len(token)
+        return obj
+
     @property
     def vocabulary(self) -> Tuple[bytes]:
         """
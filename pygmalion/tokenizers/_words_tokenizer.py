@@ -18,8 +18,10 @@ class WordsTokenizer(Tokenizer):
     @classmethod
     def from_dump(cls, dump: dict) -> "WordsTokenizer":
         assert dump["type"] == cls.__name__
-        vocabulary = tuple(dump["vocabulary"]) + (cls._unknown,)
-        return WordsTokenizer(vocabulary=vocabulary)
+        return WordsTokenizer(vocabulary=dump["vocabulary"],
+                              ascii=dump.get("ascii", False),
+                              lowercase=dump.get("lowercase", False),
+                              special_tokens=dump.get("special_tokens", ["UNKNOWN", "START", "END", "PAD"]))
 
     def __init__(self, vocabulary: List[str] = [],
                  ascii: bool=False, lowercase: bool=False,
@@ -72,4 +74,7 @@ class WordsTokenizer(Tokenizer):
     @property
     def dump(self):
         return {"type": type(self).__name__,
-                "vocabulary": self._vocabulary}
+                "vocabulary": self._vocabulary,
+                "ascii": self.ascii,
+                "lowercase": self.lowercase,
+                "special_tokens": self._special_token_names}
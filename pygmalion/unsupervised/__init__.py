@@ -1 +1,11 @@
-from ._pca import PCA
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "PCA": "._pca"
+}
+__all__ = list(_ATTRIBUTES)
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from ._pca import PCA
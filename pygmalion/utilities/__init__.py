@@ -1,5 +1,38 @@
-from ._cross_validation import split, kfold
-from ._data_processing import embed_categorical, mask_nullables
-from ._metrics import MSE, RMSE, R2, accuracy, confusion_matrix, GPU_info
-from ._ploting import plot_losses, plot_fitting, plot_bounding_boxes, plot_matrix
-from ._load_model import load_model
+from typing import TYPE_CHECKING
+from pygmalion._lazy import lazy_attributes
+
+_ATTRIBUTES = {
+    "split": "._cross_validation",
+    "kfold": "._cross_validation",
+    "embed_categorical": "._data_processing",
+    "mask_nullables": "._data_processing",
+    "MSE": "._metrics",
+    "RMSE": "._metrics",
+    "R2": "._metrics",
+    "accuracy": "._metrics",
+    "confusion_matrix": "._metrics",
+    "GPU_info": "._metrics",
+    "plot_losses": "._ploting",
+    "plot_fitting": "._ploting",
+    "plot_bounding_boxes": "._ploting",
+    "plot_matrix": "._ploting",
+    "load_model": "._load_model",
+    "MODEL_CACHE": "._load_model",
+    "ModelCache": "._model_cache",
+    "find_max_batch_size": "._batch_size",
+    "BatchingPredictor": "._batching_predictor",
+    "ModelServer": "._model_server"
+}
+__all__ = list(_ATTRIBUTES)
+__getattr__, __dir__ = lazy_attributes(__name__, _ATTRIBUTES)
+
+if TYPE_CHECKING:
+    from ._cross_validation import split, kfold
+    from ._data_processing import embed_categorical, mask_nullables
+    from ._metrics import MSE, RMSE, R2, accuracy, confusion_matrix, GPU_info
+    from ._ploting import plot_losses, plot_fitting, plot_bounding_boxes, plot_matrix
+    from ._load_model import load_model, MODEL_CACHE
+    from ._model_cache import ModelCache
+    from ._batch_size import find_max_batch_size
+    from ._batching_predictor import BatchingPredictor
+    from ._model_server import ModelServer
@@ -0,0 +1,199 @@
+import torch
+import inspect
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from pygmalion.neural_networks._neural_network import NeuralNetwork, PRECISION
+from pygmalion.neural_networks.layers import Normalizer
+from pygmalion.neural_networks._micro_batching import activations_memory, static_memory, n_observations
+
+
+OUT_OF_MEMORY_MESSAGES = ("out of memory", "can't allocate", "cannot allocate")
+
+
+def find_max_batch_size(model: NeuralNetwork,
+                        sample_batch_fn: Union[Callable[[int], tuple], tuple],
+                        memory_budget: Optional[int] = None,
+                        min_batch_size: int = 1,
+                        max_batch_size: int = 2**16,
+                        precision: PRECISION = "fp32",
+                        n_repeats: int = 3,
+                        verbose: bool = False) -> Tuple[int, Dict[int, float]]:
+    """
+    Finds the largest batch size for which a training step (forward and backward)
+    of the model fits in memory, with an exponential then binary search.
+
+    The training memory is measured as the peak allocated memory on GPU,
+    or estimated as the memory of the tensors saved for backward on CPU (see 'activations_memory'),
+    plus the parameters, gradients and optimizer states (two tensors per parameter, as for Adam).
+    A batch size also does not fit if the step raises an out of memory error
+    (a 'torch.OutOfMemoryError', a 'MemoryError', or a 'RuntimeError' of the allocator).
+    The state of the model (including the running statistics of the Normalizer layers)
+    is left unchanged by the search.
+
+    Parameters
+    ----------
+    model : NeuralNetwork
+        the model to train
+    sample_batch_fn : Callable or tuple
+        a function that returns a batch (the *args of the model's loss, as returned by 'data_to_tensor')
+        of the given number of observations, or a batch of data (such as returned by 'data_to_tensor')
+        in which observations are sampled randomly with replacement
+    memory_budget : int or None
+        the maximum training memory in bytes. If None, the total memory of the GPU
+        (or no limit other than out of memory errors on CPU)
+    min_batch_size : int
+        the batch size the search starts from
+    max_batch_size : int
+        the batch size the search stops at
+    precision : one of {"fp32", "bf16", "fp16"}
+        precision of the forward computations
+    n_repeats : int
+        number of timed training steps for each batch size, after a warmup step
+    verbose : bool
+        If True, the memory and throughput of each tested batch size is printed
+
+    Returns
+    -------
+    tuple :
+        (batch_size, throughputs) with batch_size the largest batch size that fits in memory
+        (or 0 if none does), and throughputs a dict of {batch_size: observations per second}
+        for all the tested batch sizes that fit
+    """
+    if isinstance(sample_batch_fn, tuple):
+        sample_batch_fn = _sampler(sample_batch_fn, _resampled(model, sample_batch_fn))
+    cuda = model.device.type == "cuda"
+    if memory_budget is None and cuda:
+        memory_budget = torch.cuda.get_device_properties(model.device).total_memory
+    state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+    normalizers = [m for m in model.modules() if isinstance(m, Normalizer)]
+    counts = [m.n_observations for m in normalizers]
+    training = model.training
+    throughputs = {}
+
+    def fits(batch_size: int) -> bool:
+        """
+        returns True if a training step on a batch of the given size fits in memory,
+        and records its throughput
+        """
+        try:
+            batch = sample_batch_fn(batch_size)
+            memory = _training_memory(model, batch, precision, cuda)
+            if memory_budget is not None and memory > memory_budget:
+                if verbose:
+                    print(f"batch size {batch_size}: {memory/1024**2:.4g} MB exceeds the memory budget")
+                return False
+            _training_step(model, batch, precision)
+            start = perf_counter()
+            for _ in range(n_repeats):
+                _training_step(model, batch, precision)
+            if cuda:
+                torch.cuda.synchronize(model.device)
+            duration = (perf_counter() - start) / max(1, n_repeats)
+        except (torch.cuda.OutOfMemoryError, MemoryError, RuntimeError) as e:
+            if not _is_out_of_memory(e):
+                raise
+            if verbose:
+                print(f"batch size {batch_size}: out of memory")
+            return False
+        finally:
+            model.zero_grad(set_to_none=True)
+            if cuda:
+                torch.cuda.empty_cache()
+        throughputs[batch_size] = batch_size / duration
+        if verbose:
+            print(f"batch size {batch_size}: {memory/1024**2:.4g} MB, {throughputs[batch_size]:.4g} observations/s")
+        return True
+
+    try:
+        # exponential search
+        lower, upper = 0, None
+        batch_size = min_batch_size
+        while batch_size <= max_batch_size:
+            if not fits(batch_size):
+                upper = batch_size
+                break
+            lower = batch_size
+            batch_size *= 2
+        if upper is None:
+            if lower < max_batch_size and fits(max_batch_size):
+                lower = max_batch_size
+            else:
+                upper = max_batch_size
+        # binary search
+        while upper is not None and upper - lower > 1:
+            middle = (lower + upper) // 2
+            if lower == 0 and middle < min_batch_size:
+                break
+            if fits(middle):
+                lower = middle
+            else:
+                upper = middle
+    finally:
+        model.load_state_dict(state)
+        for m, n in zip(normalizers, counts):
+            m.n_observations = n
+        model.train(training)
+    return lower, dict(sorted(throughputs.items()))
+
+
+def _is_out_of_memory(error: BaseException) -> bool:
+    """
+    returns True if the error was raised by a failed memory allocation
+    """
+    if isinstance(error, (torch.cuda.OutOfMemoryError, MemoryError)):
+        return True
+    message = str(error).lower()
+    return any(m in message for m in OUT_OF_MEMORY_MESSAGES)
+
+
+def _resampled(model: NeuralNetwork, data: tuple) -> List[bool]:
+    """
+    returns for each element of the data whether it holds one value per observation and must be resampled:
+    the tensors with a leading dimension of the number of observations, and the lists of that length.
+    The class weights of the classifiers' losses are never resampled, even if there are as many classes as observations.
+    """
+    N = n_observations(data)
+    names = list(inspect.signature(model.loss).parameters)
+    return [(i >= len(names) or names[i] != "class_weights") and
+            ((isinstance(d, torch.Tensor) and d.dim() > 0 and d.shape[0] == N) or (isinstance(d, list) and len(d) == N))
+            for i, d in enumerate(data)]
+
+
+def _sampler(data: tuple, resampled: List[bool]) -> Callable[[int], tuple]:
+    """
+    returns a function that samples batches of the given size from the data, with replacement.
+    Only the elements of the data flagged in 'resampled' are sampled, the others are repeated.
+    """
+    N = n_observations(data)
+
+    def sample(batch_size: int) -> tuple:
+        indexes = torch.randint(0, N, (batch_size,))
+        return tuple(d if not resample else d[indexes.to(d.device)] if isinstance(d, torch.Tensor) else [d[i] for i in indexes.tolist()]
+                     for d, resample in zip(data, resampled))
+
+    return sample
+
+
+def _training_memory(model: NeuralNetwork, batch: tuple, precision: PRECISION, cuda: bool) -> int:
+    """
+    returns the memory of a training step in bytes, measured on GPU, estimated on CPU
+    """
+    if not cuda:
+        return activations_memory(model, batch, precision) + static_memory(model)
+    torch.cuda.synchronize(model.device)
+    torch.cuda.reset_peak_memory_stats(model.device)
+    _training_step(model, batch, precision)
+    torch.cuda.synchronize(model.device)
+    states = 2 * sum(p.numel() * p.element_size() for p in model.parameters() if p.requires_grad)
+    return torch.cuda.max_memory_allocated(model.device) + states
+
+
+def _training_step(model: NeuralNetwork, batch: tuple, precision: PRECISION):
+    """
+    forward and backward of the loss on the batch
+    """
+    model.train()
+    model.zero_grad(set_to_none=True)
+    with model._autocast(precision):
+        loss = model.loss(*batch)
+    loss.float().backward()
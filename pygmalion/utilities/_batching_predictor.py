@@ -0,0 +1,227 @@
+import time
+import queue
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from pygmalion._model import Model
+
+
+INPUT = Union[pd.DataFrame, dict, np.ndarray, list]
+_STOP = object()  # queued when the predictor is closed
+
+
+class BatchingPredictor:
+    """
+    A thread-safe wrapper around a model, that coalesces the predictions requested concurrently
+    (from several threads or asyncio tasks) into batches evaluated in a single call of the model.
+
+    Each request is a batch of observations (a dataframe, a dict of columns or of values,
+    an array or a list of observations). A worker thread waits for a first request, then gathers the requests
+    received within 'max_wait' seconds, as long as the total number of observations does not exceed 'max_batch_size'.
+    The inputs of the requests are concatenated, the model is called once,
+    and the predictions are split back between the callers in the order of their observations.
+    If the model raises an exception, it is raised for all the requests of the batch.
+
+    Example
+    -------
+    >>> with BatchingPredictor(model, max_batch_size=64, max_wait=0.005) as predictor:
+    ...     y = predictor.predict(df)  # from any thread
+    ...     y = await predictor.predict_async(df)  # from any event loop
+    """
+
+    def __init__(self, model: Model, max_batch_size: int = 64, max_wait: float = 0.005,
+                 method: str = "predict", **kwargs):
+        """
+        Parameters
+        ----------
+        model : Model
+            the model to call
+        max_batch_size : int
+            maximum number of observations of a batch.
+            A request with more observations is evaluated alone.
+        max_wait : float
+            maximum time in seconds a request waits for other requests before its batch is evaluated
+        method : str
+            the name of the method of the model to call, such as "predict" or "probabilities"
+        **kwargs :
+            other keyword arguments passed to the method of the model for each batch
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"'max_batch_size' must be a strictly positive integer, got {max_batch_size}")
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.method = method
+        self.kwargs = kwargs
+        self.n_requests = 0
+        self.n_batches = 0
+        self.batch_sizes: Counter = Counter()
+        self._queue: queue.Queue = queue.Queue()
+        self._carried: Optional[tuple] = None  # request that did not fit in the previous batch
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=f"{type(self).__name__}-worker", daemon=True)
+        self._worker.start()
+
+    def __repr__(self):
+        return (f"{type(self).__name__}({type(self.model).__name__}, max_batch_size={self.max_batch_size}, "
+                f"max_wait={self.max_wait})")
+
+    def __enter__(self) -> "BatchingPredictor":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def predict(self, x: INPUT, timeout: Optional[float] = None) -> object:
+        """
+        returns the prediction of the model for the given observations, once their batch has been evaluated
+        """
+        return self.submit(x).result(timeout)
+
+    async def predict_async(self, x: INPUT) -> object:
+        """
+        returns the prediction of the model for the given observations, without blocking the event loop
+        """
+        return await asyncio.wrap_future(self.submit(x))
+
+    def submit(self, x: INPUT) -> Future:
+        """
+        queues the observations for prediction, and returns the future of their prediction
+        """
+        x, n = _as_batch(x)
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"The {type(self).__name__} is closed")
+            self.n_requests += 1
+            self._queue.put((x, n, future))
+        return future
+
+    def close(self):
+        """
+        stops the worker thread once the queued requests have been evaluated
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        the number of requests waiting to be evaluated
+        """
+        return self._queue.qsize() + (self._carried is not None)
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        """
+        the number of queued requests, of requests and batches evaluated,
+        and the mean and maximum number of observations per batch
+        """
+        with self._lock:
+            n_observations = sum(size * count for size, count in self.batch_sizes.items())
+            return {"queue_depth": self.queue_depth,
+                    "requests": self.n_requests,
+                    "batches": self.n_batches,
+                    "mean_batch_size": n_observations / max(1, self.n_batches),
+                    "max_batch_size": max(self.batch_sizes, default=0)}
+
+    def _run(self):
+        """
+        the loop of the worker thread
+        """
+        while True:
+            requests = self._gather()
+            if requests is None:
+                break
+            self._evaluate(requests)
+
+    def _gather(self) -> Optional[List[tuple]]:
+        """
+        returns the requests of the next batch, or None if the predictor is closed and there are no more requests
+        """
+        if self._carried is not None:
+            first, self._carried = self._carried, None
+        else:
+            first = self._queue.get()
+        if first is _STOP:
+            return None
+        requests, size = [first], first[1]
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            try:
+                request = self._queue.get(timeout=max(0., deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is _STOP or size + request[1] > self.max_batch_size:
+                self._carried = request
+                break
+            requests.append(request)
+            size += request[1]
+        return requests
+
+    def _evaluate(self, requests: List[tuple]):
+        """
+        evaluates the concatenated inputs of the requests, and sets the result of their futures
+        """
+        requests = [(x, n, future) for x, n, future in requests if future.set_running_or_notify_cancel()]
+        if len(requests) == 0:
+            return
+        sizes = [n for _, n, _ in requests]
+        try:
+            predictions = getattr(self.model, self.method)(_concatenate([x for x, _, _ in requests]), **self.kwargs)
+            results = _split(predictions, sizes)
+        except BaseException as e:
+            for _, _, future in requests:
+                future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(requests, results):
+                future.set_result(result)
+        with self._lock:
+            self.n_batches += 1
+            self.batch_sizes[sum(sizes)] += 1
+
+
+def _as_batch(x: INPUT) -> Tuple[INPUT, int]:
+    """
+    returns the observations as a concatenable batch, and their number
+    """
+    if isinstance(x, dict):
+        x = pd.DataFrame({k: v if hasattr(v, "__iter__") and not isinstance(v, str) else [v] for k, v in x.items()})
+    elif not isinstance(x, (pd.DataFrame, np.ndarray)):
+        x = list(x)
+    return x, len(x)
+
+
+def _concatenate(batches: List[INPUT]) -> INPUT:
+    """
+    concatenates the inputs or the predictions of several requests
+    """
+    if len(batches) == 1:
+        return batches[0]
+    first = batches[0]
+    if isinstance(first, pd.DataFrame):
+        return pd.concat(batches, ignore_index=True)
+    elif isinstance(first, np.ndarray):
+        return np.concatenate(batches, axis=0)
+    return [x for batch in batches for x in batch]
+
+
+def _split(predictions: object, sizes: List[int]) -> List[object]:
+    """
+    splits the predictions of a batch between its requests
+    """
+    if len(sizes) == 1:
+        return [predictions]
+    ends = np.cumsum(sizes)
+    if isinstance(predictions, (pd.DataFrame, pd.Series)):
+        return [predictions.iloc[end-size:end].reset_index(drop=True) for size, end in zip(sizes, ends)]
+    return [predictions[end-size:end] for size, end in zip(sizes, ends)]
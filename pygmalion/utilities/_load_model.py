@@ -1,18 +1,19 @@
 import json
 import pathlib
 import pickle
-import torch
+import importlib
 from typing import Union, Type
 from io import IOBase
 from pygmalion._model import Model
-from ._download import download_bytes
-from pygmalion.unsupervised import *
-from pygmalion.neural_networks import *
-from pygmalion.decision_trees import *
-from pygmalion.tokenizers import *
+from ._model_cache import ModelCache
 
 
-def load_model(file_path: Union[str, pathlib.Path, IOBase]) -> Model:
+MODEL_PACKAGES = ("pygmalion.neural_networks", "pygmalion.decision_trees",
+                  "pygmalion.unsupervised", "pygmalion.tokenizers")
+MODEL_CACHE = ModelCache()
+
+
+def load_model(file_path: Union[str, pathlib.Path, IOBase], cache: bool = False) -> Model:
     """
     loads a model from the disk, or download from google drive.
 
@@ -22,31 +23,132 @@ def load_model(file_path: Union[str, pathlib.Path, IOBase]) -> Model:
         Path to the file to load the model from.
         Can be a path on the disk, an url to download from,
         or an IO stream to read from (the IO stream will be closed after loading).
+        The weights of the models saved as '.pygmalion' files are memory mapped
+        from the disk instead of being copied in memory.
+    cache : bool
+        If True, the model is looked up in (or added to) the process-wide 'MODEL_CACHE',
+        and returned in eval mode. The returned model is shared with the other callers
+        and must not be modified in place.
 
     Returns
     -------
     Model :
         The loaded model.
     """
-    if not isinstance(file_path, IOBase):
-        if str(file_path).startswith("https://"):
-            file_path = download_bytes(file_path)
-        else:
-            file_path = pathlib.Path(file_path)
-            if not file_path.parent.is_dir():
-                raise FileNotFoundError(f"The directory does not exist: '{file_path.parent}'")
-            elif not file_path.is_file():
-                raise FileNotFoundError(f"The file does not exist or is not a file: '{file_path}'")
+    if not isinstance(file_path, IOBase) and not str(file_path).startswith("https://"):
+        file_path = pathlib.Path(file_path)
+        if not file_path.parent.is_dir():
+            raise FileNotFoundError(f"The directory does not exist: '{file_path.parent}'")
+        elif not file_path.is_file():
+            raise FileNotFoundError(f"The file does not exist or is not a file: '{file_path}'")
+    if cache:
+        model = MODEL_CACHE.get(file_path, _load_model)
+        if isinstance(file_path, IOBase):
+            file_path.close()
+        return model
+    return _load_model(file_path)
+
+
+def _load_model(file_path: Union[pathlib.Path, str, IOBase]) -> Model:
+    """
+    loads a model from a file path, an url or an IO stream.
+    The format of the file is deduced from its first bytes,
+    so that loading a '.json' model does not import torch.
+    """
+    if not isinstance(file_path, IOBase) and str(file_path).startswith("https://"):
+        from ._download import download_bytes
+        file_path = download_bytes(file_path)
+    head = _head(file_path)
+    if head.lstrip().startswith(b"{"):
+        return _load_json(file_path)
+    elif head.startswith(b"PK") and _is_npz(file_path):
+        return _load_npz(file_path)
+    import torch
+    from pygmalion.neural_networks._serialization import is_state_file, load_state
+    if is_state_file(file_path):
+        model = load_state(file_path)
+        if isinstance(file_path, IOBase):
+            file_path.close()
+        return model
     try:
-        return torch.load(file_path, map_location="cpu")
+        return torch.load(file_path, map_location="cpu", weights_only=False)
     except pickle.UnpicklingError:
         if isinstance(file_path, IOBase):
             file_path.seek(0)
-        else:
-            file_path = open(file_path, "r", encoding="utf-8")
+        return _load_json(file_path)
+
+
+def _load_json(file_path: Union[pathlib.Path, IOBase]) -> Model:
+    """
+    loads a model saved as a '.json' file
+    """
+    if isinstance(file_path, IOBase):
         dump = json.load(file_path)
-        if isinstance(file_path, IOBase):
-            file_path.close()
-        model_type = dump["type"]
-        cls: Type[Model] = globals()[model_type]
-        return cls.from_dump(dump)
+        file_path.close()
+    else:
+        with open(file_path, "r", encoding="utf-8") as file:
+            dump = json.load(file)
+    return _from_dump(dump)
+
+
+def _load_npz(file_path: Union[pathlib.Path, IOBase]) -> Model:
+    """
+    loads a model saved as a '.npz' file of flat arrays
+    """
+    import numpy as np
+    with np.load(file_path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if isinstance(file_path, IOBase):
+        file_path.close()
+    metadata = json.loads(str(arrays["metadata"]))
+    return model_type(metadata["type"]).from_arrays(arrays)
+
+
+def _is_npz(file_path: Union[pathlib.Path, IOBase]) -> bool:
+    """
+    returns True if the file is a zip archive containing the "metadata" array of the models saved as '.npz'
+    (torch '.pth' files are zip archives too)
+    """
+    import zipfile
+    position = file_path.tell() if isinstance(file_path, IOBase) else None
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            return "metadata.npy" in archive.namelist()
+    except zipfile.BadZipFile:
+        return False
+    finally:
+        if position is not None:
+            file_path.seek(position)
+
+
+def _from_dump(dump: dict) -> Model:
+    """
+    returns the model of the given type from its dump
+    """
+    cls = model_type(dump["type"])
+    return cls.from_dump(dump)
+
+
+def model_type(name: str) -> Type[Model]:
+    """
+    returns the model class of the given name.
+    Only the module defining the class is imported.
+    """
+    for package in MODEL_PACKAGES:
+        package = importlib.import_module(package)
+        if name in package.__all__:
+            return getattr(package, name)
+    raise ValueError(f"Unknown model type '{name}'")
+
+
+def _head(file_path: Union[pathlib.Path, IOBase], n_bytes: int = 16) -> bytes:
+    """
+    returns the first bytes of the file, without moving the position of the stream
+    """
+    if isinstance(file_path, IOBase):
+        position = file_path.tell()
+        head = file_path.read(n_bytes)
+        file_path.seek(position)
+        return head.encode("utf-8") if isinstance(head, str) else head
+    with open(file_path, "rb") as file:
+        return file.read(n_bytes)
@@ -0,0 +1,154 @@
+import sys
+import pathlib
+import hashlib
+import threading
+from io import IOBase
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Union
+from pygmalion._model import Model
+
+
+class ModelCache:
+    """
+    A thread-safe LRU cache of loaded models, used by 'load_model(..., cache=True)'.
+
+    The models loaded from the disk are cached by resolved path, modification time and size,
+    so that a modified file is loaded again. The models downloaded from an url are cached by url
+    (use 'invalidate' to download them again), and the models read from an IO stream by hash of their content.
+    The least recently used models are evicted when there are more than 'max_models' models cached,
+    or when the memory of the cached tensors exceeds 'max_memory' bytes.
+    The cached models are put in eval mode, and are shared between all the callers:
+    they must not be modified (trained, moved to another device, ...) in place.
+    Concurrent loads of the same file are performed only once.
+    """
+
+    def __init__(self, max_models: Optional[int] = 16, max_memory: Optional[int] = None):
+        """
+        Parameters
+        ----------
+        max_models : int or None
+            maximum number of cached models, or None for no limit
+        max_memory : int or None
+            maximum memory in bytes of the tensors of the cached models, or None for no limit
+        """
+        self.max_models = max_models
+        self.max_memory = max_memory
+        self.hits = 0
+        self.misses = 0
+        self._models: OrderedDict[Hashable, Model] = OrderedDict()
+        self._memory: Dict[Hashable, int] = {}
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __repr__(self):
+        return (f"{type(self).__name__}({len(self)} models, {self.memory/1024**2:.4g} MB, "
+                f"hits={self.hits}, misses={self.misses})")
+
+    @property
+    def memory(self) -> int:
+        """
+        the memory in bytes of the tensors of the cached models
+        """
+        return sum(self._memory.values())
+
+    def get(self, file_path: Union[str, pathlib.Path, IOBase], load: Callable[[Union[str, pathlib.Path, IOBase]], Model]) -> Model:
+        """
+        returns the cached model for the given file, or loads it with the 'load' function and caches it
+        """
+        key = cache_key(file_path)
+        with self._lock:
+            if key in self._models:
+                self.hits += 1
+                self._models.move_to_end(key)
+                return self._models[key]
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                if key in self._models:  # loaded by another thread in the meantime
+                    self.hits += 1
+                    self._models.move_to_end(key)
+                    return self._models[key]
+                self.misses += 1
+            try:
+                model = load(file_path)
+                if _is_module(model):
+                    model.eval()
+                with self._lock:
+                    self._models[key] = model
+                    self._memory[key] = model_memory(model)
+                    self._evict()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return model
+
+    def invalidate(self, file_path: Optional[Union[str, pathlib.Path]] = None):
+        """
+        removes the models loaded from the given path or url from the cache, or all the models if None
+        """
+        with self._lock:
+            if file_path is None:
+                keys = list(self._models.keys())
+            else:
+                source = _source(file_path)
+                keys = [k for k in self._models.keys() if k[0] == source]
+            for key in keys:
+                self._models.pop(key)
+                self._memory.pop(key)
+
+    def _evict(self):
+        """
+        removes the least recently used models until the cache limits are respected
+        (the most recently loaded model is always kept)
+        """
+        while len(self._models) > 1 and ((self.max_models is not None and len(self._models) > self.max_models)
+                                         or (self.max_memory is not None and self.memory > self.max_memory)):
+            key, _ = self._models.popitem(last=False)
+            self._memory.pop(key)
+
+
+def cache_key(file_path: Union[str, pathlib.Path, IOBase]) -> tuple:
+    """
+    returns the key of a model file in the cache
+    """
+    if isinstance(file_path, IOBase):
+        position = file_path.tell()
+        digest = hashlib.sha256(file_path.read()).hexdigest()
+        file_path.seek(position)
+        return ("stream", digest)
+    source = _source(file_path)
+    if source.startswith("https://"):
+        return (source,)
+    stat = pathlib.Path(source).stat()
+    return (source, stat.st_mtime_ns, stat.st_size)
+
+
+def model_memory(model: Model) -> int:
+    """
+    returns the memory in bytes of the parameters and buffers of a model (0 for models that are not torch modules)
+    """
+    if not _is_module(model):
+        return 0
+    tensors = {t.untyped_storage().data_ptr(): t.untyped_storage().nbytes()
+               for t in list(model.parameters()) + list(model.buffers())}
+    return sum(tensors.values())
+
+
+def _source(file_path: Union[str, pathlib.Path]) -> str:
+    """
+    returns the url, or the resolved path of the file
+    """
+    if str(file_path).startswith("https://"):
+        return str(file_path)
+    return str(pathlib.Path(file_path).resolve())
+
+
+def _is_module(model: Model) -> bool:
+    """
+    returns True if the model is a torch module (without importing torch if it was not imported already)
+    """
+    torch = sys.modules.get("torch")
+    return torch is not None and isinstance(model, torch.nn.Module)
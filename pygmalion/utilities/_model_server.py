@@ -0,0 +1,407 @@
+import os
+import sys
+import time
+import pickle
+import socket
+import asyncio
+import pathlib
+import threading
+import multiprocessing
+from select import select
+from itertools import count
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Union
+from pygmalion._model import Model
+from ._multiprocessing import Client, send_object, receive_object
+
+
+class ModelServer:
+    """
+    Serves the predictions of a model from several worker processes, to scale inference across cores.
+
+    Each worker process loads the model, connects to the server with the socket protocol
+    of 'pygmalion.utilities._multiprocessing', and evaluates one request at a time.
+    The requests are submitted from any thread of the front process, each with a unique request ID,
+    and are dispatched to the first idle worker. Their results are sent back with the request ID,
+    and set on the future returned by 'submit'. Exceptions raised by the model are raised to the caller.
+
+    The idle workers are regularly sent health checks. A worker whose process died,
+    or that did not answer a request or health check within 'timeout' seconds, is restarted,
+    and the exception of the request it was evaluating is set.
+
+    Example
+    -------
+    >>> with ModelServer("model.pygmalion", n_workers=4) as server:
+    ...     y = server.predict(df)  # from any thread
+    ...     y = await server.predict_async(df)  # from any event loop
+    """
+
+    def __init__(self, model: Union[str, pathlib.Path, Model], n_workers: Optional[int] = None,
+                 method: str = "predict", port: int = 0, address: str = "127.0.0.1",
+                 health_interval: float = 1.0, timeout: Optional[float] = None,
+                 threads_per_worker: Optional[int] = 1, startup_timeout: float = 300.):
+        """
+        Parameters
+        ----------
+        model : str, pathlib.Path or Model
+            the path of the model file loaded by each worker (preferably a '.pygmalion' file,
+            which weights are memory mapped and shared between the workers), or a model to send to the workers
+        n_workers : int or None
+            the number of worker processes, or None for one per cpu
+        method : str
+            the method of the model called by default for each request
+        port : int
+            the port the server listens to for the connection of the workers (0 for any free port)
+        address : str
+            the address the server listens to
+        health_interval : float
+            the interval in seconds between the health checks of an idle worker
+        timeout : float or None
+            maximum time in seconds a worker has to answer a request or a health check before it is restarted,
+            or None for no limit (the workers whose process died are still restarted)
+        threads_per_worker : int or None
+            the number of threads used by torch in each worker, or None to keep the torch default
+        startup_timeout : float
+            maximum time in seconds for the workers to load the model at startup
+        """
+        self.model = model
+        self.method = method
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.threads_per_worker = threads_per_worker
+        self._context = multiprocessing.get_context("spawn")
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.bind((address, port))
+        self._listener.listen()
+        self.address, self.port = self._listener.getsockname()[:2]
+        self._waker, self._wakee = socket.socketpair()
+        self._lock = threading.Lock()
+        self._ids = count()
+        self._pending: Deque[tuple] = deque()
+        self._futures: Dict[int, Future] = {}
+        self._closed = False
+        self.workers = [_Worker(i) for i in range(n_workers or os.cpu_count() or 1)]
+        try:
+            for worker in self.workers:
+                self._start(worker)
+            self._wait_startup(startup_timeout)
+        except BaseException:
+            self._shutdown()
+            raise
+        self._dispatcher = threading.Thread(target=self._run, name=f"{type(self).__name__}-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.workers)} workers, address={self.address}, port={self.port})"
+
+    def __enter__(self) -> "ModelServer":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, *args, method: Optional[str] = None, **kwargs) -> Future:
+        """
+        queues a request calling the given method of the model (by default 'self.method') with the given arguments,
+        and returns the future of its result. The ID of the request is stored in the 'request_id' attribute of the future.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"The {type(self).__name__} is closed")
+            future.request_id = next(self._ids)
+            self._futures[future.request_id] = future
+            self._pending.append((future.request_id, method or self.method, args, kwargs))
+        self._wake()
+        return future
+
+    def predict(self, *args, **kwargs) -> object:
+        """
+        returns the result of the request, once evaluated by a worker
+        """
+        return self.submit(*args, **kwargs).result()
+
+    async def predict_async(self, *args, **kwargs) -> object:
+        """
+        returns the result of the request, without blocking the event loop
+        """
+        return await asyncio.wrap_future(self.submit(*args, **kwargs))
+
+    def health(self) -> List[dict]:
+        """
+        returns the state of each worker: its process ID, whether its process is alive and connected to the server,
+        the ID of the request it is evaluating, the number of requests served,
+        the number of times it was restarted, and the number of seconds since its last answer
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{"worker": w.index, "pid": w.process.pid, "alive": w.process.is_alive(),
+                     "connected": w.connection is not None,
+                     "request": None if w.request is None or w.request[1] is None else w.request[0],
+                     "served": w.served, "restarts": w.restarts, "last_seen": now - w.last_seen}
+                    for w in self.workers]
+
+    @property
+    def healthy(self) -> bool:
+        """
+        True if all the workers are alive and connected
+        """
+        return all(w["alive"] and w["connected"] for w in self.health())
+
+    def close(self):
+        """
+        stops the workers once all the submitted requests are answered
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake()
+        self._dispatcher.join()
+
+    def _run(self):
+        """
+        the loop of the dispatcher thread
+        """
+        try:
+            while True:
+                with self._lock:
+                    if self._closed and len(self._pending) == 0 and all(w.request is None for w in self.workers):
+                        break
+                self._dispatch()
+                connections = {w.connection: w for w in self.workers if w.connection is not None}
+                readable, _, _ = select([self._listener, self._wakee, *connections], [], [], self.health_interval)
+                for sock in readable:
+                    if sock is self._listener:
+                        self._accept()
+                    elif sock is self._wakee:
+                        self._wakee.recv(4096)
+                    else:
+                        self._receive(connections[sock])
+                self._check_health()
+        finally:
+            self._shutdown()
+
+    def _dispatch(self):
+        """
+        sends the pending requests to the idle workers
+        """
+        for worker in self.workers:
+            if worker.connection is None or worker.request is not None:
+                continue
+            with self._lock:
+                if len(self._pending) == 0:
+                    break
+                request = self._pending.popleft()
+            if not self._send(worker, request):
+                with self._lock:
+                    self._pending.appendleft(request)
+
+    def _send(self, worker: "_Worker", request: tuple) -> bool:
+        """
+        sends a request to the worker, or restarts it and returns False if the connection is broken
+        """
+        try:
+            send_object(worker.connection, request)
+        except OSError:
+            self._restart(worker, None)
+            return False
+        worker.request, worker.started = request, time.monotonic()
+        return True
+
+    def _receive(self, worker: "_Worker"):
+        """
+        receives the answer of a worker, and sets the result of the corresponding future
+        """
+        try:
+            request_id, success, value = receive_object(worker.connection)
+        except (OSError, RuntimeError, EOFError, pickle.UnpicklingError):
+            self._restart(worker, RuntimeError(f"The worker {worker.index} of the {type(self).__name__} crashed"))
+            return
+        is_health_check = worker.request is not None and worker.request[1] is None
+        worker.request, worker.last_seen = None, time.monotonic()
+        if is_health_check:
+            return
+        worker.served += 1
+        with self._lock:
+            future = self._futures.pop(request_id, None)
+        if future is not None and future.set_running_or_notify_cancel():
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _check_health(self):
+        """
+        restarts the dead or unresponsive workers, and sends health checks to the idle workers
+        """
+        now = time.monotonic()
+        for worker in self.workers:
+            if not worker.process.is_alive():
+                self._restart(worker, RuntimeError(f"The process of the worker {worker.index} of the {type(self).__name__} "
+                                                   f"exited with code {worker.process.exitcode}"))
+            elif worker.connection is None:
+                continue
+            elif worker.request is not None:
+                if self.timeout is not None and now - worker.started > self.timeout:
+                    self._restart(worker, TimeoutError(f"The worker {worker.index} of the {type(self).__name__} "
+                                                       f"did not answer within {self.timeout} seconds"))
+            elif now - worker.last_seen > self.health_interval:
+                self._send(worker, (None, None, (), {}))
+
+    def _restart(self, worker: "_Worker", exception: Optional[BaseException]):
+        """
+        kills the process of the worker and starts a new one.
+        The exception is set on the future of the request the worker was evaluating (if any).
+        """
+        if worker.request is not None and worker.request[1] is not None:
+            with self._lock:
+                future = self._futures.pop(worker.request[0], None)
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(exception or RuntimeError(f"The worker {worker.index} was restarted"))
+        if worker.connection is not None:
+            worker.connection.close()
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.restarts += 1
+        self._start(worker)
+
+    def _start(self, worker: "_Worker"):
+        """
+        starts the process of a worker, that will connect to the server once the model is loaded
+        """
+        worker.connection, worker.request = None, None
+        worker.process = self._context.Process(target=_serve, name=f"{type(self).__name__}-worker-{worker.index}",
+                                               args=(self.model, self.address, self.port, worker.index, self.threads_per_worker),
+                                               daemon=True)
+        worker.process.start()
+
+    def _accept(self):
+        """
+        accepts the connection of a worker, which sends its index first
+        """
+        connection, _ = self._listener.accept()
+        try:
+            index = receive_object(connection)
+        except (OSError, RuntimeError, EOFError):
+            connection.close()
+            return
+        worker = self.workers[index]
+        worker.connection, worker.last_seen = connection, time.monotonic()
+
+    def _wait_startup(self, timeout: float):
+        """
+        waits for all the workers to be connected
+        """
+        deadline = time.monotonic() + timeout
+        while any(w.connection is None for w in self.workers):
+            dead = [w for w in self.workers if w.connection is None and not w.process.is_alive()]
+            if len(dead) > 0:
+                raise RuntimeError(f"The process of the worker {dead[0].index} exited with code "
+                                   f"{dead[0].process.exitcode} while loading the model")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The workers did not load the model within {timeout} seconds")
+            readable, _, _ = select([self._listener], [], [], 0.1)
+            if len(readable) > 0:
+                self._accept()
+
+    def _shutdown(self):
+        """
+        stops the workers and fails the requests that were not answered
+        """
+        for worker in self.workers:
+            if worker.connection is not None:
+                try:
+                    send_object(worker.connection, None)
+                except OSError:
+                    pass
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5.)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+            if worker.connection is not None:
+                worker.connection.close()
+                worker.connection = None
+        with self._lock:
+            self._closed = True
+            futures, self._futures = list(self._futures.values()), {}
+            self._pending.clear()
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError(f"The {type(self).__name__} was closed"))
+        for sock in (self._listener, self._waker, self._wakee):
+            sock.close()
+
+    def _wake(self):
+        """
+        interrupts the wait of the dispatcher thread
+        """
+        try:
+            self._waker.send(b"\x00")
+        except OSError:
+            pass
+
+
+class _Worker:
+    """
+    the state of a worker process, as seen by the server
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.connection: Optional[socket.socket] = None
+        self.request: Optional[tuple] = None  # the request being evaluated
+        self.started = 0.  # the time the request was sent
+        self.last_seen = time.monotonic()  # the time of the last answer
+        self.served = 0
+        self.restarts = 0
+
+
+def _serve(model: Union[str, pathlib.Path, Model], address: str, port: int, index: int,
+           threads_per_worker: Optional[int]):
+    """
+    the main function of the worker processes.
+    The requests are (request ID, method name, args, kwargs) tuples, with a method name of None for the health checks.
+    The answers are (request ID, success, result or exception) tuples.
+    """
+    if not isinstance(model, Model):
+        from ._load_model import load_model
+        model = load_model(model)
+    torch = sys.modules.get("torch")
+    if torch is not None and threads_per_worker is not None:
+        torch.set_num_threads(threads_per_worker)
+    connection = Client(port, address).socket
+    send_object(connection, index)
+    while True:
+        try:
+            request = receive_object(connection)
+        except (OSError, RuntimeError):  # the server was closed
+            break
+        if request is None:
+            break
+        request_id, method, args, kwargs = request
+        if method is None:
+            answer = (request_id, True, os.getpid())
+        else:
+            try:
+                answer = (request_id, True, getattr(model, method)(*args, **kwargs))
+            except Exception as e:
+                answer = (request_id, False, _picklable(e))
+        send_object(connection, answer)
+    connection.close()
+
+
+def _picklable(exception: Exception) -> Exception:
+    """
+    returns the exception, or a RuntimeError with its representation if it can't be pickled
+    """
+    try:
+        pickle.loads(pickle.dumps(exception))
+    except Exception:
+        return RuntimeError(repr(exception))
+    return exception
@@ -11,13 +11,16 @@ def plot_losses(train_losses: List[float], val_losses: Optional[List[float]] = N
                 ax: Optional[matplotlib.axes.Axes] = None, log_scale: bool = True):
     """
     plot the losses
+    (validation losses that are None, for steps where validation was not performed, are skipped)
     """
     drawn = []
     if ax is None:
         f, ax = plt.subplots()
     drawn.append(ax.scatter(range(len(train_losses)), train_losses, label="training loss"))
     if val_losses is not None:
-        drawn.append(ax.scatter(range(len(val_losses)), val_losses, label="validation loss"))
+        evaluated = [(i, v) for i, v in enumerate(val_losses) if v is not None]
+        steps, losses = zip(*evaluated) if len(evaluated) > 0 else ([], [])
+        drawn.append(ax.scatter(steps, losses, label="validation loss"))
     ax.set_xlabel("steps")
     ax.set_ylabel("loss")
     if log_scale:
@@ -17,8 +17,7 @@ dataset = load_dataset('wmt14', 'fr-en', trust_remote_code=True)
 path = pathlib.Path(__file__).parent
 tokenizer_path = path / "tokenizer.json"
 restart_step = 0
-model_checkpoint_path = path #/ "checkpoints" / "vanilla_model_200000_label_smoothing.pth"
-optimizer_checkpoint_path = path #/ "checkpoints" / "optimizer_vanilla_model_200000_label_smoothing.pth"
+checkpoint_path = path #/ "checkpoints" / "vanilla_model_200000.ckpt"
 
 if tokenizer_path.is_file():
     print("Loading tokenizer")
@@ -40,10 +39,7 @@ else:
                   max_vocabulary_size=20_000, min_frequency=0, pre_tokenize=True)
     tokenizer.save(tokenizer_path)
 
-if model_checkpoint_path.is_file():
-    print("Loading model")
-    model = torch.load(model_checkpoint_path)
-elif method.startswith("vanilla"):
+if method.startswith("vanilla"):
     model = TextTranslator(tokenizer, tokenizer, n_stages=6,
                            projection_dim=16 if method.endswith("32") else 64,
                            n_heads=32 if method.endswith("32") else 8,
@@ -76,8 +72,9 @@ class Batchifyer:
                                        max_output_sequence_length=self.padded_size)
 
 optimizer = torch.optim.Adam(model.parameters(), betas=(0.9, 0.98))
-if optimizer_checkpoint_path.is_file():
-    optimizer.load_state_dict(torch.load(optimizer_checkpoint_path, map_location=model.device).state_dict())
+if checkpoint_path.is_file():
+    print("Loading checkpoint")
+    restart_step = model.load_checkpoint(checkpoint_path, optimizer)
 hist = model.fit(Batchifyer(dataset["train"], batch_size=100, n_batches=1),
                  Batchifyer(dataset["validation"], batch_size=100, n_batches=1),
                  optimizer, n_steps=300_000, keep_best=False,
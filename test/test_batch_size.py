@@ -0,0 +1,74 @@
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor, ProbabilityDistribution, ImageObjectDetector
+from pygmalion.utilities import find_max_batch_size
+from pygmalion.utilities._batch_size import _sampler, _resampled, _training_memory
+
+
+def test_find_max_batch_size():
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(100, 3), columns=["a", "b", "c"])
+    model = DenseRegressor(["a", "b"], "c", hidden_layers=[32, 32])
+    data = model.data_to_tensor(df[["a", "b"]], df["c"])
+    state = {k: v.clone() for k, v in model.state_dict().items()}
+    budget = 20 * sum(p.numel() * p.element_size() for p in model.parameters())
+    batch_size, throughputs = find_max_batch_size(model, data, budget, n_repeats=1)
+    assert 1 < batch_size < 2**16
+    assert max(throughputs) == batch_size
+    too_large, _ = find_max_batch_size(model, data, budget, min_batch_size=batch_size+1, n_repeats=1)
+    assert too_large == 0
+    assert all(torch.equal(v, state[k]) for k, v in model.state_dict().items())
+    assert model.input_normalizer.n_observations == 0
+
+
+def test_allocation_error():
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(100, 3), columns=["a", "b", "c"])
+    model = DenseRegressor(["a", "b"], "c", hidden_layers=[8])
+    data = model.data_to_tensor(df[["a", "b"]], df["c"])
+    loss = model.loss
+
+    def failing_loss(x, y_target, weights=None):
+        if len(x) > 20:  # allocation failure on CPU
+            raise RuntimeError("DefaultCPUAllocator: can't allocate memory: you tried to allocate 1000000 bytes.")
+        return loss(x, y_target, weights)
+
+    model.loss = failing_loss
+    batch_size, _ = find_max_batch_size(model, data, n_repeats=1)
+    assert batch_size == 20
+    model.loss = lambda *args: torch.ones(3, 3) @ torch.ones(2, 2)  # other errors are raised
+    with pytest.raises(RuntimeError):
+        find_max_batch_size(model, data, n_repeats=1)
+
+
+def _memories(model, data):
+    """
+    the estimated training memory of batches of increasing sizes sampled from the data
+    """
+    sample = _sampler(data, _resampled(model, data))
+    return [_training_memory(model, sample(batch_size), "fp32", False) for batch_size in (4, 16, 64)]
+
+
+def test_sampling_without_micro_batching():
+    torch.manual_seed(0)
+    rng = np.random.RandomState(0)
+    model = ProbabilityDistribution(["a", "b"], [64, 64])
+    data = model.data_to_tensor(pd.DataFrame(rng.rand(50, 2), columns=["a", "b"]))
+    memories = _memories(model, data)
+    assert memories[0] < memories[1] < memories[2]
+    model = ImageObjectDetector(1, ["circle", "square"], [4, 8], gradient_checkpointing=False)
+    x = rng.randint(0, 255, size=(10, 32, 32)).astype(np.uint8)
+    y = [{"x": [5.], "y": [6.], "w": [3.], "h": [3.], "class": ["circle"]} for _ in range(10)]
+    data = model.data_to_tensor(x, y)
+    memories = _memories(model, data)
+    assert memories[0] < memories[1] < memories[2]
+
+
+if __name__ == "__main__":
+    test_find_max_batch_size()
+    test_allocation_error()
+    test_sampling_without_micro_batching()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from pygmalion.neural_networks import DenseRegressor
+from pygmalion.utilities import BatchingPredictor
+
+
+def _model() -> DenseRegressor:
+    torch.manual_seed(0)
+    return DenseRegressor(["a", "b"], "c", hidden_layers=[8])
+
+
+def test_threads():
+    model = _model()
+    df = pd.DataFrame(np.random.RandomState(0).rand(200, 2), columns=["a", "b"])
+    expected = model.predict(df)
+    with BatchingPredictor(model, max_batch_size=16, max_wait=0.05) as predictor:
+        with ThreadPoolExecutor(32) as pool:
+            results = list(pool.map(lambda i: predictor.predict({"a": df["a"][i], "b": df["b"][i]}), range(len(df))))
+        metrics = predictor.metrics
+    assert np.allclose(np.concatenate(results), expected, atol=1.0E-6)
+    assert metrics["requests"] == 200
+    assert metrics["batches"] < 200
+    assert 1 < metrics["max_batch_size"] <= 16
+    assert metrics["queue_depth"] == 0
+
+
+def test_async():
+    model = _model()
+    df = pd.DataFrame(np.random.RandomState(1).rand(20, 2), columns=["a", "b"])
+
+    async def predict_all(predictor):
+        return await asyncio.gather(*(predictor.predict_async(df.iloc[i:i+2]) for i in range(0, 20, 2)))
+
+    with BatchingPredictor(model, max_batch_size=8) as predictor:
+        results = asyncio.run(predict_all(predictor))
+        with pytest.raises(KeyError):  # exceptions are raised to the callers
+            predictor.predict(pd.DataFrame({"x": [1.0]}))
+    assert np.allclose(np.concatenate(results), model.predict(df), atol=1.0E-6)
+    with pytest.raises(RuntimeError):
+        predictor.predict(df)
+
+
+if __name__ == "__main__":
+    test_threads()
+    test_async()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,68 @@
+import io
+import random
+import pytest
+from pygmalion.tokenizers import BytePairEncoder
+from pygmalion.utilities import load_model
+
+
+def test_code():
+    # merges can reference tokens defined after them
+    code = {**{i: [i] for i in range(256)}, 256: [257, 99], 257: [97, 98]}
+    tokenizer = BytePairEncoder(code=code)
+    assert tokenizer.vocabulary[256:258] == (b"ab", b"abc")
+    assert tokenizer.split("abcab", with_dropout=False) == [b"abc", b"ab"]
+    with pytest.raises(ValueError):
+        BytePairEncoder(code={**code, 257: [256, 97]})
+
+
+def _sweeps(code: dict) -> tuple:
+    """
+    the vocabulary order of the tokenizers saved before the code was resolved in a single pass
+    """
+    code_bytes = {i: bytes([i]) for i in range(256)}
+    not_represented = {i: c for i, c in code.items() if i not in code_bytes.keys()}
+    while len(not_represented) > 0:
+        tmp = {}
+        for i, c in not_represented.items():
+            if all(j in code_bytes.keys() for j in c):
+                code_bytes[i] = b"".join(code_bytes[j] for j in c)
+            else:
+                tmp[i] = c
+        not_represented = tmp
+    return tuple(code_bytes.values())
+
+
+def test_vocabulary_order():
+    code = {**{i: [i] for i in range(256)}, 256: [258, 97], 257: [259, 98], 258: [99, 100], 259: [101, 102]}
+    tokenizer = BytePairEncoder(code=code)
+    assert tokenizer.vocabulary[:len(code)] == _sweeps(code)
+    assert tokenizer.encode("cdaefb", with_dropout=False) == [258, 259]
+    rng = random.Random(0)
+    for _ in range(20):
+        tokens = list(range(256, 320))
+        merges = {t: [rng.choice(list(range(97, 123)) + tokens[:i]), rng.randrange(97, 123)] for i, t in enumerate(tokens)}
+        rng.shuffle(tokens)
+        code = {**{i: [i] for i in range(256)}, **{t: merges[t] for t in tokens}}
+        assert BytePairEncoder(code=code).vocabulary[:len(code)] == _sweeps(code)
+
+
+def test_npz():
+    tokenizer = BytePairEncoder(lowercase=True, special_tokens=["START", "END"])
+    tokenizer.fit([["the cat sat on the mat", "the dog ate the hat"]]*30, verbose=False)
+    stream = io.BytesIO()
+    tokenizer.save(stream, format="npz")
+    stream.seek(0)
+    loaded = load_model(stream)
+    string = "The cat ate the dog's hat"
+    assert loaded.vocabulary == tokenizer.vocabulary
+    assert loaded.encode(string, with_dropout=False) == tokenizer.encode(string, with_dropout=False)
+    assert loaded._bytes_tree.data == tokenizer._bytes_tree.data
+    assert loaded.dump == tokenizer.dump
+
+
+if __name__ == "__main__":
+    test_code()
+    test_vocabulary_order()
+    test_npz()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,62 @@
+import torch
+from pygmalion.neural_networks import ImageClassifier, plan_checkpointing, apply_checkpointing
+from pygmalion.neural_networks.layers.convolutions import PaddedConv2d
+from pygmalion.neural_networks.layers.transformers import TransformerEncoder
+from pygmalion.neural_networks._micro_batching import activations_memory, static_memory
+
+
+def _batch():
+    torch.manual_seed(0)
+    return (torch.rand(16, 3, 32, 32), torch.randint(0, 2, (16,)), None)
+
+
+def _gradients(model, batch):
+    model.zero_grad()
+    torch.manual_seed(0)
+    model.loss(*batch).backward()
+    return [p.grad.clone() for p in model.parameters()]
+
+
+def test_no_nested_recomputation():
+    model = ImageClassifier(3, ["a", "b"], [8, 16], gradient_checkpointing=True, normalize=False)
+    conv = next(m for m in model.modules() if isinstance(m, PaddedConv2d))
+    calls = []
+    conv.register_forward_hook(lambda *args: calls.append(None))
+    model.train()
+    model.loss(*_batch()).backward()
+    assert len(calls) == 2  # forward, then a single recomputation during backward
+
+
+def test_plan():
+    model = ImageClassifier(3, ["a", "b"], [8, 16, 32], gradient_checkpointing=False, normalize=False)
+    batch = _batch()
+    apply_checkpointing(model, {name: False for name, m in model.named_modules() if isinstance(m, PaddedConv2d)})
+    memory = activations_memory(model, batch) + static_memory(model)
+    gradients = _gradients(model, batch)
+    assert plan_checkpointing(model, batch, memory)["encoder"] == ()
+    plan = plan_checkpointing(model, batch, int(0.9 * memory))
+    assert 0 < len(plan["encoder"]) < 3
+    assert not any(v for k, v in plan.items() if k != "encoder")
+    apply_checkpointing(model, plan)
+    assert activations_memory(model, batch) + static_memory(model) <= 0.9 * memory
+    assert all(torch.allclose(g, pg, atol=1.0E-6) for g, pg in zip(gradients, _gradients(model, batch)))
+
+
+def test_transformer_stages():
+    torch.manual_seed(0)
+    encoder = TransformerEncoder(4, 16, 2, gradient_checkpointing=(1, 3))
+    X = torch.rand(2, 5, 32)
+    reference = TransformerEncoder(4, 16, 2, gradient_checkpointing=False)
+    reference.load_state_dict(encoder.state_dict())
+    encoder(X).sum().backward()
+    reference(X).sum().backward()
+    assert all(torch.allclose(p.grad, r.grad, atol=1.0E-5)
+               for p, r in zip(encoder.parameters(), reference.parameters()))
+
+
+if __name__ == "__main__":
+    test_no_nested_recomputation()
+    test_plan()
+    test_transformer_stages()
+    import IPython
+    IPython.embed()
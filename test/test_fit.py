@@ -0,0 +1,134 @@
+import gc
+import json
+import pathlib
+import tempfile
+import weakref
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor, Profiler
+
+
+def _model_and_data(n_observations: int = 64):
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(n_observations, 3), columns=["a", "b", "c"])
+    model = DenseRegressor(["a", "b"], "c", hidden_layers=[8, 8])
+    data = model.data_to_tensor(df[["a", "b"]], df["c"])
+    return model, data
+
+
+def test_mixed_precision():
+    for precision in ["fp32", "bf16", "fp16"]:
+        model, data = _model_and_data()
+        train_losses, val_losses, grad_norms, best_step = model.fit(data, data, n_steps=10, L2=1.0E-3, gradient_cliping=1.0,
+                                                                    precision=precision, verbose=False)
+        assert len(train_losses) == 11
+        assert all(np.isfinite(train_losses))
+        assert all(p.dtype == torch.float32 for p in model.parameters())
+
+
+def test_validation_frequency():
+    for asynchronous in [False, True]:
+        model, data = _model_and_data()
+        train_losses, val_losses, grad_norms, best_step = model.fit(data, data, n_steps=10, validation_frequency=3,
+                                                                    asynchronous_validation=asynchronous, verbose=False)
+        assert len(val_losses) == len(train_losses)
+        evaluated = [i for i, v in enumerate(val_losses) if v is not None]
+        assert evaluated[0] == 0
+        if not asynchronous:
+            assert evaluated == [0, 3, 6, 9]
+        assert best_step in evaluated
+
+
+def test_snapshot(tmp_path):
+    model, data = _model_and_data()
+    train_losses, val_losses, grad_norms, best_step = model.fit(data, n_steps=10, learning_rate=1.0E-2,
+                                                                snapshot_frequency=4, snapshot_path=tmp_path / "best.bin",
+                                                                verbose=False)
+    assert best_step in (0, 4, 8)
+    assert abs(model._evaluate([data]) - train_losses[best_step]) < 1.0E-3 * abs(train_losses[best_step])
+
+
+def test_backup(tmp_path):
+    model, data = _model_and_data()
+    model.fit(data, n_steps=10, backup_path=tmp_path, backup_frequency=2,
+              backup_keep_last=2, backup_keep_best=1, verbose=False)
+    files = sorted(f.name for f in tmp_path.iterdir())
+    assert files == ["model_08.ckpt", "model_10.ckpt"]
+    restored, _ = _model_and_data()
+    assert restored.load_checkpoint(tmp_path / "model_10.ckpt") == 10
+
+
+def test_data_parallel():
+    model, data = _model_and_data()
+    train_losses, val_losses, grad_norms, best_step = model.fit(data, data, n_steps=5, n_processes=2, verbose=False)
+    assert len(train_losses) == 6
+    assert abs(model._evaluate([data]) - val_losses[best_step]) < 1.0E-3 * abs(val_losses[best_step])
+    # the optimizer state of the training processes is loaded back into the optimizer
+    optimizer = torch.optim.Adam(model.parameters(), 1.0E-3)
+    model.fit(data, n_steps=3, n_processes=2, optimizer=optimizer, verbose=False)
+    assert len(optimizer.state) > 0 and all(state["step"] == 3 for state in optimizer.state.values())
+
+
+def test_telemetry(tmp_path):
+    model, data = _model_and_data()
+    # the telemetry file is not opened if the setup of the training fails
+    with pytest.raises(ValueError):
+        model.fit(data, n_steps=1, telemetry_path=tmp_path / "failed.jsonl", max_micro_batch_size=0, verbose=False)
+    assert not (tmp_path / "failed.jsonl").exists()
+    path = tmp_path / "telemetry.jsonl"
+    train_losses, val_losses, grad_norms, best_step, records = model.fit(data, data, n_steps=5, telemetry_path=path, verbose=False)
+    assert len(records) == len(train_losses)
+    assert all(r["samples"] == len(data[0]) for r in records)
+    assert all(r["total"] >= r["forward"] + r["backward"] for r in records)
+    with open(path) as file:
+        assert [json.loads(line) for line in file] == records
+
+
+def test_profile(tmp_path):
+    model, data = _model_and_data()
+    model.fit(data, data, n_steps=6, profile=Profiler(tmp_path, wait=1, warmup=1, active=2), verbose=False)
+    traces = list(tmp_path.glob("*.pt.trace.json"))
+    assert len(traces) == 1
+    with open(traces[0]) as file:
+        names = {event.get("name") for event in json.load(file)["traceEvents"]}
+    assert {"data", "forward", "backward", "optimizer", "validation"} <= names
+
+
+def test_compile(tmp_path):
+    model, data = _model_and_data()
+    x, y = data
+    model.fit(data, n_steps=2, compile=True, verbose=False)
+    assert "forward" not in model.__dict__
+    model.save(tmp_path / "model.pth")
+    model.eval()
+    with torch.no_grad():
+        eager = model(x)
+        with model._compiled():
+            compiled = model(x)
+    assert torch.allclose(eager, compiled, atol=1.0E-5)
+
+
+def test_compile_release():
+    model, data = _model_and_data()
+    x, _ = data
+    model.predict(pd.DataFrame(x.numpy(), columns=list(model.inputs)), compile=True)
+    reference = weakref.ref(model)
+    del model
+    gc.collect()
+    assert reference() is None  # the cached compiled methods do not keep the model alive
+
+
+if __name__ == "__main__":
+    test_mixed_precision()
+    test_validation_frequency()
+    test_snapshot(pathlib.Path(tempfile.mkdtemp()))
+    test_backup(pathlib.Path(tempfile.mkdtemp()))
+    test_data_parallel()
+    test_telemetry(pathlib.Path(tempfile.mkdtemp()))
+    test_profile(pathlib.Path(tempfile.mkdtemp()))
+    test_compile(pathlib.Path(tempfile.mkdtemp()))
+    test_compile_release()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,66 @@
+import io
+import numpy as np
+import pandas as pd
+from pygmalion.decision_trees import (DecisionTreeRegressor, DecisionTreeClassifier,
+                                      GradientBoostingRegressor, GradientBoostingClassifier)
+from pygmalion.utilities import load_model
+
+
+def _data() -> pd.DataFrame:
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(200, 3), columns=["a", "b", "c"])
+    df["y"] = np.sin(6 * df["a"]) + df["b"] ** 2
+    df["label"] = np.where(df["y"] > df["y"].median(), "high", "low")
+    return df
+
+
+def _test_data(df: pd.DataFrame) -> pd.DataFrame:
+    test = df[["a", "b", "c"]].copy()
+    test.iloc[:10, 0] = np.nan
+    return test
+
+
+def test_decision_trees(tmp_path):
+    df = _data()
+    test = _test_data(df)
+    for model, name in [(DecisionTreeRegressor(["a", "b", "c"], "y"), "regressor"),
+                        (DecisionTreeClassifier(["a", "b", "c"], "label", ["high", "low"]), "classifier")]:
+        model.fit(df, max_depth=5)
+        model.save(tmp_path / f"{name}.json")
+        model.save(tmp_path / f"{name}.npz")
+        from_json = load_model(tmp_path / f"{name}.json")
+        from_npz = load_model(tmp_path / f"{name}.npz")
+        assert type(from_npz) is type(model)
+        expected = from_json.predict(test)
+        assert pd.Series(from_npz.predict(test)).equals(pd.Series(expected))
+        # the trees rebuilt from the arrays are the same as the original ones
+        assert from_npz.dump == from_json.dump
+
+
+def test_gradient_boosting(tmp_path):
+    df = _data()
+    test = _test_data(df)
+    regressor = GradientBoostingRegressor(["a", "b", "c"], "y")
+    regressor.fit(df, n_trees=10, max_depth=3, verbose=False)
+    classifier = GradientBoostingClassifier(["a", "b", "c"], "label", ["high", "low"])
+    classifier.fit(df, n_trees=10, max_depth=3, verbose=False)
+    for model in (regressor, classifier):
+        stream = io.BytesIO()
+        model.save(stream, format="npz")
+        stream.seek(0)
+        loaded = load_model(stream)
+        from_json = type(model).from_dump(model.dump)
+        if isinstance(model, GradientBoostingClassifier):
+            assert np.allclose(loaded.predict(test, probabilities=True), from_json.predict(test, probabilities=True), equal_nan=True)
+        else:
+            assert np.allclose(loaded.predict(test), from_json.predict(test), equal_nan=True)
+        assert loaded.dump == model.dump
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_decision_trees(pathlib.Path(tempfile.mkdtemp()))
+    test_gradient_boosting(pathlib.Path(tempfile.mkdtemp()))
+    import IPython
+    IPython.embed()
@@ -0,0 +1,49 @@
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor, DenseClassifier, ProbabilityDistribution
+from pygmalion.neural_networks.layers import Dropout, Normalizer
+
+
+def _data() -> pd.DataFrame:
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.normal(loc=[10., -3., 0.], scale=[5., 0.1, 1.], size=(200, 3)), columns=["a", "b", "c"])
+    df["d"] = 2 * df["a"] + 100 * df["b"]
+    df["e"] = np.where(df["a"] > 10, "high", "low")
+    return df
+
+
+def test_dense():
+    torch.manual_seed(0)
+    df = _data()
+    regressor = DenseRegressor(["a", "b", "c"], ["d", "a"], hidden_layers=[16, 16], dropout=0.1)
+    regressor.fit(regressor.data_to_tensor(df[["a", "b", "c"]], df[["d", "a"]]), n_steps=20, verbose=False)
+    classifier = DenseClassifier(["a", "b", "c"], "e", ["high", "low"], hidden_layers=[], dropout=0.1)
+    classifier.fit(classifier.data_to_tensor(df[["a", "b", "c"]], df["e"]), n_steps=20, verbose=False)
+    for model in (regressor, classifier):
+        frozen = model.freeze()
+        assert not any(isinstance(m, (Dropout, Normalizer)) for m in frozen.modules())
+        assert not any(p.requires_grad for p in frozen.parameters())
+        assert any(p.requires_grad for p in model.parameters())  # the original model is unchanged
+        with pytest.raises(RuntimeError):
+            frozen.fit(model.data_to_tensor(df[["a", "b", "c"]], df[model.target if isinstance(model.target, str) else list(model.target)]), n_steps=1, verbose=False)
+    assert np.allclose(regressor.freeze().predict(df).to_numpy(), regressor.predict(df).to_numpy(), rtol=1.0E-5, atol=1.0E-4)
+    assert np.allclose(classifier.freeze().probabilities(df), classifier.probabilities(df), atol=1.0E-6)
+
+
+def test_monotonic():
+    torch.manual_seed(0)
+    df = _data()
+    model = ProbabilityDistribution(["a", "b"], [8], normalize=True, monotonic=True)
+    model.normalizer(torch.tensor(df[["a", "b"]].to_numpy(), dtype=torch.float))  # track the statistics
+    frozen = model.freeze()
+    assert not any(m.monotonic for m in frozen.modules() if hasattr(m, "monotonic"))
+    assert np.allclose(frozen.cdf(df), model.cdf(df), atol=1.0E-6)
+
+
+if __name__ == "__main__":
+    test_dense()
+    test_monotonic()
+    import IPython
+    IPython.embed()
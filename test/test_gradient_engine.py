@@ -0,0 +1,106 @@
+import copy
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor
+from pygmalion.neural_networks._gradient_engine import GradientEngine
+
+
+def _norm(tensors, order, average=True):
+    """
+    the norm of the tensors backpropagated through the loss before the gradients were post-processed
+    """
+    n, L = 0, 0.
+    for t in tensors:
+        L = L + torch.sum(torch.abs(t)**order)
+        n += t.numel()
+    if average:
+        L /= n
+    return L**(1/order)
+
+
+def _model_and_batches(n_batches: int = 3):
+    torch.manual_seed(0)
+    rng = np.random.RandomState(0)
+    model = DenseRegressor(["a", "b"], "c", hidden_layers=[8, 8], normalize=False)
+    batches = []
+    for _ in range(n_batches):
+        df = pd.DataFrame(rng.rand(20, 3), columns=["a", "b", "c"])
+        batches.append(model.data_to_tensor(df[["a", "b"]], df["c"]))
+    return model, batches
+
+
+def _baseline(model, batches, L1, L2, clipping):
+    model.zero_grad()
+    losses = []
+    for batch in batches:
+        loss = model.loss(*batch)
+        if L1 is not None:
+            loss = loss + L1 * _norm(model.parameters(), 1)
+        if L2 is not None:
+            loss = loss + L2 * _norm(model.parameters(), 2)
+        loss.backward()
+        losses.append(loss.item())
+    for p in model.parameters():
+        if p.grad is None:  # the running statistics of the normalizers
+            continue
+        p.grad /= len(batches)
+        if clipping is not None:
+            p.grad = torch.clip(p.grad, -clipping, clipping)
+    return sum(losses) / len(batches), [p.grad.clone() for p in model.parameters() if p.grad is not None]
+
+
+def _engine(model, batches, L1, L2, clipping):
+    model.zero_grad()
+    losses = []
+    for batch in batches:
+        loss = model.loss(*batch)
+        loss.backward()
+        losses.append(loss.item())
+    penalty, _ = GradientEngine(model.parameters(), L1, L2, clipping).step(len(batches))
+    return sum(losses) / len(batches) + penalty.item(), [p.grad.clone() for p in model.parameters() if p.grad is not None]
+
+
+def test_equivalence():
+    model, batches = _model_and_batches()
+    model.eval()
+    for L1, L2, clipping in [(None, None, None), (1.0E-2, None, None), (None, 1.0E-2, None),
+                             (1.0E-2, 1.0E-1, None), (1.0E-2, 1.0E-1, 1.0E-3)]:
+        loss, grads = _baseline(model, batches, L1, L2, clipping)
+        engine_loss, engine_grads = _engine(model, batches, L1, L2, clipping)
+        assert abs(loss - engine_loss) < 1.0E-6
+        assert len(grads) == len(engine_grads)
+        assert all(torch.allclose(g, eg, rtol=1.0E-5, atol=1.0E-8) for g, eg in zip(grads, engine_grads))
+
+
+def test_decoupled_weight_decay():
+    model, batches = _model_and_batches(n_batches=1)
+    expected = copy.deepcopy(model)
+    optimizer = torch.optim.AdamW(expected.parameters(), 1.0E-2, weight_decay=0.5)
+    expected.train()
+    expected.loss(*batches[0]).backward()
+    optimizer.step()
+    model.fit(batches, n_steps=1, learning_rate=1.0E-2, L2=0.5, decoupled_weight_decay=True,
+              keep_best=False, verbose=False)
+    assert all(torch.allclose(p, e, atol=1.0E-6) for p, e in zip(model.parameters(), expected.parameters()))
+
+
+def test_user_optimizer_weight_decay():
+    model, batches = _model_and_batches(n_batches=1)
+    optimizer = torch.optim.AdamW(model.parameters(), 1.0E-2, weight_decay=0.1)
+    model.fit(batches, optimizer=optimizer, n_steps=1, decoupled_weight_decay=True, keep_best=False, verbose=False)
+    assert all(g["weight_decay"] == 0.1 for g in optimizer.param_groups)  # unchanged if L2 is None
+    model.fit(batches, optimizer=optimizer, n_steps=1, L2=0.5, decoupled_weight_decay=True, keep_best=False, verbose=False)
+    assert all(g["weight_decay"] == 0.5 for g in optimizer.param_groups)
+    optimizer = torch.optim.Adam(model.parameters(), 1.0E-2)
+    with pytest.raises(ValueError):  # Adam's weight decay is a coupled L2 regularization
+        model.fit(batches, optimizer=optimizer, n_steps=1, L2=0.5, decoupled_weight_decay=True, keep_best=False, verbose=False)
+
+
+if __name__ == "__main__":
+    test_equivalence()
+    test_decoupled_weight_decay()
+    test_user_optimizer_weight_decay()
+    import IPython
+    IPython.embed()
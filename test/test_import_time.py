@@ -0,0 +1,51 @@
+import sys
+import json
+import subprocess
+
+SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+print(json.dumps({{"duration": duration, "modules": [m for m in {modules} if m in sys.modules]}}))
+"""
+HEAVY = ["torch", "torch._dynamo", "pandas", "matplotlib", "requests"]
+
+
+def _import(statement: str) -> dict:
+    """
+    returns the duration and the heavy modules imported by the statement, run in a new interpreter
+    """
+    script = SCRIPT.format(statement=statement, modules=HEAVY)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_lazy_imports():
+    result = _import("import pygmalion, pygmalion.neural_networks, pygmalion.utilities, pygmalion.decision_trees")
+    assert result["modules"] == []
+    assert result["duration"] < 0.5
+
+
+def test_tokenizer_imports(tmp_path):
+    path = tmp_path / "tokenizer.json"
+    result = _import(f"from pygmalion.tokenizers import WordsTokenizer\n"
+                     f"WordsTokenizer(vocabulary=['hello']).save({str(path)!r})\n"
+                     f"from pygmalion.utilities import load_model\n"
+                     f"load_model({str(path)!r})")
+    assert result["modules"] == []
+    assert result["duration"] < 0.5
+
+
+def test_neural_network_imports():
+    result = _import("from pygmalion.neural_networks import DenseRegressor")
+    assert "torch" in result["modules"]
+    assert not any(m in result["modules"] for m in ["torch._dynamo", "matplotlib", "requests"])
+
+
+if __name__ == "__main__":
+    print(_import("import pygmalion"))
+    print(_import("from pygmalion.neural_networks import DenseRegressor"))
+    print(_import("from pygmalion.decision_trees import GradientBoostingRegressor"))
+    import IPython
+    IPython.embed()
@@ -0,0 +1,72 @@
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor, DenseClassifier, ImageClassifier, ProbabilityDistribution, MicroBatcher
+
+
+def _gradients(model, batcher, batch):
+    model.zero_grad()
+    loss = 0.
+    for micro_batch, fraction in batcher.split(batch):
+        micro_loss = model.loss(*micro_batch) * fraction
+        micro_loss.backward()
+        loss += micro_loss.item()
+    return loss, [p.grad.clone() for p in model.parameters() if p.grad is not None]
+
+
+def test_micro_batch_gradients():
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(50, 2), columns=["a", "b"])
+    df["c"] = np.where(df["a"] > df["b"], "yes", "no")
+    model = DenseClassifier(["a", "b"], "c", ["yes", "no"], hidden_layers=[8, 8])
+    model.eval()
+    batch = model.data_to_tensor(df[["a", "b"]], df["c"], weights=np.random.RandomState(1).rand(50))
+    loss, grads = _gradients(model, MicroBatcher(model), batch)
+    micro_loss, micro_grads = _gradients(model, MicroBatcher(model, max_size=7), batch)
+    assert len(MicroBatcher(model, max_size=7).split(batch)) == 8
+    assert abs(loss - micro_loss) < 1.0E-5
+    assert all(torch.allclose(g, mg, atol=1.0E-6) for g, mg in zip(grads, micro_grads))
+
+
+def test_class_weights():
+    torch.manual_seed(0)
+    rng = np.random.RandomState(0)
+    model = ImageClassifier(1, ["a", "b", "c"], [4], normalize=False)
+    model.eval()
+    images = rng.randint(0, 256, (30, 8, 8)).astype(np.uint8)
+    classes = [["a", "b", "c"][i] for i in rng.randint(0, 3, 30)]
+    batch = model.data_to_tensor(images, classes, class_weights=[10., 1., 1.])
+    loss, grads = _gradients(model, MicroBatcher(model), batch)
+    for size in (7, 3):  # with micro-batches of 3 observations, the class weights must not be split
+        micro_loss, micro_grads = _gradients(model, MicroBatcher(model, max_size=size), batch)
+        assert abs(loss - micro_loss) < 1.0E-5
+        assert all(torch.allclose(g, mg, atol=1.0E-6) for g, mg in zip(grads, micro_grads))
+
+
+def test_not_decomposable():
+    model = ProbabilityDistribution(["a", "b"], [8])
+    with pytest.raises(ValueError):
+        MicroBatcher(model, max_size=10)
+
+
+def test_memory_budget():
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(1000, 3), columns=["a", "b", "c"])
+    model = DenseRegressor(["a", "b"], "c", hidden_layers=[64, 64])
+    batch = model.data_to_tensor(df[["a", "b"]], df["c"])
+    budget = 10 * sum(p.numel() * p.element_size() for p in model.parameters())
+    batcher = MicroBatcher(model, memory_budget=budget)
+    micro_batches = batcher.split(batch)
+    assert 1 < len(micro_batches) < 1000
+    assert abs(sum(fraction for _, fraction in micro_batches) - 1.) < 1.0E-6
+    model.fit(batch, n_steps=2, memory_budget=budget, verbose=False)
+
+
+if __name__ == "__main__":
+    test_micro_batch_gradients()
+    test_class_weights()
+    test_not_decomposable()
+    test_memory_budget()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pygmalion.neural_networks import DenseRegressor
+from pygmalion.utilities import load_model, MODEL_CACHE, ModelCache
+
+
+def test_cache(tmp_path):
+    MODEL_CACHE.invalidate()
+    path = tmp_path / "model.pygmalion"
+    DenseRegressor(["a"], "b", [8]).save(path)
+    with ThreadPoolExecutor(4) as pool:
+        models = list(pool.map(lambda _: load_model(path, cache=True), range(8)))
+    assert all(m is models[0] for m in models)
+    assert not models[0].training
+    assert load_model(path) is not models[0]
+    # a modified file is loaded again
+    DenseRegressor(["a"], "b", [8]).save(path, overwrite=True)
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert load_model(path, cache=True) is not models[0]
+    MODEL_CACHE.invalidate(path)
+    assert len(MODEL_CACHE) == 0
+
+
+def test_eviction(tmp_path):
+    cache = ModelCache(max_models=2)
+    paths = [tmp_path / f"model{i}.pygmalion" for i in range(3)]
+    for path in paths:
+        DenseRegressor(["a"], "b", [8]).save(path)
+    models = [cache.get(path, load_model) for path in paths]
+    assert len(cache) == 2
+    assert cache.get(paths[2], load_model) is models[2]
+    assert cache.get(paths[0], load_model) is not models[0]
+    size = sum(p.numel() * p.element_size() for p in models[0].parameters())
+    cache = ModelCache(max_models=None, max_memory=1)
+    for path in paths:
+        cache.get(path, load_model)
+    assert len(cache) == 1 and cache.memory >= size
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_cache(pathlib.Path(tempfile.mkdtemp()))
+    test_eviction(pathlib.Path(tempfile.mkdtemp()))
+    import IPython
+    IPython.embed()
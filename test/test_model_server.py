@@ -0,0 +1,42 @@
+import os
+import time
+import signal
+import asyncio
+import pytest
+import numpy as np
+import pandas as pd
+from pygmalion.decision_trees import DecisionTreeRegressor
+from pygmalion.utilities import ModelServer
+
+
+def test_model_server(tmp_path):
+    df = pd.DataFrame(np.random.RandomState(0).rand(100, 2), columns=["a", "b"])
+    df["c"] = df["a"] * df["b"]
+    model = DecisionTreeRegressor(["a", "b"], "c")
+    model.fit(df, max_depth=4)
+    model.save(tmp_path / "model.json")
+    with ModelServer(tmp_path / "model.json", n_workers=2, health_interval=0.1) as server:
+        assert server.healthy
+        futures = [server.submit(df.iloc[i:i+10]) for i in range(0, 100, 10)]
+        assert len(set(f.request_id for f in futures)) == 10
+        assert np.allclose(np.concatenate([f.result() for f in futures]), model.predict(df))
+        assert asyncio.run(server.predict_async(df, method="predict")).tolist() == model.predict(df).tolist()
+        with pytest.raises(KeyError):  # the exceptions are raised to the caller
+            server.predict(pd.DataFrame({"x": [1.0]}))
+        # a crashed worker is restarted
+        os.kill(server.health()[0]["pid"], signal.SIGKILL)
+        for _ in range(600):
+            time.sleep(0.1)
+            health = server.health()
+            if health[0]["restarts"] == 1 and all(w["connected"] and w["alive"] for w in health):
+                break
+        assert health[0]["restarts"] == 1
+        assert np.allclose(server.predict(df), model.predict(df))
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_model_server(pathlib.Path(tempfile.mkdtemp()))
+    import IPython
+    IPython.embed()
@@ -0,0 +1,67 @@
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.tokenizers import DummyTokenizer
+from pygmalion.neural_networks import DenseRegressor, DenseClassifier, ImageClassifier, TextTranslator, TimeSeriesRegressor
+
+
+def test_dense():
+    torch.manual_seed(0)
+    df = pd.DataFrame(np.random.RandomState(0).rand(103, 3), columns=["a", "b", "c"])
+    df["d"] = np.where(df["a"] > df["b"], "yes", "no")
+    regressor = DenseRegressor(["a", "b"], "c", hidden_layers=[8])
+    classifier = DenseClassifier(["a", "b"], "d", ["yes", "no"], hidden_layers=[8])
+    assert np.allclose(regressor.predict(df, batch_size=10), regressor.predict(df), atol=1.0E-6)
+    assert classifier.predict(df, batch_size=10) == classifier.predict(df)
+    assert np.allclose(classifier.probabilities(df, batch_size=10), classifier.probabilities(df), atol=1.0E-6)
+    batches = list(regressor.predict_iter(df.to_dict(orient="list"), batch_size=50))
+    assert [len(b) for b in batches] == [50, 50, 3]
+    # the gradient is only disabled while evaluating the batches
+    for _ in regressor.predict_iter(df, batch_size=50):
+        assert torch.is_grad_enabled()
+
+
+def test_images_generator():
+    torch.manual_seed(0)
+    images = np.random.RandomState(0).randint(0, 256, size=(7, 8, 8, 3), dtype=np.uint8)
+    model = ImageClassifier(3, ["a", "b"], features=[4])
+    expected = model.probabilities(images)
+    predicted = model.probabilities((image for image in images), batch_size=3)
+    assert predicted.index.tolist() == list(range(7))
+    assert np.allclose(predicted, expected, atol=1.0E-6)
+
+
+def test_translator():
+    torch.manual_seed(0)
+    tokenizer = DummyTokenizer()
+    model = TextTranslator(tokenizer, tokenizer, n_stages=1, projection_dim=8, n_heads=2)
+    strings = ["123", "45", "6789", "1", "22"]
+    expected = [model.predict(string, max_tokens=5, n_beams=2) for string in strings]
+    batches = list(model.predict_iter((string for string in strings), max_tokens=5, n_beams=2, batch_size=2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [translation for batch in batches for translation in batch] == expected
+
+
+def test_time_series():
+    torch.manual_seed(0)
+    lengths = [5, 3, 6, 4, 2]
+    df = pd.DataFrame({"obs": np.repeat(range(5), lengths),
+                       "t": np.concatenate([np.arange(n) for n in lengths]).astype(float)})
+    df["x"] = np.random.RandomState(0).rand(len(df))
+    times = pd.DataFrame({"obs": np.repeat(range(5), 3), "t": np.tile([10., 11., 12.], 5)})
+    model = TimeSeriesRegressor(["x"], ["x"], "obs", "t", n_stages=1, projection_dim=8, n_heads=2)
+    expected = model.predict(df, times)
+    batches = list(model.predict_iter(df, times, batch_size=2))
+    assert [b["obs"].nunique() for b in batches] == [2, 2, 1]
+    predicted = model.predict(df, times, batch_size=2)
+    assert predicted["obs"].tolist() == expected["obs"].tolist()
+    assert np.allclose(predicted[["x", "t"]], expected[["x", "t"]], atol=1.0E-5)
+
+
+if __name__ == "__main__":
+    test_dense()
+    test_images_generator()
+    test_translator()
+    test_time_series()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,36 @@
+import torch
+import pytest
+from pygmalion.neural_networks import Prefetcher
+
+
+class _Batches:
+
+    def __init__(self, n_batches: int, fail: bool = False):
+        self.n_batches = n_batches
+        self.fail = fail
+
+    def __iter__(self):
+        for i in range(self.n_batches):
+            if self.fail:
+                raise ValueError("failed to build batch")
+            yield (torch.full((3,), float(i)),)
+
+
+def test_order_preserved():
+    for n_workers in (1, 3):
+        with Prefetcher(_Batches(5), queue_depth=2, n_workers=n_workers) as prefetched:
+            for _ in range(4):
+                assert [batch[0][0].item() for batch in prefetched] == [0., 1., 2., 3., 4.]
+
+
+def test_worker_exception():
+    with Prefetcher(_Batches(5, fail=True)) as prefetched:
+        with pytest.raises(RuntimeError):
+            list(prefetched)
+
+
+if __name__ == "__main__":
+    test_order_preserved()
+    test_worker_exception()
+    import IPython
+    IPython.embed()
@@ -0,0 +1,68 @@
+import io
+import pytest
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseRegressor, quantization_report
+from pygmalion.neural_networks.layers import QuantizedLinear
+from pygmalion.utilities import load_model
+
+
+def _data() -> pd.DataFrame:
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+    df["d"] = df["a"] * df["b"] + np.sin(df["c"])
+    return df
+
+
+def test_quantize():
+    torch.manual_seed(0)
+    df = _data()
+    model = DenseRegressor(["a", "b", "c"], "d", hidden_layers=[64, 64])
+    data = model.data_to_tensor(df[["a", "b", "c"]], df["d"])
+    model.fit(data, n_steps=50, verbose=False)
+    quantized = model.quantize(min_elements=64*64)
+    assert sum(isinstance(m, QuantizedLinear) for m in quantized.modules()) == 1
+    assert not any(isinstance(m, QuantizedLinear) for m in model.modules())  # the original model is unchanged
+    assert np.allclose(quantized.predict(df), model.predict(df), atol=0.05)
+    with pytest.raises(RuntimeError):
+        quantized.fit(data, n_steps=1, verbose=False)
+    with pytest.raises(ValueError):
+        model.quantize(mode="int4")
+    for format in ("pickle", "state"):
+        f = io.BytesIO()
+        quantized.save(f, format=format)
+        f.seek(0)
+        loaded = load_model(f)
+        assert loaded.frozen
+        assert isinstance(loaded.get_submodule(quantized._quantized[0]), QuantizedLinear)
+        assert np.array_equal(loaded.predict(df), quantized.predict(df))
+    report = quantization_report(model, quantized, data, n_repeats=2)
+    assert list(report.index) == ["float32", "dynamic_int8"]
+    assert report.loc["dynamic_int8", "size (MB)"] < report.loc["float32", "size (MB)"]
+
+
+def test_layer():
+    torch.manual_seed(0)
+    linear = torch.nn.Linear(32, 16)
+    layer = QuantizedLinear.from_linear(linear)
+    X = torch.randn(4, 5, 32)
+    with torch.no_grad():
+        expected = linear(X)
+        assert layer(X).shape == (4, 5, 16)
+        assert torch.allclose(layer(X), expected, atol=0.05)
+        assert torch.allclose(layer(X[:0]), expected[:0])
+        X = torch.randn(64, 32)  # more rows than packed kernels are used for
+        assert torch.allclose(layer(X), linear(X), atol=0.05)
+        assert torch.allclose(layer(X[:1]), linear(X[:1]), atol=0.05)
+        f = io.BytesIO()
+        torch.save(layer, f)  # the packed weights are not saved
+        f.seek(0)
+        assert torch.allclose(torch.load(f, weights_only=False)(X[:1]), layer(X[:1]))
+
+
+if __name__ == "__main__":
+    test_quantize()
+    test_layer()
+    import IPython
+    IPython.embed()
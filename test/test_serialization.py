@@ -0,0 +1,47 @@
+import io
+import os
+import torch
+import numpy as np
+import pandas as pd
+from pygmalion.neural_networks import DenseClassifier, TextClassifier
+from pygmalion.tokenizers import WordsTokenizer
+from pygmalion.utilities import load_model
+
+
+def test_state_file(tmp_path):
+    df = pd.DataFrame(np.random.RandomState(0).rand(50, 2), columns=["a", "b"])
+    df["c"] = np.where(df["a"] > df["b"], "yes", "no")
+    model = DenseClassifier(["a", "b"], "c", ["yes", "no"], hidden_layers=[8, 8])
+    model.fit(model.data_to_tensor(df[["a", "b"]], df["c"]), n_steps=5, verbose=False)
+    path = tmp_path / "model.pygmalion"
+    model.save(path)
+    loaded = load_model(path)
+    assert not loaded.training
+    assert [m.n_observations for m in loaded.modules() if hasattr(m, "n_observations")] == \
+        [m.n_observations for m in model.modules() if hasattr(m, "n_observations")]
+    model.eval()
+    assert list(loaded.predict(df)) == list(model.predict(df))
+    # the weights are memory mapped from the file
+    assert all(p.untyped_storage().nbytes() == os.path.getsize(path) for p in loaded.parameters())
+
+
+def test_state_stream():
+    tokenizer = WordsTokenizer()
+    tokenizer.fit(["hello world", "hi there"])
+    model = TextClassifier(["a", "b"], tokenizer, 2, 8, 2)
+    stream = io.BytesIO()
+    model.save(stream, format="state")
+    stream.seek(0)
+    loaded = load_model(stream)
+    assert loaded.tokenizer.vocabulary == tokenizer.vocabulary
+    state = model.state_dict()
+    assert all(torch.equal(state[k], v) for k, v in loaded.state_dict().items())
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+    test_state_file(pathlib.Path(tempfile.mkdtemp()))
+    test_state_stream()
+    import IPython
+    IPython.embed()
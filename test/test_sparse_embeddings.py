@@ -0,0 +1,30 @@
+import random
+import torch
+from pygmalion.neural_networks import TextClassifier, CombinedOptimizer
+from pygmalion.tokenizers import WordsTokenizer
+
+
+def test_sparse_embeddings():
+    rng = random.Random(0)
+    tokenizer = WordsTokenizer()
+    tokenizer.fit([" ".join(f"w{i}" for i in range(1000))], max_tokens=1000, min_frequency=0.)
+    sentences = [" ".join(f"w{rng.randrange(1000)}" for _ in range(5)) for _ in range(8)]
+    classes = [rng.choice("ab") for _ in sentences]
+    torch.manual_seed(0)
+    model = TextClassifier(["a", "b"], tokenizer, n_stages=1, projection_dim=4, n_heads=2,
+                           gradient_checkpointing=False, sparse_embeddings=True)
+    x, y = model.data_to_tensor(sentences, classes)
+    initial = model.embedding.weight.detach().clone()
+    optimizer = CombinedOptimizer(torch.optim.Adam([p for n, p in model.named_parameters() if n != "embedding.weight"]),
+                                  torch.optim.SparseAdam([model.embedding.weight]))
+    train_losses, _, _, _ = model.fit((x, y), optimizer=optimizer, n_steps=5, L2=1.0E-3, gradient_cliping=1.,
+                                      keep_best=False, verbose=False)
+    updated = (model.embedding.weight != initial).any(dim=-1)
+    assert set(updated.nonzero().reshape(-1).tolist()) == set(x.unique().tolist())
+    assert train_losses[-1] < train_losses[0]
+
+
+if __name__ == "__main__":
+    test_sparse_embeddings()
+    import IPython
+    IPython.embed()